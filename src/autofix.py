@@ -0,0 +1,122 @@
+import re
+from typing import Dict, List, Set
+from src.models.circuit import Circuit, Net, PinConnection
+
+
+def _normalize(name: str) -> str:
+    # Ignora maiúsculas e separadores ("3v3" e "3V3_" viram a mesma chave), mas não o sinal:
+    # "+5V" e "-5V" são nets diferentes
+    return re.sub(r"[^0-9A-Z+\-]", "", name.upper())
+
+
+class NetlistFixer:
+    """
+    Corrige no próprio processo os erros mecânicos da netlist que a validação aponta, antes de
+    gastar uma rodada de Auto-Reparo na IA:
+
+    - nós repetidos numa net e nets declaradas duas vezes com o mesmo nome;
+    - Component.connections e Net.nodes fora de sincronia (uma conexão cuja net não existe em
+      nets, ou um nó que não aparece nas connections do componente): vale a união das duas;
+    - nets de um nó só cujo nome é o de uma net existente a menos de maiúsculas e separadores
+      ("gnd", "3v3_"): o nó passa para a net certa. Nomes a uma letra de distância não são
+      unidos (SCK/SCL, TXD/RXD, RST/RTS são sinais diferentes), nem os de sinal trocado
+      (+5V/-5V): esses ficam para a IA.
+
+    Cada alteração é registrada em `changes`; `touched` guarda os componentes alterados, para
+    a revalidação incremental (DesignValidator.validate_erc(components=...)).
+    """
+    def __init__(self):
+        self.changes: List[str] = []
+        self.touched: Set[str] = set()
+
+    def fix(self, circuit: Circuit) -> List[str]:
+        """Aplica as regras no circuito (alterado no lugar) e devolve as alterações feitas."""
+        self.changes, self.touched = [], set()
+        self._merge_duplicates(circuit)
+        self._sync_connections(circuit)
+        self._merge_typos(circuit)
+        return self.changes
+
+    def _log(self, message: str, *components: str):
+        self.changes.append(f"Auto-Fix: {message}")
+        self.touched.update(components)
+
+    def _merge_duplicates(self, circuit: Circuit):
+        merged: Dict[str, Net] = {}
+        for net in circuit.nets:
+            if net.name in merged:
+                merged[net.name].nodes.extend(net.nodes)
+                self._log(f"net '{net.name}' declarada mais de uma vez; nós unidos.",
+                          *(node.split(":")[0] for node in net.nodes))
+            else:
+                merged[net.name] = net
+        circuit.nets = list(merged.values())
+
+        for net in circuit.nets:
+            unique = list(dict.fromkeys(net.nodes))
+            for node in unique:
+                if net.nodes.count(node) > 1:
+                    self._log(f"nó '{node}' repetido na net '{net.name}' removido.", node.split(":")[0])
+            net.nodes = unique
+
+        for comp in circuit.components:
+            unique = list({(c.pin_number, c.net_name): c for c in comp.connections}.values())
+            if len(unique) < len(comp.connections):
+                self._log(f"conexões repetidas de '{comp.id}' removidas.", comp.id)
+            comp.connections = unique
+
+    def _sync_connections(self, circuit: Circuit):
+        nets = {net.name: net for net in circuit.nets}
+        components = {comp.id: comp for comp in circuit.components}
+
+        for comp in circuit.components:
+            for conn in comp.connections:
+                node = f"{comp.id}:{conn.pin_number}"
+                if conn.net_name not in nets:
+                    nets[conn.net_name] = Net(name=conn.net_name, nodes=[node])
+                    circuit.nets.append(nets[conn.net_name])
+                    self._log(f"net '{conn.net_name}' usada em connections de '{comp.id}' criada em nets.", comp.id)
+                elif node not in nets[conn.net_name].nodes:
+                    nets[conn.net_name].nodes.append(node)
+                    self._log(f"nó '{node}' adicionado à net '{conn.net_name}'.", comp.id)
+
+        for net in circuit.nets:
+            for node in net.nodes:
+                cid, _, pin = node.partition(":")
+                comp = components.get(cid)
+                if comp is None or not pin:
+                    continue  # componente inexistente: não há o que inferir, fica para a IA
+                if not any(c.pin_number == pin and c.net_name == net.name for c in comp.connections):
+                    comp.connections.append(PinConnection(pin_number=pin, net_name=net.name))
+                    self._log(f"pino '{pin}' de '{cid}' ligado à net '{net.name}' em connections.", cid)
+
+    def _merge_typos(self, circuit: Circuit):
+        real = [net for net in circuit.nets if len(set(net.nodes)) > 1]
+        keys = {}
+        for net in real:
+            keys.setdefault(_normalize(net.name), []).append(net)
+
+        for net in [n for n in circuit.nets if len(set(n.nodes)) == 1]:
+            key = _normalize(net.name)
+            target = keys.get(key)
+            # Só com um candidato claro: na dúvida a net fica como está
+            if not target or len(target) != 1:
+                continue
+            self._rename(circuit, net, target[0])
+
+    def _rename(self, circuit: Circuit, net: Net, target: Net):
+        node = net.nodes[0]
+        cid = node.split(":")[0]
+        if node not in target.nodes:
+            target.nodes.append(node)
+        circuit.nets.remove(net)
+        for comp in circuit.components:
+            if comp.id != cid:
+                continue
+            renamed = {}
+            for conn in comp.connections:
+                net_name = target.name if conn.net_name == net.name else conn.net_name
+                renamed[(conn.pin_number, net_name)] = PinConnection(pin_number=conn.pin_number, net_name=net_name)
+            comp.connections = list(renamed.values())
+        self._log(f"net '{net.name}' (só com '{node}') é '{target.name}' com outra grafia; "
+                  f"nó movido para '{target.name}'.", cid)
@@ -0,0 +1,120 @@
+"""
+Geração em lote: várias descrições pelo pipeline completo do GenerationBridge ao mesmo tempo.
+
+Cada linha do arquivo de entrada é um JSON com "description" (ou "prompt") e, opcionalmente,
+"id"; uma linha que é só uma string JSON também vale. Cada job roda numa thread, com seu
+próprio GenerationBridge e diretório de saída (<out>/<id>). As requisições de todos os jobs
+de um mesmo provedor passam por um RateLimiter comum. O resultado de cada job vira uma linha
+de <out>/results.jsonl assim que ele termina.
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
+
+from src.parser.llm_client import RateLimiter
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def load_prompts(path: str) -> List[dict]:
+    """Jobs do arquivo JSONL: [{"id", "description"}], na ordem do arquivo."""
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"description": entry}
+            description = entry.get("description") or entry.get("prompt")
+            if not description:
+                raise ValueError(f"{path}:{line_no}: linha sem 'description'.")
+            # Sem pontos no início: "." e ".." apontariam para fora de <out>/<id>
+            job_id = _UNSAFE.sub("_", str(entry.get("id") or f"{len(jobs):04d}")).lstrip(".")
+            if not job_id:
+                raise ValueError(f"{path}:{line_no}: id inválido {entry.get('id')!r}.")
+            jobs.append({"id": job_id, "description": description})
+    ids = [job["id"] for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"{path}: ids repetidos.")
+    return jobs
+
+
+def _usage_total(stages: List[dict]) -> dict:
+    total = {"prompt_tokens": 0, "completion_tokens": 0, "reasoning_tokens": 0}
+    for stage in stages:
+        for key in total:
+            total[key] += (stage.get("usage") or {}).get(key, 0)
+    return total
+
+
+class BatchRunner:
+    """
+    `workers` jobs simultâneos; `rpm` limita as requisições por minuto do provedor (None ou 0:
+    sem limite, só o backoff do cliente nos 429). `bridge_factory()` troca o GenerationBridge
+    padrão (testes, outro pipeline). `mode` é o modo do pipeline e `starts` o multi-start do
+    posicionamento (ver GenerationBridge).
+    """
+    def __init__(self, model: str = "gpt-3.5-turbo", workers: int = 4, rpm: Optional[float] = None,
+                 bridge_factory: Optional[Callable] = None, mode: Optional[str] = None,
+                 starts: Optional[int] = None):
+        self.model = model
+        self.mode = mode
+        self.starts = starts
+        self.workers = max(1, workers)
+        self.rpm = rpm
+        self.bridge_factory = bridge_factory or self._bridge
+
+    def _bridge(self):
+        from src.bridge import GenerationBridge
+        return GenerationBridge(model=self.model, echo=False, mode=self.mode, starts=self.starts)
+
+    def _run_job(self, job: dict, out_dir: str) -> dict:
+        job_dir = os.path.join(out_dir, job["id"])
+        os.makedirs(job_dir, exist_ok=True)
+        t0 = time.perf_counter()
+        result = {"id": job["id"], "description": job["description"], "output_dir": job_dir,
+                  "mode": None, "ok": False, "message": None, "repair_rounds": 0, "seconds": 0.0,
+                  "stages": [], "usage": None}
+        bridge = None
+        with open(os.path.join(job_dir, "log.txt"), "w", encoding="utf-8") as log_file:
+            try:
+                bridge = self.bridge_factory()
+                if self.rpm:
+                    # Um limitador por provedor, dividido por todos os jobs
+                    bridge.client.rate_limiter = RateLimiter.for_provider(bridge.client.base_url, self.rpm)
+                ok, message = bridge.process(job["description"], output_dir=job_dir,
+                                             callback=lambda msg: log_file.write(f"{msg}\n"))
+                result.update(ok=bool(ok), message=message)
+            except Exception as e:
+                result["message"] = f"{type(e).__name__}: {e}"
+
+        run = getattr(bridge, "last_run", None) or {}
+        result.update(mode=run.get("mode"), repair_rounds=run.get("repair_rounds", 0), stages=run.get("stages", []),
+                      usage=_usage_total(run.get("stages", [])), seconds=time.perf_counter() - t0)
+        return result
+
+    def run(self, jobs: List[dict], out_dir: str, log: Callable[[str], None] = print) -> dict:
+        """Roda os jobs e grava <out_dir>/results.jsonl; devolve o resumo do lote."""
+        os.makedirs(out_dir, exist_ok=True)
+        results_path = os.path.join(out_dir, "results.jsonl")
+        succeeded = 0
+        t0 = time.perf_counter()
+        with open(results_path, "w", encoding="utf-8") as results, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._run_job, job, out_dir): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.write(json.dumps(result, ensure_ascii=False) + "\n")
+                results.flush()
+                succeeded += result["ok"]
+                log(f"[{done}/{len(jobs)}] {'✅' if result['ok'] else '❌'} {result['id']} "
+                    f"({result['seconds']:.1f} s, {result['repair_rounds']} reparo(s))")
+
+        seconds = time.perf_counter() - t0
+        return {"jobs": len(jobs), "succeeded": succeeded, "failed": len(jobs) - succeeded,
+                "seconds": seconds, "jobs_per_minute": 60.0 * len(jobs) / seconds if seconds else 0.0,
+                "results": results_path}
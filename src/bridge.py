@@ -1,84 +1,126 @@
 import json
-from src.parser.llm_client import LLMClient
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.parser.llm_client import LLMClient, LLMError
+from src.parser.json_stream import StreamingJSONParser
 from src.models.circuit import Circuit
 from src.generators.schematic_generator import SchematicGenerator
 from src.generators.pcb_generator import PCBGenerator
+from src.autofix import NetlistFixer
+
+PIPELINE_MODES = ("two-pass", "single-pass", "reasoning")
 
 class GenerationBridge:
     """
     Coordena o fluxo de geração: Texto -> JSON -> Sch -> PCB.
     """
-    def __init__(self, model="gpt-3.5-turbo"):
+    def __init__(self, model="gpt-3.5-turbo", echo=True, mode=None, starts=None):
         self.client = LLMClient(model=model)
+        # two-pass: planejamento em texto e depois o JSON; single-pass: o plano vai num campo do
+        # JSON; reasoning: só o JSON (para modelos com reasoning tokens)
+        self.mode = mode or os.getenv("PIPELINE_MODE", "two-pass")
+        if self.mode not in PIPELINE_MODES:
+            raise ValueError(f"Modo de pipeline inválido: {self.mode!r} (use {', '.join(PIPELINE_MODES)})")
         self.sch_gen = SchematicGenerator()
         self.pcb_gen = PCBGenerator()
+        # Multi-start do posicionamento (PCBGenerator.place): quantas seeds tentar
+        self.starts = max(1, starts or int(os.getenv("PLACEMENT_STARTS", "1")))
         from src.generators.bom_generator import BOMGenerator
         self.bom_gen = BOMGenerator()
+        self.echo = echo  # False: log só pelo callback (execuções em lote)
+        self.last_export = None
+        self.last_run = None
 
-    def process(self, description: str, callback=None, canvas_callback=None):
+    def process(self, description: str, callback=None, canvas_callback=None, output_dir=None):
+        """
+        Roda o pipeline completo e devolve (sucesso, mensagem). Os arquivos vão para
+        `output_dir` (padrão: diretório atual). Rodadas de reparo, tempo e tokens de cada etapa
+        ficam em self.last_run.
+        """
         def log(msg):
             if callback: callback(msg)
-            print(msg)
+            if self.echo: print(msg)
 
         def update_canvas(type, data):
             if canvas_callback: canvas_callback(type, data)
 
+        run = self.last_run = {"mode": self.mode, "repair_rounds": 0, "stages": [], "seconds": 0.0}
+        started = time.perf_counter()
+
+        def record(stage, t0, llm=False):
+            entry = {"stage": stage, "seconds": time.perf_counter() - t0}
+            if llm:
+                entry["usage"] = self.client.last_usage
+            run["stages"].append(entry)
+            run["seconds"] = time.perf_counter() - started
+
         log("🚀 Iniciando Pipeline Level 3 (Autônomo & Realístico)...")
-        
-        log("🧠 Planejando arquitetura de hardware...")
-        reasoning_prompt = f"""
-        Analise a descrição do hardware e planeje a arquitetura:
-        {description}
-        
-        Cite os componentes necessários (identificadores KiCad), principais conexões (nets) e bibliotecas recomendadas.
-        Seja técnico e preciso.
-        """
-        reasoning_messages = [{"role": "system", "content": "Você é um engenheiro sênior de hardware KiCad."}, 
-                             {"role": "user", "content": reasoning_prompt}]
-        
-        reasoning_response = self.client.chat_completion(reasoning_messages, callback=log)
-        log("\n---")
-        
-        # Prompt Inicial com o raciocínio incluído
-        prompt_context = f"""
-        Com base no planejamento abaixo, converta o design em um JSON estruturado para KiCad 8.0.
-        
-        Planejamento:
-        {reasoning_response}
-        
-        Retorne APENAS o JSON no formato:
-            {{
-                "project_name": "...",
-                "description": "...",
-                "mermaid": "graph TD; ... (Diagrama de Fluxo Mermaid)",
-                "components": [{{ "id": "U1", "type": "MCU", "value": "ESP32", "library_ref": "MCU_Espressif:ESP32-WROOM-32", "footprint": "...", "connections": [{{ "pin_number": "1", "net_name": "GND" }}] }}],
-                "nets": [{{ "name": "GND", "nodes": ["U1:1", "C1:2"] }}]
-            }}
-        """
+
+        if self.mode == "two-pass":
+            log("🧠 Planejando arquitetura de hardware...")
+            reasoning_messages = [{"role": "system", "content": "Você é um engenheiro sênior de hardware KiCad."}, 
+                                 {"role": "user", "content": self._planning_prompt(description)}]
+            
+            t0 = time.perf_counter()
+            try:
+                reasoning_response = self.client.chat_completion(reasoning_messages, callback=log)
+                record("reasoning", t0, llm=True)
+            except LLMError as e:
+                log(f"❌ Erro na chamada da LLM: {e}")
+                return False, f"Erro na chamada da LLM: {e}"
+            log("\n---")
+            prompt_context = self._json_prompt(reasoning_response)
+        else:
+            # Uma chamada só: o planejamento vem no campo "plan" do JSON (ou nos reasoning tokens)
+            prompt_context = self._single_pass_prompt(description)
+
         messages = [{"role": "system", "content": "Você é um expert em hardware KiCad. Responda apenas com JSON válido."}, 
                     {"role": "user", "content": prompt_context}]
         
         repair_attempts = 2
         circuit = None
+        layout = None
         base_name = "project"
+        from src.component_db import ComponentDB
+        db = ComponentDB.shared()
 
         for attempt in range(repair_attempts + 1):
             if attempt > 0:
                 log(f"🔄 Iniciando rodada de Auto-Reparo (Tentativa {attempt}/{repair_attempts})...")
+            run["repair_rounds"] = attempt
+
+            # Cada componente vai para a resolução no DB assim que o '}' dele chega no stream,
+            # enquanto a LLM ainda gera o resto do JSON
+            resolver = ThreadPoolExecutor(max_workers=4)
+            resolving = {}  # id -> ((type, library_ref, footprint), future)
+            streamed_bom = []
+
+            def on_component(item):
+                fields = (str(item.get("type", "")), str(item.get("library_ref", "???")), item.get("footprint"))
+                if "id" in item:
+                    resolving[str(item["id"])] = (fields, resolver.submit(self._resolve_component, db, *fields))
+                streamed_bom.append({"id": item.get("id"), "type": item.get("type"),
+                                     "value": item.get("value"), "footprint": item.get("footprint")})
+                update_canvas("bom", list(streamed_bom))
 
-            raw_response = self.client.chat_completion(
-                messages, 
-                response_format={"type": "json_object"},
-                callback=log
-            )
+            parser = StreamingJSONParser(on_component)
+
+            def stream(text):
+                log(text)
+                parser.feed(text)
 
             try:
-                json_str = raw_response.strip()
-                if json_str.startswith("```"):
-                    json_str = json_str.split("```")[1]
-                    if json_str.startswith("json"): json_str = json_str[4:]
-                
-                data = json.loads(json_str)
+                t0 = time.perf_counter()
+                raw_response = self.client.chat_completion(
+                    messages, 
+                    response_format={"type": "json_object"},
+                    callback=stream
+                )
+                record("json", t0, llm=True)
+                t0 = time.perf_counter()
+
+                data = parser.result()
                 circuit = Circuit(**data)
                 base_name = circuit.project_name.lower().replace(" ", "_")
 
@@ -89,42 +131,58 @@ class GenerationBridge:
                 initial_bom = [{"id": c.id, "type": c.type, "value": c.value, "footprint": c.footprint} for c in circuit.components]
                 update_canvas("bom", initial_bom)
 
-                # Refinamento de Componentes via DB
-                from src.component_db import ComponentDB
-                db = ComponentDB()
+                # Refinamento de Componentes via DB: a maioria já foi resolvida durante o stream
                 for comp in circuit.components:
-                    results = db.search_symbol(comp.type if comp.library_ref == "???" else comp.library_ref)
-                    if results: comp.library_ref = results[0][0]
-                    if not comp.footprint:
-                        fps = db.get_suggested_footprints(comp.library_ref)
-                        if fps: comp.footprint = fps[0]
+                    fields = (comp.type, comp.library_ref, comp.footprint)
+                    fields_seen, future = resolving.get(comp.id, (None, None))
+                    if future is not None and fields_seen == fields:
+                        comp.library_ref, comp.footprint = future.result()
+                    else:
+                        comp.library_ref, comp.footprint = self._resolve_component(db, *fields)
 
                 # 4. Validação Técnica (ERC/DRC)
                 log("🔍 Validando design e verificando integridade técnica...")
                 from src.validator import DesignValidator
-                validator = DesignValidator(circuit)
+                validator = DesignValidator(circuit, clearance=self.pcb_gen.clearance, db=db)
                 validator.validate_erc()
-                
-                # Gera PCB temporária para DRC
-                temp_pcb = f"temp_val.kicad_pcb"
-                self.pcb_gen.generate(circuit, temp_pcb)
-                with open(temp_pcb, "r", encoding="utf-8") as f:
-                    validator.validate_drc(f.read())
+
+                # Erros mecânicos da netlist são corrigidos aqui mesmo; só o que sobrar vai para a IA
+                # (só com erros: um design válido com avisos, como uma net flutuante, não é reescrito)
+                fixer = NetlistFixer()
+                if validator.errors:
+                    for change in fixer.fix(circuit):
+                        log(f"🔧 {change}")
+                    if fixer.touched:
+                        validator.validate_erc(components=fixer.touched)
+
+                # DRC direto no layout em memória, sem escrever/reler um .kicad_pcb temporário
+                layout = self.pcb_gen.place(circuit, starts=self.starts)
+                validator.validate_layout(layout)
                 
                 report = validator.get_report()
-                
-                if not report["is_valid"] and attempt < repair_attempts:
+                record("validation", t0)
+
+                # A geometria é do PCBGenerator (posicionamento + legalização), não da IA: erros de DRC
+                # não viram prompt de reparo, só os de netlist.
+                drc_errors = [e for e in report["errors"] if e.startswith("DRC:")]
+                netlist_errors = [e for e in report["errors"] if not e.startswith("DRC:")]
+                for err in drc_errors:
+                    log(f"⚠️ {err}")
+
+                if netlist_errors and attempt < repair_attempts:
                     log(f"⚠️ Falhas detectadas. Enviando para Auto-Reparo IA...")
-                    error_summary = "\n".join(report["errors"] + report["warnings"])
+                    error_summary = "\n".join(netlist_errors + report["warnings"])
                     repair_prompt = f"""
                     O design anterior possui os seguintes erros técnicos:
                     {error_summary}
                     
                     Por favor, corrija o JSON do circuito para resolver esses problemas. 
-                    Certifique-se de que todos os pinos estejam conectados em redes (nets) válidas e não haja sobreposições.
+                    Certifique-se de que todos os pinos estejam conectados em redes (nets) válidas.
                     Retorne apenas o JSON corrigido.
                     """
-                    messages.append({"role": "assistant", "content": raw_response})
+                    # Com Auto-Fix a IA parte do circuito já corrigido, não da resposta original
+                    previous = circuit.model_dump_json(indent=2) if fixer.changes else raw_response
+                    messages.append({"role": "assistant", "content": previous})
                     messages.append({"role": "user", "content": repair_prompt})
                     continue # Tenta de novo
                 
@@ -134,36 +192,127 @@ class GenerationBridge:
             except Exception as e:
                 log(f"❌ Erro na tentativa {attempt}: {e}")
                 if attempt == repair_attempts: return False, str(e)
+            finally:
+                resolver.shutdown(wait=False, cancel_futures=True)
 
-        try:
-            # Geração de arquivos finais
-            log("📁 Gerando arquivos finais do projeto KiCad...")
-            
-            # .kicad_pro
+        # Geração de arquivos finais, em paralelo a partir do circuito e do layout validado
+        log("📁 Gerando arquivos finais do projeto KiCad...")
+        layout_data = self.pcb_gen.layout_data(circuit, layout) if layout else None
+        if layout_data:
+            update_canvas("pcb", layout_data)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            base_name = os.path.join(output_dir, base_name)
+        t0 = time.perf_counter()
+        summary = self.export_artifacts(circuit, base_name, layout, layout_data, log)
+        record("export", t0)
+
+        failed = [name for name, result in summary["artifacts"].items() if not result["ok"]]
+        if failed:
+            error_msg = f"Erro na geração final: {', '.join(failed)} falharam."
+            log(error_msg)
+            return False, error_msg
+        log(f"✅ Projeto completo criado com sucesso: {base_name}.kicad_pro")
+        return True, f"Sucesso! Projeto '{circuit.project_name}' pronto com BOM."
+
+    JSON_FORMAT = """
+            {{{plan}
+                "project_name": "...",
+                "description": "...",
+                "mermaid": "graph TD; ... (Diagrama de Fluxo Mermaid)",
+                "components": [{{ "id": "U1", "type": "MCU", "value": "ESP32", "library_ref": "MCU_Espressif:ESP32-WROOM-32", "footprint": "...", "connections": [{{ "pin_number": "1", "net_name": "GND" }}] }}],
+                "nets": [{{ "name": "GND", "nodes": ["U1:1", "C1:2"] }}]
+            }}
+        """
+
+    def _planning_prompt(self, description: str) -> str:
+        return f"""
+        Analise a descrição do hardware e planeje a arquitetura:
+        {description}
+        
+        Cite os componentes necessários (identificadores KiCad), principais conexões (nets) e bibliotecas recomendadas.
+        Seja técnico e preciso.
+        """
+
+    def _json_prompt(self, plan: str) -> str:
+        # Prompt Inicial com o raciocínio incluído
+        return f"""
+        Com base no planejamento abaixo, converta o design em um JSON estruturado para KiCad 8.0.
+        
+        Planejamento:
+        {plan}
+        
+        Retorne APENAS o JSON no formato:{self.JSON_FORMAT.format(plan="")}"""
+
+    def _single_pass_prompt(self, description: str) -> str:
+        # Modelos com reasoning tokens planejam sozinhos; os outros escrevem o plano antes dos componentes
+        plan = "" if self.mode == "reasoning" else """
+                "plan": "Planejamento técnico: componentes (identificadores KiCad), principais conexões (nets) e bibliotecas","""
+        return f"""
+        Analise a descrição do hardware, planeje a arquitetura e converta o design em um JSON estruturado para KiCad 8.0:
+        {description}
+        
+        Retorne APENAS o JSON no formato:{self.JSON_FORMAT.format(plan=plan)}"""
+
+    @staticmethod
+    def _resolve_component(db, type: str, library_ref: str, footprint=None):
+        """(library_ref, footprint) do componente segundo o DB local: o melhor símbolo da busca e, sem footprint, o sugerido."""
+        results = db.search_symbol(type if library_ref == "???" else library_ref)
+        if results: library_ref = results[0][0]
+        if not footprint:
+            fps = db.get_suggested_footprints(library_ref)
+            if fps: footprint = fps[0]
+        return library_ref, footprint
+
+    def export_artifacts(self, circuit: Circuit, base_name: str, layout=None, layout_data=None, log=print) -> dict:
+        """
+        Escreve .kicad_pro, .kicad_sch, .kicad_pcb, BOM, IPC-356 e DSN ao mesmo tempo, um
+        exportador por thread: dado o circuito e o layout eles não dependem um do outro, então o
+        tempo total é o do mais lento. A falha de um não derruba os outros. Devolve
+        {"artifacts": {nome: {file, ok, seconds, error}}, "seconds": tempo de parede} (também
+        guardado em self.last_export).
+        """
+        from src.generators.ipc356_generator import IPC356Generator
+        from src.generators.dsn_generator import DSNGenerator
+
+        def write_project(path):
             from jinja2 import Environment, FileSystemLoader
             env = Environment(loader=FileSystemLoader("src/generators"))
-            pro_template = env.get_template("project_template.j2")
-            pro_content = pro_template.render({"project_name": circuit.project_name})
-            with open(f"{base_name}.kicad_pro", "w", encoding="utf-8") as f: f.write(pro_content)
+            pro_content = env.get_template("project_template.j2").render({"project_name": circuit.project_name})
+            with open(path, "w", encoding="utf-8") as f: f.write(pro_content)
 
-            self.sch_gen.generate(circuit, f"{base_name}.kicad_sch")
-            pcb_file, layout_data = self.pcb_gen.generate(circuit, f"{base_name}.kicad_pcb")
-            update_canvas("pcb", layout_data)
+        jobs = {
+            "kicad_pro": (f"{base_name}.kicad_pro", write_project),
+            "kicad_sch": (f"{base_name}.kicad_sch", lambda path: self.sch_gen.generate(circuit, path)),
+            # Mesmo board que passou pelo DRC: sem um segundo posicionamento
+            "kicad_pcb": (f"{base_name}.kicad_pcb", lambda path: self.pcb_gen.generate(circuit, path, layout=layout)),
+            "bom": (f"{base_name}_bom.csv", lambda path: self.bom_gen.generate(circuit, path)),
+            "ipc356": (f"{base_name}.ipc",
+                       lambda path: IPC356Generator().generate(circuit, path, layout_data, self.pcb_gen.db)),
+            "dsn": (f"{base_name}.dsn", lambda path: DSNGenerator().generate(circuit, path)),
+        }
+
+        def run(name):
+            path, job = jobs[name]
+            t0 = time.perf_counter()
+            try:
+                job(path)
+                return {"file": path, "ok": True, "seconds": time.perf_counter() - t0, "error": None}
+            except Exception as e:
+                return {"file": path, "ok": False, "seconds": time.perf_counter() - t0, "error": str(e)}
 
-            # 5. Novas Funcionalidades Level 3
-            log("🛒 Gerando BOM (Base de Materiais) com preços reais...")
-            self.bom_gen.generate(circuit, f"{base_name}_bom.csv")
+        t0 = time.perf_counter()
+        artifacts = {}
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {pool.submit(run, name): name for name in jobs}
+            for future in as_completed(futures):
+                name, result = futures[future], future.result()
+                artifacts[name] = result
+                if result["ok"]:
+                    log(f"  📄 {result['file']} ({result['seconds'] * 1000:.0f} ms)")
+                else:
+                    log(f"  ❌ {result['file']}: {result['error']}")
 
-            # IPC & DSN
-            from src.generators.ipc356_generator import IPC356Generator
-            from src.generators.dsn_generator import DSNGenerator
-            IPC356Generator().generate(circuit, f"{base_name}.ipc")
-            DSNGenerator().generate(circuit, f"{base_name}.dsn")
-            
-            log(f"✅ Projeto completo criado com sucesso: {base_name}.kicad_pro")
-            return True, f"Sucesso! Projeto '{circuit.project_name}' pronto com BOM."
-            
-        except Exception as e:
-            error_msg = f"Erro na geração final: {str(e)}"
-            log(error_msg)
-            return False, error_msg
+        self.last_export = {"artifacts": {name: artifacts[name] for name in jobs},
+                            "seconds": time.perf_counter() - t0}
+        return self.last_export
@@ -1,7 +1,7 @@
 import click
 import sys
 import os
-from src.parser.llm_client import LLMClient
+from src.parser.llm_client import LLMClient, LLMError
 from src.models.circuit import Circuit
 
 @click.group()
@@ -12,7 +12,9 @@ def cli():
 @cli.command()
 @click.argument('description')
 @click.option('--model', default='gpt-3.5-turbo', help='Modelo da LLM a usar')
-def generate(description, model):
+@click.option('--starts', default=1, show_default=True, type=int, envvar='PLACEMENT_STARTS',
+              help='Seeds do posicionamento testadas em paralelo (fica o melhor layout)')
+def generate(description, model, starts):
     """Gera um projeto KiCad a partir de uma descrição textual."""
     click.echo(f"Interpretando: {description}")
     
@@ -44,7 +46,11 @@ def generate(description, model):
     messages = [{"role": "user", "content": prompt}]
     
     click.echo("Chamando IA...")
-    response = client.chat_completion(messages)
+    try:
+        response = client.chat_completion(messages)
+    except LLMError as e:
+        click.echo(f"Erro na chamada da LLM: {e}")
+        return
     
     try:
         import json
@@ -76,7 +82,7 @@ def generate(description, model):
         # 2. PCB
         pcb_gen = PCBGenerator()
         pcb_file = f"{base_filename}.kicad_pcb"
-        pcb_gen.generate(circuit, pcb_file)
+        pcb_gen.generate(circuit, pcb_file, starts=starts)
         
         click.echo(f"🚀 Sucesso! Arquivos gerados:\n- {sch_file}\n- {pcb_file}")
         
@@ -85,7 +91,33 @@ def generate(description, model):
         click.echo(f"Resposta bruta da IA: {response}")
 
 @cli.command()
-def update_libs():
+@click.argument('prompts', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', default=4, show_default=True, type=int, help='Gerações simultâneas')
+@click.option('--out', 'out_dir', default='batch_out', show_default=True, help='Diretório de saída (um subdiretório por job)')
+@click.option('--model', default='gpt-3.5-turbo', help='Modelo da LLM a usar')
+@click.option('--rpm', default=None, type=float, envvar='LLM_RPM',
+              help='Limite de requisições por minuto ao provedor (padrão: LLM_RPM ou sem limite)')
+@click.option('--mode', default=None, envvar='PIPELINE_MODE',
+              type=click.Choice(['two-pass', 'single-pass', 'reasoning']),
+              help='Modo do pipeline (padrão: PIPELINE_MODE ou two-pass)')
+@click.option('--starts', default=None, type=int, envvar='PLACEMENT_STARTS',
+              help='Seeds do posicionamento testadas em paralelo (padrão: PLACEMENT_STARTS ou 1)')
+def batch(prompts, workers, out_dir, model, rpm, mode, starts):
+    """Roda o pipeline completo para cada descrição de um arquivo JSONL."""
+    from src.batch import BatchRunner, load_prompts
+
+    jobs = load_prompts(prompts)
+    click.echo(f"{len(jobs)} job(s), {workers} simultâneo(s) -> {out_dir}")
+    summary = BatchRunner(model=model, workers=workers, rpm=rpm, mode=mode, starts=starts).run(jobs, out_dir, log=click.echo)
+    click.echo(f"Concluído: {summary['succeeded']}/{summary['jobs']} com sucesso em {summary['seconds']:.1f} s "
+               f"({summary['jobs_per_minute']:.1f} jobs/min). Resultados: {summary['results']}")
+    if summary['failed']:
+        sys.exit(1)
+
+@cli.command()
+@click.option('--workers', default=None, type=int, help='Processos de indexação (padrão: todos os núcleos)')
+@click.option('--full', is_flag=True, help='Reindexa tudo, ignorando o manifesto incremental')
+def update_libs(workers, full):
     """Atualiza e indexa as bibliotecas do KiCad."""
     from src.library_manager import main as setup_libs
     from src.component_db import ComponentDB
@@ -95,7 +127,7 @@ def update_libs():
     
     click.echo("Indexando componentes (isso pode demorar m pouco)...")
     db = ComponentDB()
-    db.scan_libs()
+    db.scan_libs(workers=workers, full=full)
     click.echo("Indexação concluída.")
 
 if __name__ == "__main__":
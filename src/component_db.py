@@ -1,17 +1,338 @@
 import os
 import re
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sqlite3
-from typing import Optional
+from typing import Optional, List, Tuple
+from src import sexpr
+
+
+def _symbol_metadata(sym_content: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Descrição e palavras-chave (ki_description/Description e ki_keywords) do símbolo,
+    e o símbolo pai quando ele é derivado (extends ...).
+    """
+    # max_depth=2: só as propriedades diretas; unidades e pinos ficam como texto cru
+    tree = sexpr.parse(sym_content, max_depth=2)
+    props = {}
+    for prop in sexpr.find_all(tree, "property"):
+        if len(prop) > 2:
+            props.setdefault(prop[1], str(prop[2]))
+    description = props.get("ki_description") or props.get("Description") or None
+    extends = sexpr.find(tree, "extends")
+    parent = str(extends[1]) if extends and len(extends) > 1 else None
+    return description, props.get("ki_keywords") or None, parent
+
+
+def _unit_number(unit_name: str) -> int:
+    # Sub-símbolos seguem o padrão "Nome_<unidade>_<estilo>"; unidade 0 = comum a todas
+    try:
+        return int(unit_name.rsplit("_", 2)[-2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _symbol_pins(sym_content: str) -> List[Tuple]:
+    """Pinos do símbolo: (number, name, etype, x, y, angle, unit)."""
+    pins = []
+    pin_starts = []
+    for name, start, _ in sexpr.iter_lists(sym_content, ("symbol", "pin"), depth=2):
+        if name == "pin":
+            pin_starts.append((start, 0))
+        else:
+            unit_name = sexpr.leading_atoms(sym_content, start, 2)
+            unit = _unit_number(unit_name[1]) if len(unit_name) > 1 else 0
+            pin_starts.extend((p, unit) for _, p, _ in sexpr.iter_lists(sym_content, ("pin",), depth=2, start=start))
+    for start, unit in pin_starts:
+        pin = sexpr.parse(sym_content, max_depth=2, start=start)
+        at, name, number = sexpr.find(pin, "at"), sexpr.find(pin, "name"), sexpr.find(pin, "number")
+        if not (at and number and len(at) >= 3 and len(number) >= 2):
+            continue
+        pins.append((str(number[1]), str(name[1]) if name and len(name) > 1 else "",
+                     pin[1] if len(pin) > 1 else "", float(at[1]), float(at[2]),
+                     float(at[3]) if len(at) > 3 else 0.0, unit))
+    return pins
+
+
+def parse_sym_file(path: str, content: Optional[str] = None) -> dict:
+    """
+    Extrai os blocos (symbol ...) de topo de um .kicad_sym.
+    Retorna as linhas por tabela, prontas para o INSERT:
+    symbols (lib_name, sym_name, full_name, content, description, keywords) e
+    pins (symbol, number, name, etype, x, y, angle, unit).
+    """
+    file_path = Path(path)
+    lib_name = file_path.stem
+    if content is None:
+        content = file_path.read_text(encoding="utf-8", errors="ignore")
+    rows, pins_by_name, parents = [], {}, {}
+
+    # (kicad_symbol_lib (symbol "Nome" ...) ...): os símbolos são as listas de nível 2
+    for _, start, end in sexpr.iter_lists(content, ("symbol",), depth=2):
+        atoms = sexpr.leading_atoms(content, start, 2)
+        if len(atoms) < 2 or ":" in atoms[1]:
+            continue
+        sym_name = atoms[1]
+        sym_content = content[start:end]
+        description, keywords, parent = _symbol_metadata(sym_content)
+        rows.append((lib_name, sym_name, f"{lib_name}:{sym_name}", sym_content, description, keywords))
+        pins_by_name[sym_name] = _symbol_pins(sym_content)
+        if parent:
+            parents[sym_name] = parent
+
+    pin_rows = []
+    for sym_name, pins in pins_by_name.items():
+        # Símbolo derivado (extends) não repete os pinos: herda os do pai, que está no mesmo arquivo
+        if not pins and sym_name in parents:
+            pins = pins_by_name.get(parents[sym_name], [])
+        pin_rows.extend((f"{lib_name}:{sym_name}",) + pin for pin in pins)
+    return {"symbols": rows, "pins": pin_rows}
+
+
+# Camadas usadas para a extensão do footprint, em ordem de preferência
+_EXTENT_LAYERS = {"F.CrtYd": "courtyard", "B.CrtYd": "courtyard", "F.Fab": "fab", "B.Fab": "fab"}
+# Itens do footprint que não têm geometria útil aqui: não são materializados
+_FP_SKIP = ("property", "fp_text", "fp_text_box", "model", "zone", "group", "embedded_files", "embedded_fonts")
+
+
+def _points(item: list) -> List[Tuple[float, float]]:
+    """Pontos que delimitam um gráfico fp_line/fp_rect/fp_arc/fp_circle/fp_poly."""
+    pts = [(float(node[1]), float(node[2])) for key in ("start", "mid", "end", "center")
+           for node in [sexpr.find(item, key)] if node and len(node) >= 3]
+    if item[0] == "fp_circle" and len(pts) == 2:
+        (ex, ey), (cx, cy) = pts
+        r = ((ex - cx) ** 2 + (ey - cy) ** 2) ** 0.5
+        pts = [(cx - r, cy - r), (cx + r, cy + r)]
+    poly = sexpr.find(item, "pts")
+    if poly:
+        pts.extend((float(xy[1]), float(xy[2])) for xy in sexpr.find_all(poly, "xy"))
+    return pts
+
+
+def _pad_row(pad: list) -> Optional[Tuple]:
+    """(number, pad_type, shape, x, y, width, height, angle, layers) de um (pad ...)."""
+    at, size, layers = sexpr.find(pad, "at"), sexpr.find(pad, "size"), sexpr.find(pad, "layers")
+    if len(pad) < 4 or not at or len(at) < 3:
+        return None
+    width, height = (float(size[1]), float(size[2])) if size and len(size) >= 3 else (0.0, 0.0)
+    return (str(pad[1]), pad[2], pad[3], float(at[1]), float(at[2]), width, height,
+            float(at[3]) if len(at) > 3 else 0.0, " ".join(str(l) for l in layers[1:]) if layers else "")
+
+
+def _pad_corners(x, y, width, height, angle) -> List[Tuple[float, float]]:
+    rad = math.radians(angle)
+    c, s = abs(math.cos(rad)), abs(math.sin(rad))
+    half_w, half_h = (width * c + height * s) / 2, (width * s + height * c) / 2
+    return [(x - half_w, y - half_h), (x + half_w, y + half_h)]
+
+
+def parse_fp_file(path: str, content: Optional[str] = None) -> dict:
+    """
+    Lê um .kicad_mod. O arquivo já é o conteúdo do footprint (começa com (footprint ...) ).
+    A descrição e as palavras-chave vêm de (descr ...) e (tags ...). Também extrai os pads
+    e as caixas envolventes (courtyard, fab e dos próprios pads), em mm relativos à origem
+    do footprint.
+    """
+    mod_file = Path(path)
+    lib_name = mod_file.parent.stem
+    fp_name = mod_file.stem
+    full_name = f"{lib_name}:{fp_name}"
+    if content is None:
+        content = mod_file.read_text(encoding="utf-8", errors="ignore")
+    tree = sexpr.parse(content, skip=_FP_SKIP)
+    descr, tags = sexpr.find(tree, "descr"), sexpr.find(tree, "tags")
+    description = str(descr[1]) if descr and len(descr) > 1 else None
+    keywords = str(tags[1]) if tags and len(tags) > 1 else None
+
+    pads, bounds = footprint_geometry(tree)
+    return {"footprints": [(lib_name, fp_name, full_name, content, description, keywords)],
+            "pads": [(full_name,) + pad for pad in pads],
+            "footprint_bounds": [(full_name, kind) + box for kind, box in bounds.items()]}
+
+
+def footprint_geometry(tree: list) -> Tuple[List[Tuple], dict]:
+    """
+    Pads (linhas de _pad_row) e caixas {courtyard|fab|pads: (min_x, min_y, max_x, max_y)} de um
+    (footprint ...) já montado, em mm relativos à origem. Serve tanto para o .kicad_mod da
+    biblioteca quanto para um footprint dentro de um .kicad_pcb (coordenadas locais).
+    """
+    points = {"courtyard": [], "fab": [], "pads": []}
+    pad_rows = []
+    for item in tree[1:]:
+        if not isinstance(item, list) or not item:
+            continue
+        if item[0] == "pad":
+            pad = _pad_row(item)
+            if pad:
+                pad_rows.append(pad)
+                points["pads"].extend(_pad_corners(pad[3], pad[4], pad[5], pad[6], pad[7]))
+        elif item[0].startswith("fp_"):
+            layer = sexpr.find(item, "layer")
+            kind = _EXTENT_LAYERS.get(str(layer[1])) if layer and len(layer) > 1 else None
+            if kind:
+                points[kind].extend(_points(item))
+
+    bounds = {kind: (min(x for x, _ in pts), min(y for _, y in pts), max(x for x, _ in pts), max(y for _, y in pts))
+              for kind, pts in points.items() if pts}
+    return pad_rows, bounds
+
+
+_PARSERS = {"symbol": parse_sym_file, "footprint": parse_fp_file}
+
+
+def lib_file_kind(path) -> Optional[str]:
+    """Classifica um caminho de biblioteca: 'symbol', 'footprint' ou None."""
+    path = Path(path)
+    if path.suffix == ".kicad_sym":
+        return "symbol"
+    if path.suffix == ".kicad_mod" and path.parent.suffix == ".pretty":
+        return "footprint"
+    return None
+
+
+def _parse_job(job):
+    """Executado nos processos de trabalho: nunca levanta, devolve o erro como texto."""
+    kind, path, key, mtime, size = job
+    try:
+        raw = Path(path).read_bytes()
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        rows = _PARSERS[kind](path, raw.decode("utf-8", errors="ignore"))
+        return kind, key, rows, None, (mtime, size, digest)
+    except Exception as e:
+        return kind, key, {}, f"{type(e).__name__}: {e}", None
+
+
+class LRUCache:
+    """Cache LRU limitado e thread-safe, com contadores de acertos e falhas."""
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """Valor em cache para `key`; na falta, chama loader() e guarda o resultado (inclusive None)."""
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is not self._MISSING:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        # A consulta roda fora do lock: duas threads podem carregar a mesma chave, sem problema
+        value = loader()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
 
 class ComponentDB:
     """
     Indexador de componentes KiCad. Escaneia arquivos .kicad_sym e .kicad_mod.
+
+    Cada thread usa sua própria conexão SQLite (a propriedade `conn`), então uma mesma
+    instância pode ser compartilhada entre threads. Para leitura, use ComponentDB.shared():
+    uma instância somente leitura por arquivo no processo inteiro, com cache LRU de conteúdo.
     """
-    def __init__(self, db_path: str = "components.db"):
+    # Versão do formato do índice: ao mudar o que é extraído dos arquivos, o manifesto é
+    # descartado para que a próxima indexação releia tudo
+    INDEX_VERSION = 2
+
+    # mmap das páginas do banco nas conexões de leitura (bytes)
+    MMAP_SIZE = 256 * 1024 * 1024
+    CACHE_SIZE = 512
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: str = "components.db", read_only: bool = False, immutable: bool = False,
+                 cache_size: int = CACHE_SIZE):
+        """
+        read_only abre com mode=ro (o banco precisa existir e já estar indexado).
+        immutable=True também dispensa os locks do SQLite: só use se nada vai escrever no
+        arquivo enquanto esta instância existir.
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        self.create_tables()
+        self.read_only = read_only or immutable
+        self.immutable = immutable
+        self._local = threading.local()
+        self._content_cache = LRUCache(cache_size)
+        self._pin_cache = LRUCache(cache_size)
+        self._extent_cache = LRUCache(cache_size)
+        if self.read_only:
+            self.has_fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'symbols_fts'").fetchone() is not None
+        else:
+            self.create_tables()
+
+    @classmethod
+    def shared(cls, db_path: str = "components.db") -> "ComponentDB":
+        """
+        Instância somente leitura compartilhada pelo processo (geradores, bridge, threads da GUI
+        e execuções em lote). O esquema é criado/migrado uma vez antes, com uma conexão de escrita.
+        """
+        key = os.path.abspath(db_path)
+        with cls._shared_lock:
+            db = cls._shared.get(key)
+            if db is None:
+                cls(db_path).close()
+                db = cls._shared[key] = cls(db_path, read_only=True)
+            return db
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexão da thread atual (criada na primeira vez que a thread usa o banco)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self.read_only:
+            return sqlite3.connect(self.db_path)
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        return conn
+
+    def close(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def clear_cache(self):
+        for cache in (self._content_cache, self._pin_cache, self._extent_cache):
+            cache.clear()
+
+    def cache_stats(self) -> dict:
+        """Acertos/falhas de cada cache: content (símbolos e footprints), pins e extents."""
+        return {"content": self._content_cache.stats(), "pins": self._pin_cache.stats(),
+                "extents": self._extent_cache.stats()}
 
     def create_tables(self):
         cursor = self.conn.cursor()
@@ -23,7 +344,8 @@ class ComponentDB:
                 description TEXT,
                 keywords TEXT,
                 full_name TEXT UNIQUE,
-                content TEXT
+                content TEXT,
+                source TEXT
             )
         """)
         cursor.execute("""
@@ -32,95 +354,425 @@ class ComponentDB:
                 lib_name TEXT,
                 fp_name TEXT,
                 description TEXT,
+                keywords TEXT,
                 full_name TEXT UNIQUE,
-                content TEXT
+                content TEXT,
+                source TEXT
+            )
+        """)
+        # Manifesto: um registro por arquivo indexado (caminho relativo a libs/)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                kind TEXT,
+                mtime REAL,
+                size INTEGER,
+                hash TEXT
             )
         """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pins (
+                symbol TEXT,
+                number TEXT,
+                name TEXT,
+                etype TEXT,
+                x REAL,
+                y REAL,
+                angle REAL,
+                unit INTEGER,
+                source TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pads (
+                footprint TEXT,
+                number TEXT,
+                pad_type TEXT,
+                shape TEXT,
+                x REAL,
+                y REAL,
+                width REAL,
+                height REAL,
+                angle REAL,
+                layers TEXT,
+                source TEXT
+            )
+        """)
+        # Caixa envolvente por tipo: 'courtyard', 'fab' ou 'pads' (mm, relativos à origem)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS footprint_bounds (
+                footprint TEXT,
+                kind TEXT,
+                min_x REAL,
+                min_y REAL,
+                max_x REAL,
+                max_y REAL,
+                source TEXT
+            )
+        """)
+        # Commit indexado de cada repositório de LIBRARIES
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS repos (
+                name TEXT PRIMARY KEY,
+                commit_hash TEXT
+            )
+        """)
+        self._ensure_column("symbols", "source", "TEXT")
+        self._ensure_column("footprints", "source", "TEXT")
+        self._ensure_column("footprints", "keywords", "TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_source ON symbols(source)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_footprints_source ON footprints(source)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(sym_name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_footprints_name ON footprints(fp_name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pins_symbol ON pins(symbol)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pins_source ON pins(source)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pads_footprint ON pads(footprint)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pads_source ON pads(source)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bounds_footprint ON footprint_bounds(footprint)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bounds_source ON footprint_bounds(source)")
+        self.has_fts = self._create_fts()
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < self.INDEX_VERSION:
+            cursor.execute("DELETE FROM files")
+            cursor.execute("DELETE FROM repos")
+            cursor.execute(f"PRAGMA user_version = {self.INDEX_VERSION}")
         self.conn.commit()
 
-    def scan_libs(self, libs_dir: str = "libs"):
+    # Colunas indexadas no FTS5 de cada tabela (nome da lib, nome, descrição, palavras-chave)
+    FTS_COLUMNS = {"symbols": ("lib_name", "sym_name", "description", "keywords"),
+                   "footprints": ("lib_name", "fp_name", "description", "keywords")}
+    # Pesos do BM25 na mesma ordem: acertar o nome vale mais que acertar a descrição
+    FTS_WEIGHTS = (2.0, 10.0, 1.0, 4.0)
+
+    def _create_fts(self) -> bool:
+        """
+        Cria as tabelas FTS5 (external content) e os gatilhos que as mantêm sincronizadas.
+        Retorna False se o SQLite não tiver FTS5; nesse caso as buscas usam LIKE.
+        """
+        existing = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table, columns in self.FTS_COLUMNS.items():
+            fts = f"{table}_fts"
+            cols = ", ".join(columns)
+            new_cols = ", ".join(f"new.{c}" for c in columns)
+            old_cols = ", ".join(f"old.{c}" for c in columns)
+            try:
+                self.conn.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                        {cols}, content='{table}', content_rowid='id', prefix='2 3'
+                    )
+                """)
+            except sqlite3.OperationalError:
+                return False
+            self.conn.executescript(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+                END;
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                END;
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+                END;
+            """)
+            weights = ", ".join(str(w) for w in self.FTS_WEIGHTS)
+            self.conn.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({weights})')")
+            if fts not in existing:
+                # Banco antigo já populado: indexa o que existe
+                self.conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        return True
+
+    def _ensure_column(self, table: str, column: str, decl: str):
+        """Migra bancos criados por versões anteriores, que não tinham a coluna."""
+        columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    SYMBOL_UPSERT = """
+        INSERT INTO symbols (lib_name, sym_name, full_name, content, description, keywords, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(full_name) DO UPDATE SET
+            lib_name=excluded.lib_name, sym_name=excluded.sym_name, content=excluded.content,
+            description=excluded.description, keywords=excluded.keywords, source=excluded.source
+    """
+    FOOTPRINT_UPSERT = """
+        INSERT INTO footprints (lib_name, fp_name, full_name, content, description, keywords, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(full_name) DO UPDATE SET
+            lib_name=excluded.lib_name, fp_name=excluded.fp_name, content=excluded.content,
+            description=excluded.description, keywords=excluded.keywords, source=excluded.source
+    """
+    MANIFEST_UPSERT = """
+        INSERT INTO files (path, kind, mtime, size, hash) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            kind=excluded.kind, mtime=excluded.mtime, size=excluded.size, hash=excluded.hash
+    """
+    PIN_INSERT = """
+        INSERT INTO pins (symbol, number, name, etype, x, y, angle, unit, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    PAD_INSERT = """
+        INSERT INTO pads (footprint, number, pad_type, shape, x, y, width, height, angle, layers, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    BOUNDS_INSERT = """
+        INSERT INTO footprint_bounds (footprint, kind, min_x, min_y, max_x, max_y, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+    TABLES = {"symbol": "symbols", "footprint": "footprints"}
+    # Tabelas preenchidas por cada tipo de arquivo (todas com a coluna source), na ordem de gravação
+    KIND_TABLES = {"symbol": ("symbols", "pins"), "footprint": ("footprints", "pads", "footprint_bounds")}
+    INSERTS = {"symbols": SYMBOL_UPSERT, "footprints": FOOTPRINT_UPSERT, "pins": PIN_INSERT,
+               "pads": PAD_INSERT, "footprint_bounds": BOUNDS_INSERT}
+    BATCH_SIZE = 5000
+    CHUNK_SIZE = 32
+
+    def scan_libs(self, libs_dir: str = "libs", workers: Optional[int] = None, full: bool = False):
         """
         Escaneia a pasta libs em busca de símbolos e footprints.
+
+        A indexação é incremental: cada subpasta de libs é um repositório e só arquivos
+        novos ou alterados (segundo o manifesto e, quando disponível, o `git diff` desde o
+        último commit indexado) são relidos; linhas de arquivos removidos são apagadas.
+        full=True ignora o manifesto e relê tudo.
+
+        Os arquivos são lidos em processos de trabalho (workers=None usa todos os núcleos,
+        workers=1 lê no próprio processo) e as linhas voltam ao processo pai, que grava
+        em lotes com executemany. Retorna as estatísticas da indexação.
         """
         libs_path = Path(libs_dir)
         if not libs_path.exists():
             print(f"Diretório {libs_dir} não encontrado.")
-            return
-
-        print("Lendo símbolos...")
-        for sym_file in libs_path.rglob("*.kicad_sym"):
-            self._parse_sym_file(sym_file)
-            
-        print("Lendo footprints...")
-        for fp_dir in libs_path.rglob("*.pretty"):
-            self._parse_fp_dir(fp_dir)
-        
-        self.conn.commit()
-    
-    def _parse_fp_dir(self, fp_dir: Path):
-        lib_name = fp_dir.stem
-        for mod_file in fp_dir.glob("*.kicad_mod"):
-            fp_name = mod_file.stem
-            full_name = f"{lib_name}:{fp_name}"
-            content = mod_file.read_text(encoding="utf-8", errors="ignore")
-            # O arquivo .kicad_mod já é o conteúdo do footprint (começa com (footprint ...) )
-            self._insert_footprint(lib_name, fp_name, full_name, content)
-
-    def _parse_sym_file(self, file_path: Path):
-        lib_name = file_path.stem
-        content = file_path.read_text(encoding="utf-8", errors="ignore")
-        
-        # Extração robusta de blocos (symbol ...)
-        idx = 0
-        length = len(content)
-        
-        while idx < length:
-            start = content.find('(symbol "', idx)
-            if start == -1: break
-            
-            name_start = start + 9
-            name_end = content.find('"', name_start)
-            if name_end == -1: break
-            sym_name = content[name_start:name_end]
-            
-            balance = 0
-            end = -1
-            for i in range(start, length):
-                if content[i] == '(': balance += 1
-                elif content[i] == ')': 
-                    balance -= 1
-                    if balance == 0:
-                        end = i + 1
-                        break
-            
-            if end != -1:
-                sym_content = content[start:end]
-                if ":" not in sym_name: 
-                    full_name = f"{lib_name}:{sym_name}"
-                    self._insert_symbol(lib_name, sym_name, full_name, sym_content)
-                idx = end
-            else:
-                idx = name_end
+            return None
 
-    def _insert_symbol(self, lib, name, full, content):
-        try:
-            self.conn.execute("""
-                INSERT INTO symbols (lib_name, sym_name, full_name, content) 
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(full_name) DO UPDATE SET content=excluded.content
-            """, (lib, name, full, content))
-        except Exception as e: pass
-
-    def _insert_footprint(self, lib, name, full, content):
+        t0 = time.perf_counter()
+        stats = {"files": 0, "symbols": 0, "footprints": 0, "unchanged": 0, "removed": 0,
+                 "repos_skipped": 0, "errors": 0, "error_details": []}
+        manifest = {row[0]: row[1:] for row in self.conn.execute("SELECT path, mtime, size, hash FROM files")}
+        jobs, removed, commits, gone = self._plan_scan(libs_path, manifest, full, stats)
+        print(f"Indexando {len(jobs)} arquivos ({stats['unchanged']} inalterados, {len(removed)} removidos)...")
+
+        workers = workers or os.cpu_count() or 1
+        self._begin_bulk_load()
         try:
-            self.conn.execute("""
-                INSERT INTO footprints (lib_name, fp_name, full_name, content) 
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(full_name) DO UPDATE SET content=excluded.content
-            """, (lib, name, full, content))
-        except: pass
+            self._remove_sources(removed)
+            stats["removed"] = len(removed)
+            if workers <= 1 or len(jobs) < self.CHUNK_SIZE:
+                self._consume(map(_parse_job, jobs), manifest, full, stats)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    self._consume(pool.map(_parse_job, jobs, chunksize=self.CHUNK_SIZE), manifest, full, stats)
+
+            # Um repositório com erros não tem o commit registrado, para ser revisto na próxima vez
+            failed_repos = {key.split("/", 1)[0] for key, _ in stats["error_details"]}
+            self.conn.executemany(
+                "INSERT INTO repos (name, commit_hash) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET commit_hash=excluded.commit_hash",
+                [(name, head) for name, head in commits.items() if name not in failed_repos])
+            # Sem o commit antigo, um repositório clonado de novo no mesmo lugar é relido inteiro
+            self.conn.executemany("DELETE FROM repos WHERE name = ?", [(name,) for name in gone])
+        finally:
+            self._end_bulk_load()
+        # Este processo pode ter instâncias compartilhadas do mesmo arquivo com conteúdo antigo
+        self.clear_cache()
+        shared = self._shared.get(os.path.abspath(self.db_path))
+        if shared is not None:
+            shared.clear_cache()
+
+        stats["seconds"] = time.perf_counter() - t0
+        stats["files_per_sec"] = stats["files"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        print(f"{stats['files']} arquivos em {stats['seconds']:.1f}s ({stats['files_per_sec']:.0f} arquivos/s): "
+              f"{stats['symbols']} símbolos, {stats['footprints']} footprints, {stats['errors']} erros.")
+        for path, error in stats["error_details"][:10]:
+            print(f"  Erro em {path}: {error}")
+        return stats
+
+    def _plan_scan(self, libs_path: Path, manifest: dict, full: bool, stats: dict):
+        """
+        Decide quais arquivos reler. Retorna (jobs, chaves removidas, commits atuais por
+        repositório, repositórios que sumiram de libs).
+        """
+        from src.library_manager import get_head_commit, changed_files
+
+        known_commits = dict(self.conn.execute("SELECT name, commit_hash FROM repos"))
+        jobs, removed, commits = [], [], {}
+        repos = sorted(d for d in libs_path.iterdir() if d.is_dir())
+
+        for repo in repos:
+            head = get_head_commit(repo)
+            known = known_commits.get(repo.name)
+            if not full and head and head == known:
+                stats["repos_skipped"] += 1
+                continue
+
+            candidates = None
+            if not full and head and known:
+                diff = changed_files(repo, known, head)
+                if diff is not None:
+                    candidates = {f"{repo.name}/{p}" for p in diff if lib_file_kind(p)}
+            if candidates is None:
+                # Sem histórico git utilizável (clone raso, pasta avulsa): compara com o manifesto
+                prefix = f"{repo.name}/"
+                candidates = {p.relative_to(libs_path).as_posix() for p in repo.rglob("*.kicad_*") if lib_file_kind(p)}
+                candidates.update(k for k in manifest if k.startswith(prefix))
+            self._plan_files(libs_path, candidates, manifest, full, stats, jobs, removed)
+            if head:
+                commits[repo.name] = head
+
+        # Arquivos soltos direto em libs/, fora de qualquer repositório: sempre pelo manifesto
+        loose = {p.name for p in libs_path.iterdir() if p.is_file() and lib_file_kind(p)}
+        loose.update(k for k in manifest if "/" not in k)
+        self._plan_files(libs_path, loose, manifest, full, stats, jobs, removed)
+
+        # Repositório apagado: nenhum dos arquivos dele é visto acima, então sai tudo aqui
+        present = {repo.name for repo in repos}
+        gone = ({k.split("/", 1)[0] for k in manifest if "/" in k} | set(known_commits)) - present
+        removed.extend(sorted(k for k in manifest if "/" in k and k.split("/", 1)[0] in gone))
+        return jobs, removed, commits, gone
+
+    @staticmethod
+    def _plan_files(libs_path: Path, candidates, manifest: dict, full: bool, stats: dict,
+                    jobs: list, removed: list):
+        """Separa os candidatos em releitura (jobs), removidos e inalterados."""
+        for key in sorted(candidates):
+            path = libs_path / key
+            if not path.is_file():
+                if key in manifest: removed.append(key)
+                continue
+            st = path.stat()
+            known_file = manifest.get(key)
+            if not full and known_file and known_file[0] == st.st_mtime and known_file[1] == st.st_size:
+                stats["unchanged"] += 1
+                continue
+            jobs.append((lib_file_kind(path), str(path), key, st.st_mtime, st.st_size))
+
+    def _consume(self, results, manifest: dict, full: bool, stats: dict):
+        """Recebe os resultados dos workers e grava em lotes grandes."""
+        batch = self._new_batch()
+        pending = 0
+        for kind, key, rows, error, file_info in results:
+            stats["files"] += 1
+            if error:
+                stats["errors"] += 1
+                stats["error_details"].append((key, error))
+                continue
+            mtime, size, digest = file_info
+            batch["manifest"].append((key, kind, mtime, size, digest))
+            known_file = manifest.get(key)
+            if not full and known_file and known_file[2] == digest:
+                # Só o mtime mudou (checkout, touch): conteúdo idêntico, nada a regravar
+                stats["unchanged"] += 1
+                continue
+            batch["clear"][kind].append((key,))
+            for table, table_rows in rows.items():
+                batch["rows"][table].extend(row + (key,) for row in table_rows)
+                pending += len(table_rows)
+            stats[f"{kind}s"] += len(rows.get(self.TABLES[kind], []))
+            pending += 1
+            if pending >= self.BATCH_SIZE:
+                self._flush(batch)
+                batch, pending = self._new_batch(), 0
+        self._flush(batch)
+
+    @staticmethod
+    def _new_batch():
+        return {"clear": {"symbol": [], "footprint": []},
+                "rows": {table: [] for table in ComponentDB.INSERTS},
+                "manifest": []}
+
+    def _flush(self, batch: dict):
+        with self.conn:
+            for kind, tables in self.KIND_TABLES.items():
+                # Apaga as linhas antigas do arquivo antes de regravar (símbolos podem ter sumido)
+                if batch["clear"][kind]:
+                    for table in tables:
+                        self.conn.executemany(f"DELETE FROM {table} WHERE source = ?", batch["clear"][kind])
+            # O mesmo full_name pode ter vindo antes de outro arquivo: a geometria é sempre do último
+            for main, children in (("symbols", {"pins": "symbol"}),
+                                   ("footprints", {"pads": "footprint", "footprint_bounds": "footprint"})):
+                names = [(row[2],) for row in batch["rows"][main]]
+                for table, column in children.items():
+                    if names:
+                        self.conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", names)
+            for table, sql in self.INSERTS.items():
+                if batch["rows"][table]:
+                    self.conn.executemany(sql, batch["rows"][table])
+            if batch["manifest"]:
+                self.conn.executemany(self.MANIFEST_UPSERT, batch["manifest"])
+
+    def _remove_sources(self, keys: List[str]):
+        if not keys: return
+        params = [(key,) for key in keys]
+        with self.conn:
+            for tables in self.KIND_TABLES.values():
+                for table in tables:
+                    self.conn.executemany(f"DELETE FROM {table} WHERE source = ?", params)
+            self.conn.executemany("DELETE FROM files WHERE path = ?", params)
+
+    def _begin_bulk_load(self):
+        # WAL + synchronous=OFF: durabilidade é irrelevante aqui, o índice pode ser refeito.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")
+
+    def _end_bulk_load(self):
+        self.conn.commit()
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def search(self, query: str, limit: int = 10, kind: Optional[str] = None) -> List[dict]:
+        """
+        Busca ranqueada (BM25) em nome, descrição e palavras-chave.
+        kind: 'symbol', 'footprint' ou None para ambos. Um nome exato sempre vem primeiro.
+        Retorna dicts com full_name, kind, description e score (maior é melhor).
+        """
+        tokens = re.findall(r"\w+", query.lower())
+        if not tokens:
+            return []
+        kinds = [kind] if kind else list(self.TABLES)
+        results = []
+        for k in kinds:
+            table = self.TABLES[k]
+            name_col = self.FTS_COLUMNS[table][1]
+            # Nome exato primeiro, pelos índices comuns (não passa pelo FTS)
+            seen = set()
+            for full_name, description in self.conn.execute(
+                    f"SELECT full_name, description FROM {table} WHERE full_name = ? OR {name_col} = ? LIMIT ?",
+                    (query, query, limit)):
+                seen.add(full_name)
+                results.append({"full_name": full_name, "kind": k, "description": description, "score": 1000.0})
+            if self.has_fts:
+                # ORDER BY rank só no FTS; os detalhes são buscados apenas para os vencedores
+                # Prefixo de 1 letra casaria quase tudo: esses tokens exigem igualdade
+                match = " ".join(f'"{t}"*' if len(t) > 1 else f'"{t}"' for t in tokens)
+                ranked = self.conn.execute(
+                    f"SELECT rowid, rank FROM {table}_fts WHERE {table}_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (match, limit)).fetchall()
+                if not ranked:
+                    continue
+                placeholders = ",".join("?" * len(ranked))
+                details = {row[0]: row[1:] for row in self.conn.execute(
+                    f"SELECT id, full_name, description FROM {table} WHERE id IN ({placeholders})",
+                    [rowid for rowid, _ in ranked])}
+                for rowid, rank in ranked:
+                    full_name, description = details[rowid]
+                    if full_name in seen:
+                        continue
+                    # bm25() é negativo: mais negativo = mais relevante
+                    results.append({"full_name": full_name, "kind": k, "description": description, "score": -rank})
+            else:
+                for full_name, description in self.conn.execute(
+                        f"SELECT full_name, description FROM {table} WHERE full_name LIKE ? LIMIT ?",
+                        (f"%{query}%", limit)):
+                    if full_name not in seen:
+                        results.append({"full_name": full_name, "kind": k, "description": description, "score": 0.0})
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
 
     def search_symbol(self, query: str):
+        """Compatibilidade: (full_name, lib_name, sym_name) dos 5 melhores símbolos."""
+        if self.has_fts:
+            names = [r["full_name"] for r in self.search(query, limit=5, kind="symbol")]
+            return [(name, *name.split(":", 1)) for name in names]
         cursor = self.conn.cursor()
         cursor.execute("""
             SELECT full_name, lib_name, sym_name FROM symbols 
@@ -130,17 +782,54 @@ class ComponentDB:
         """, (f"%{query}%", f"%{query}%", query, f"{query}%"))
         return cursor.fetchall()
         
-    def get_symbol_content(self, full_name: str) -> Optional[str]:
+    def _load_content(self, table: str, full_name: str) -> Optional[str]:
         cursor = self.conn.cursor()
-        cursor.execute("SELECT content FROM symbols WHERE full_name = ?", (full_name,))
+        cursor.execute(f"SELECT content FROM {table} WHERE full_name = ?", (full_name,))
         res = cursor.fetchone()
         return res[0] if res else None
 
+    def get_symbol_content(self, full_name: str) -> Optional[str]:
+        return self._content_cache.get_or_load(
+            ("symbol", full_name), lambda: self._load_content("symbols", full_name))
+
     def get_footprint_content(self, full_name: str) -> Optional[str]:
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT content FROM footprints WHERE full_name = ?", (full_name,))
-        res = cursor.fetchone()
-        return res[0] if res else None
+        return self._content_cache.get_or_load(
+            ("footprint", full_name), lambda: self._load_content("footprints", full_name))
+
+    def get_pins(self, full_name: str) -> List[dict]:
+        """Pinos indexados do símbolo (number, name, etype, x, y, angle, unit)."""
+        cursor = self.conn.execute(
+            "SELECT number, name, etype, x, y, angle, unit FROM pins WHERE symbol = ? ORDER BY unit, rowid",
+            (full_name,))
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_pin_positions(self, full_name: str) -> dict:
+        """
+        Mapa número do pino -> (x, y), como SchematicGenerator usa para ligar os fios.
+        Cacheado por library_ref: cada símbolo distinto custa uma única consulta indexada.
+        """
+        return self._pin_cache.get_or_load(
+            full_name, lambda: {pin["number"]: (pin["x"], pin["y"]) for pin in self.get_pins(full_name)})
+
+    def get_pads(self, full_name: str) -> List[dict]:
+        """Pads indexados do footprint (posições em mm relativas à origem do footprint)."""
+        cursor = self.conn.execute(
+            "SELECT number, pad_type, shape, x, y, width, height, angle, layers FROM pads "
+            "WHERE footprint = ? ORDER BY rowid", (full_name,))
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_footprint_extent(self, full_name: str) -> Optional[Tuple[float, float, float, float]]:
+        """
+        (min_x, min_y, max_x, max_y) do footprint relativo à origem: courtyard se existir,
+        senão a camada fab, senão a união dos pads. None se o footprint não está indexado.
+        """
+        def load():
+            bounds = {row[0]: row[1:] for row in self.conn.execute(
+                "SELECT kind, min_x, min_y, max_x, max_y FROM footprint_bounds WHERE footprint = ?", (full_name,))}
+            return bounds.get("courtyard") or bounds.get("fab") or bounds.get("pads")
+        return self._extent_cache.get_or_load(full_name, load)
 
     def get_suggested_footprints(self, symbol_name: str):
         cursor = self.conn.cursor()
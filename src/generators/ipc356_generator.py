@@ -5,7 +5,26 @@ class IPC356Generator:
     Gera uma netlist no formato IPC-D-356 para verificação industrial.
     Este formato é usado para testes de continuidade elétrica (E-Test).
     """
-    def generate(self, circuit, output_file):
+    def _pad_positions(self, layout_data, db):
+        """
+        {(ref, pad): (x, y, tipo)} com as coordenadas absolutas de cada pad, a partir da
+        posição do componente no layout e da geometria indexada do footprint.
+        """
+        positions = {}
+        if not layout_data or db is None:
+            return positions
+        pads_by_fp = {}
+        for comp in layout_data.get("components", []):
+            fp_name = comp.get("footprint")
+            if not fp_name:
+                continue
+            if fp_name not in pads_by_fp:
+                pads_by_fp[fp_name] = db.get_pads(fp_name)
+            for pad in pads_by_fp[fp_name]:
+                positions[(comp["id"], pad["number"])] = (comp["x"] + pad["x"], comp["y"] + pad["y"], pad["pad_type"])
+        return positions
+
+    def generate(self, circuit, output_file, layout_data=None, db=None):
         lines = []
         
         # Header (C indica comentário no IPC-D-356)
@@ -16,14 +35,17 @@ class IPC356Generator:
         lines.append("P  UNITS MM")
         
         # Definição de Nets
-        # Linha tipo 317 é para pads SMT (Surface Mount)
-        # Formato básico simplificado: 317 NETNAME REF PIN X Y ...
+        # Linha 317 é para pads com furo (THT) e 327 para pads SMT (Surface Mount)
+        # Formato básico simplificado: 3x7 NETNAME REF PIN X Y (em µm; Y do IPC cresce para cima)
+        pads = self._pad_positions(layout_data, db)
         for net in circuit.nets:
             for node in net.nodes:
                 comp_id, pin_num = node.split(":")
-                # Aqui simplificamos a posição para efeito de teste
-                # Em um sistema real, leríamos as coordenadas reais do componente
-                lines.append(f"317 {net.name:<14} {comp_id:<6} {pin_num:<4} X000000 Y000000")
+                # Sem layout ou sem geometria indexada, o pad fica na origem
+                x, y, pad_type = pads.get((comp_id, pin_num), (0.0, 0.0, "thru_hole"))
+                record = "327" if pad_type == "smd" else "317"
+                lines.append(f"{record} {net.name:<14} {comp_id:<6} {pin_num:<4} "
+                             f"X{round(x * 1000):+07d} Y{round(-y * 1000):+07d}")
 
         lines.append("999") # Fim de arquivo
         
@@ -1,10 +1,10 @@
 import uuid
-import re
-import math
-import random
+import numpy as np
 from jinja2 import Environment, FileSystemLoader
 from src.models.circuit import Circuit
 from src.component_db import ComponentDB
+from src.generators.placement import BoardLayout, ForcePlacer, PlacementProblem, legalize
+from src import sexpr
 from pathlib import Path
 
 class PCBGenerator:
@@ -19,11 +19,18 @@ class PCBGenerator:
   (pad "1" smd rect (at -1.5 0) (size 1 1.5) (layers "F.Cu" "F.Paste" "F.Mask"))
   (pad "2" smd rect (at 1.5 0) (size 1 1.5) (layers "F.Cu" "F.Paste" "F.Mask"))
 )"""
+    FALLBACK_EXTENT = (-2.0, -1.0, 2.0, 1.0)
 
-    def __init__(self, template_path: str = "src/generators"):
+    def __init__(self, template_path: str = "src/generators", placer: ForcePlacer = None, workers: int = None,
+                 clearance: float = 0.25, grid: float = 0.5):
         self.env = Environment(loader=FileSystemLoader(template_path))
         self.template = self.env.get_template("pcb_template.j2")
-        self.db = ComponentDB()
+        self.db = ComponentDB.shared()
+        self.placer = placer or ForcePlacer()
+        self.workers = workers
+        # Legalização: folga mínima entre courtyards e passo da grade (mm)
+        self.clearance = clearance
+        self.grid = grid
 
     def _inject_nets_into_footprint(self, content: str, comp_id: str, connections: list, net_map: dict) -> str:
         pin_net_info = {}
@@ -31,157 +38,127 @@ class PCBGenerator:
             if conn.net_name in net_map:
                 pin_net_info[conn.pin_number] = (net_map[conn.net_name], conn.net_name)
 
-        def replace_pad(match):
-            full_pad_str = match.group(0)
-            pin_match = re.search(r'\(pad\s+"?([^"\s]+)"?', full_pad_str)
-            if not pin_match: return full_pad_str
-            
-            pin_num = pin_match.group(1)
+        # Os pads são filhos diretos de (footprint ...): nível 2
+        pieces = []
+        idx = 0
+        for _, start, end in sexpr.iter_lists(content, ("pad",), depth=2):
+            atoms = sexpr.leading_atoms(content, start, 2)
+            pin_num = atoms[1] if len(atoms) > 1 else None
             if pin_num in pin_net_info:
                 net_id, net_name = pin_net_info[pin_num]
-                return full_pad_str[:-1] + f' (net {net_id} "{net_name}"))'
-            return full_pad_str
-
-        new_content = ""
-        idx = 0
-        length = len(content)
-        while idx < length:
-            start = content.find('(pad ', idx)
-            if start == -1:
-                new_content += content[idx:]; break
-            new_content += content[idx:start]
-            balance, end = 0, -1
-            for i in range(start, length):
-                if content[i] == '(': balance += 1
-                elif content[i] == ')':
-                    balance -= 1
-                    if balance == 0: end = i + 1; break
-            if end != -1:
-                pad_block = content[start:end]
-                modified_block = replace_pad(re.match(r'.*', pad_block))
-                new_content += modified_block
+                pieces.append(content[idx:end - 1])
+                pieces.append(f' (net {net_id} "{net_name}"))')
                 idx = end
-            else:
-                new_content += content[start:]; break
-        return new_content
-
-    def _run_physics_sim(self, components, nets):
-        """Simulação de grafos de força para posicionar componentes."""
-        # Inicialização
-        coords = {c.id: {"x": random.uniform(50, 150), "y": random.uniform(50, 150)} for c in components}
-        velocities = {c.id: {"x": 0.0, "y": 0.0} for c in components}
-        
-        # Parâmetros otimizados para Level 3 (Premium)
-        iterations = 80
-        repulsion = 600.0
-        attraction = 0.08
-        damping = 0.85
-        
-        # Conexões (adjacência ponderada pelo número de caminhos entre componentes)
-        adj = {}
-        for net in nets:
-            nodes = [n.split(":")[0] for n in net.nodes]
-            for i, c1 in enumerate(nodes):
-                for c2 in nodes[i+1:]:
-                    if c1 == c2: continue
-                    pair = tuple(sorted((c1, c2)))
-                    adj[pair] = adj.get(pair, 0) + 2 # Peso maior para conexões reais
-
-        for _ in range(iterations):
-            forces = {c.id: {"x": 0.0, "y": 0.0} for c in components}
-            
-            # 1. Repulsão (Evitar sobreposição)
-            for i, c1 in enumerate(components):
-                for c2 in components[i+1:]:
-                    dx = coords[c1.id]["x"] - coords[c2.id]["x"]
-                    dy = coords[c1.id]["y"] - coords[c2.id]["y"]
-                    dist_sq = dx*dx + dy*dy + 0.1
-                    force = repulsion / dist_sq
-                    
-                    forces[c1.id]["x"] += (dx / math.sqrt(dist_sq)) * force
-                    forces[c1.id]["y"] += (dy / math.sqrt(dist_sq)) * force
-                    forces[c2.id]["x"] -= (dx / math.sqrt(dist_sq)) * force
-                    forces[c2.id]["y"] -= (dy / math.sqrt(dist_sq)) * force
-            
-            # 2. Atração (Manter conectados próximos)
-            for (c1_id, c2_id), weight in adj.items():
-                dx = coords[c1_id]["x"] - coords[c2_id]["x"]
-                dy = coords[c1_id]["y"] - coords[c2_id]["y"]
-                dist = math.sqrt(dx*dx + dy*dy)
-                
-                fx = dx * attraction * weight
-                fy = dy * attraction * weight
-                
-                forces[c1_id]["x"] -= fx
-                forces[c1_id]["y"] -= fy
-                forces[c2_id]["x"] += fx
-                forces[c2_id]["y"] += fy
-            
-            # 3. Atualizar posições
-            for c in components:
-                velocities[c.id]["x"] = (velocities[c.id]["x"] + forces[c.id]["x"]) * damping
-                velocities[c.id]["y"] = (velocities[c.id]["y"] + forces[c.id]["y"]) * damping
-                
-                # Limite de velocidade para evitar "explosões"
-                v_mag = math.sqrt(velocities[c.id]["x"]**2 + velocities[c.id]["y"]**2)
-                if v_mag > 10.0:
-                    velocities[c.id]["x"] *= 10.0 / v_mag
-                    velocities[c.id]["y"] *= 10.0 / v_mag
-                
-                coords[c.id]["x"] += velocities[c.id]["x"]
-                coords[c.id]["y"] += velocities[c.id]["y"]
-        
-        return coords
-
-    def generate(self, circuit: Circuit, output_file: str):
+        pieces.append(content[idx:])
+        return "".join(pieces)
+
+    def _place_footprint(self, content: str, ref: str, x: float, y: float) -> str:
+        """Define referência, posição (at) e UUID do footprint."""
+        edits = []  # (início, fim, texto novo), aplicadas de trás para frente
+        at_span, layer_end = None, None
+        for name, start, end in sexpr.iter_lists(content, ("at", "layer", "property", "fp_text"), depth=2):
+            if name == "at" and at_span is None:
+                at_span = (start, end)
+            elif name == "layer" and layer_end is None:
+                layer_end = end
+            elif name in ("property", "fp_text"):
+                node = sexpr.parse(content, max_depth=1, start=start)
+                # (property "Reference" "REF**" ...) ou, em bibliotecas antigas, (fp_text reference "REF**" ...)
+                if len(node) > 2 and node[1] in ("Reference", "reference"):
+                    node[2] = sexpr.QuotedString(ref)
+                    edits.append((start, end, sexpr.dumps(node)))
+
+        at_text = f"(at {sexpr.format_number(x)} {sexpr.format_number(y)})"
+        uuid_text = f" (uuid {str(uuid.uuid4())})"
+        if at_span:
+            edits.append((at_span[0], at_span[1], at_text))
+        if layer_end is not None:
+            edits.append((layer_end, layer_end, uuid_text if at_span else f"{uuid_text} {at_text}"))
+        elif not at_span:
+            # Sem (layer ...): insere logo após o nome do footprint
+            name_end = content.find('"', content.find('"') + 1) + 1
+            edits.append((name_end, name_end, f" {at_text}"))
+
+        for start, end, text in sorted(edits, reverse=True):
+            content = content[:start] + text + content[end:]
+        return content
+
+    def _resolve_footprint(self, comp):
+        """(nome, conteúdo) do footprint do componente; nome None quando cai no fallback."""
+        fp_name = comp.footprint or comp.library_ref
+        fp_content = self.db.get_footprint_content(fp_name)
+        if not fp_content:
+            sugg = self.db.get_suggested_footprints(comp.library_ref)
+            if sugg:
+                fp_name = sugg[0]
+                fp_content = self.db.get_footprint_content(fp_name)
+        if not fp_content:
+            return None, self.FALLBACK_FOOTPRINT.format(ref=comp.id, val=comp.value)
+        return fp_name, fp_content
+
+    def _run_physics_sim(self, components, nets, seed: int, starts: int = 1, extents=None):
+        """
+        Simulação de grafos de força para posicionar componentes (ver placement.ForcePlacer).
+        Com starts > 1 roda seed, seed+1, ... em paralelo e fica com o melhor layout, que depois
+        é legalizado (placement.legalize): nenhuma courtyard sobreposta, posições na grade.
+        Retorna as posições (n, 2) na ordem de `components` e as estatísticas da simulação.
+        """
+        problem = PlacementProblem.from_circuit(components, nets, extents)
+        positions, info = self.placer.place_best(problem, [seed + k for k in range(starts)], self.workers)
+        positions, info["legalize"] = legalize(positions, problem.extents, self.clearance, self.grid)
+        return positions, info
+
+    def place(self, circuit: Circuit, seed: int = None, starts: int = 1) -> BoardLayout:
+        """
+        Posiciona os footprints sem escrever nada em disco: devolve o BoardLayout que a validação
+        (DesignValidator.validate_layout) usa direto. `seed` fixa as posições iniciais: sem ela
+        é sorteada uma, guardada em layout.info["seed"] para reproduzir o mesmo board. `starts`
+        > 1 ativa o multi-start: várias seeds em paralelo, vence o menor HPWL + sobreposição
+        (os scores de cada seed ficam em layout.info["starts"]).
+        """
+        # Footprints e suas caixas (courtyard) para o posicionamento
+        fp_names = [self._resolve_footprint(comp)[0] for comp in circuit.components]
+        extents = {comp.id: (self.db.get_footprint_extent(name) if name else None) or self.FALLBACK_EXTENT
+                   for comp, name in zip(circuit.components, fp_names)}
+
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % 2**32)
+        positions, info = self._run_physics_sim(circuit.components, circuit.nets, seed, starts, extents)
+        return BoardLayout([c.id for c in circuit.components], positions,
+                           extents=[extents[c.id] for c in circuit.components], footprints=fp_names, info=info)
+
+    def generate(self, circuit: Circuit, output_file: str, seed: int = None, starts: int = 1,
+                 layout: BoardLayout = None):
+        """
+        Gera o .kicad_pcb. Com `layout` (o de place, já validado) escreve exatamente esse board;
+        sem ele faz um novo posicionamento (ver place: `seed` e `starts`). A seed usada e os
+        scores do multi-start voltam em layout_data["placement"].
+        """
         # 1. Map Nets
         net_names = sorted(list(set(net.name for net in circuit.nets)))
         net_map = {name: i+1 for i, name in enumerate(net_names)}
         nets_data = [{"id": i+1, "name": name} for i, name in enumerate(net_names)]
 
-        # 2. Physics Simulation
-        final_coords = self._run_physics_sim(circuit.components, circuit.nets)
+        # 2-3. Footprints + Physics Simulation
+        if layout is None:
+            layout = self.place(circuit, seed, starts)
+        elif layout.refs != [c.id for c in circuit.components]:
+            raise ValueError("O layout não corresponde aos componentes do circuito.")
+        resolved = {comp.id: self._resolve_footprint(comp) for comp in circuit.components}
 
-        # 3. Prepare Footprints
+        # 4. Prepare Footprints
         footprints_data = []
-        min_x, min_y = 1000, 1000
-        max_x, max_y = -1000, -1000
-
-        for comp in circuit.components:
-            pos = final_coords[comp.id]
-            x, y = pos["x"], pos["y"]
-            
-            min_x = min(min_x, x); max_x = max(max_x, x)
-            min_y = min(min_y, y); max_y = max(max_y, y)
-
-            fp_content = self.db.get_footprint_content(comp.footprint or comp.library_ref)
-            if not fp_content:
-                sugg = self.db.get_suggested_footprints(comp.library_ref)
-                if sugg: fp_content = self.db.get_footprint_content(sugg[0])
-            if not fp_content:
-                fp_content = self.FALLBACK_FOOTPRINT.format(ref=comp.id, val=comp.value)
-            
+        for comp, (x, y) in zip(circuit.components, layout.positions):
+            fp_content = resolved[comp.id][1]
             final_content = self._inject_nets_into_footprint(fp_content, comp.id, comp.connections, net_map)
             
-            # Atualizar posição e UUID
-            final_content = re.sub(r'\(at\s+[-\d\.]+\s+[-\d\.]+\s*([-\d\.]*)\)', f'(at {x} {y} \\1)', final_content, count=1)
-            final_content = re.sub(r'\(layer\s+"[^"]+"\)', f'\\g<0> (uuid {str(uuid.uuid4())})', final_content, count=1)
+            # Atualizar referência, posição e UUID
+            final_content = self._place_footprint(final_content, comp.id, float(x), float(y))
 
             footprints_data.append({"content": final_content})
 
-        # 4. Geometry (Edge.Cuts)
-        margin = 15
-        b_x1, b_y1 = min_x - margin, min_y - margin
-        b_x2, b_y2 = max_x + margin, max_y + margin
-        
-        # Garantir tamanho mínimo (50x50 mm)
-        if (b_x2 - b_x1) < 50:
-            diff = 50 - (b_x2 - b_x1)
-            b_x1 -= diff/2; b_x2 += diff/2
-        if (b_y2 - b_y1) < 50:
-            diff = 50 - (b_y2 - b_y1)
-            b_y1 -= diff/2; b_y2 += diff/2
-
+        # 5. Geometry (Edge.Cuts)
+        b_x1, b_y1, b_x2, b_y2 = self._board_outline(layout)
         drawings = [
             f'(gr_line (start {b_x1} {b_y1}) (end {b_x2} {b_y1}) (layer "Edge.Cuts") (width 0.15))',
             f'(gr_line (start {b_x2} {b_y1}) (end {b_x2} {b_y2}) (layer "Edge.Cuts") (width 0.15))',
@@ -200,12 +177,41 @@ class PCBGenerator:
         with open(output_file, "w", encoding="utf-8") as f:
             f.write(content)
             
-        # Return layout data for visualization
-        layout_data = {
-            "components": [{ "id": c.id, "x": final_coords[c.id]["x"], "y": final_coords[c.id]["y"], "type": c.type } for c in circuit.components],
-            "board": { "x": b_x1, "y": b_y1, "width": b_x2 - b_x1, "height": b_y2 - b_y1 }
+        return output_file, self.layout_data(circuit, layout)
+
+    def _board_outline(self, layout: BoardLayout):
+        """(x1, y1, x2, y2) do Edge.Cuts: 15 mm em volta dos componentes, no mínimo 50x50 mm."""
+        min_x, min_y = 1000, 1000
+        max_x, max_y = -1000, -1000
+        for x, y in layout.positions:
+            min_x = min(min_x, float(x)); max_x = max(max_x, float(x))
+            min_y = min(min_y, float(y)); max_y = max(max_y, float(y))
+
+        margin = 15
+        b_x1, b_y1 = min_x - margin, min_y - margin
+        b_x2, b_y2 = max_x + margin, max_y + margin
+        
+        # Garantir tamanho mínimo (50x50 mm)
+        if (b_x2 - b_x1) < 50:
+            diff = 50 - (b_x2 - b_x1)
+            b_x1 -= diff/2; b_x2 += diff/2
+        if (b_y2 - b_y1) < 50:
+            diff = 50 - (b_y2 - b_y1)
+            b_y1 -= diff/2; b_y2 += diff/2
+        return b_x1, b_y1, b_x2, b_y2
+
+    def layout_data(self, circuit: Circuit, layout: BoardLayout) -> dict:
+        """
+        Resumo do layout para o canvas e os exportadores (IPC-356): posição e footprint de cada
+        componente, contorno do board e estatísticas do posicionamento. Não escreve nada.
+        """
+        b_x1, b_y1, b_x2, b_y2 = self._board_outline(layout)
+        return {
+            "components": [{ "id": c.id, "x": float(x), "y": float(y), "type": c.type, "footprint": fp }
+                           for c, (x, y), fp in zip(circuit.components, layout.positions, layout.footprints)],
+            "board": { "x": b_x1, "y": b_y1, "width": b_x2 - b_x1, "height": b_y2 - b_y1 },
+            "placement": layout.info
         }
-        return output_file, layout_data
 
 if __name__ == "__main__":
     from src.models.circuit import Circuit, Component, Net, PinConnection
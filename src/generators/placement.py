@@ -0,0 +1,580 @@
+"""
+Motor de posicionamento por forças (force-directed) usado pelo PCBGenerator.
+
+Posições, velocidades e forças são arrays NumPy (n, 2). A repulsão entre todos os pares
+é calculada com broadcasting; acima de `barnes_hut_threshold` componentes ela passa a
+usar uma aproximação hierárquica do tipo Barnes–Hut, montada nível a nível sobre uma
+grade quadtree implícita (sem árvore de objetos Python).
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Caixa (min_x, min_y, max_x, max_y) em mm de um componente sem geometria conhecida
+DEFAULT_EXTENT = (-1.0, -1.0, 1.0, 1.0)
+
+
+class PlacementProblem:
+    """
+    Netlist reduzida ao que o placer precisa: ids dos componentes, os membros de cada net
+    (índices, com repetição quando o componente tem vários pinos na net), a carga de
+    repulsão e a caixa (courtyard) de cada componente relativa à sua origem.
+    """
+    def __init__(self, ids: List[str], nets: List[np.ndarray], charges: Optional[np.ndarray] = None,
+                 extents: Optional[np.ndarray] = None):
+        self.ids = list(ids)
+        self.index = {cid: i for i, cid in enumerate(self.ids)}
+        self.nets = nets
+        self.charges = np.ones(len(self.ids)) if charges is None else np.asarray(charges, dtype=float)
+        self.extents = (np.tile(DEFAULT_EXTENT, (len(self.ids), 1)) if extents is None
+                        else np.asarray(extents, dtype=float).reshape(len(self.ids), 4))
+
+    @classmethod
+    def from_circuit(cls, components, nets, extents: Optional[Dict[str, Tuple]] = None) -> "PlacementProblem":
+        """extents: caixa de cada componente por id (ComponentDB.get_footprint_extent)."""
+        ids = [c.id for c in components]
+        index = {cid: i for i, cid in enumerate(ids)}
+        members = []
+        for net in nets:
+            # Nós que apontam para componentes inexistentes são ignorados
+            idx = [index[n.split(":")[0]] for n in net.nodes if n.split(":")[0] in index]
+            if len(idx) > 1:
+                members.append(np.array(idx, dtype=np.int64))
+        extents = extents or {}
+        return cls(ids, members, extents=[extents.get(cid) or DEFAULT_EXTENT for cid in ids])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def hpwl(problem: PlacementProblem, pos: np.ndarray) -> float:
+    """Wirelength por semi-perímetro: soma, em todas as nets, da meia volta da caixa dos membros."""
+    if not problem.nets:
+        return 0.0
+    members = np.concatenate(problem.nets)
+    starts = np.cumsum([0] + [len(m) for m in problem.nets[:-1]])
+    total = 0.0
+    for axis in (0, 1):
+        coord = pos[members, axis]
+        total += float((np.maximum.reduceat(coord, starts) - np.minimum.reduceat(coord, starts)).sum())
+    return total
+
+
+def overlap_area(problem: PlacementProblem, pos: np.ndarray, chunk: int = 256) -> float:
+    """Soma das áreas de sobreposição (mm²) entre as caixas de todos os pares de componentes."""
+    boxes = np.concatenate([pos, pos], axis=1) + problem.extents
+    total = 0.0
+    for start in range(0, len(boxes), chunk):
+        block = boxes[start:start + chunk]
+        w = np.minimum(block[:, None, 2], boxes[None, :, 2]) - np.maximum(block[:, None, 0], boxes[None, :, 0])
+        h = np.minimum(block[:, None, 3], boxes[None, :, 3]) - np.maximum(block[:, None, 1], boxes[None, :, 1])
+        # Só pares i < j: cada sobreposição conta uma vez e a caixa não sobrepõe a si mesma
+        area = np.triu(np.clip(w, 0, None) * np.clip(h, 0, None), k=start + 1)
+        total += float(area.sum())
+    return total
+
+
+def _coarsen(problem: PlacementProblem, cluster: np.ndarray, count: int) -> PlacementProblem:
+    """Problema agrupado: carga somada e caixa quadrada com a área somada de cada grupo."""
+    nets = [cluster[m] for m in problem.nets]
+    nets = [m for m in nets if (m != m[0]).any()]
+    ext = problem.extents
+    area = np.bincount(cluster, weights=(ext[:, 2] - ext[:, 0]) * (ext[:, 3] - ext[:, 1]), minlength=count)
+    half = np.sqrt(area) / 2
+    return PlacementProblem([str(k) for k in range(count)], nets,
+                            charges=np.bincount(cluster, weights=problem.charges, minlength=count),
+                            extents=np.stack([-half, -half, half, half], axis=1))
+
+
+def _nearest_free(occ: np.ndarray, cell0: np.ndarray, size: np.ndarray, target: np.ndarray,
+                  radius: int) -> Optional[np.ndarray]:
+    """
+    Deslocamento de grade (dx, dy) livre mais próximo de `target` (em passos de grade, relativo
+    a `cell0`) numa janela de `radius` passos: a caixa de `size` células com canto em
+    cell0 + 2 * (dx, dy) não pode tocar nenhuma célula ocupada. None se não há vaga na janela.
+    """
+    lo = np.maximum(cell0 - 2 * radius, 0)
+    lo += (cell0 - lo) % 2  # o canto da janela cai num ponto da grade
+    hi = np.minimum(cell0 + 2 * radius + size, occ.shape)
+    if (hi - lo < size).any():
+        return None
+    window = occ[lo[0]:hi[0], lo[1]:hi[1]]
+    # Soma das células ocupadas sob a caixa em cada canto possível (tabela de somas acumuladas)
+    sat = np.zeros((window.shape[0] + 1, window.shape[1] + 1), dtype=np.int32)
+    sat[1:, 1:] = window.cumsum(0, dtype=np.int32).cumsum(1)
+    w, h = size
+    used = sat[w:, h:] - sat[:-w, h:] - sat[w:, :-h] + sat[:-w, :-h]
+    free = np.argwhere(used[::2, ::2] == 0)
+    if not len(free):
+        return None
+    steps = free + (lo - cell0) // 2
+    return steps[np.argmin(((steps - target) ** 2).sum(axis=1))]
+
+
+def legalize(pos: np.ndarray, extents: np.ndarray, clearance: float = 0.25,
+             grid: float = 0.5) -> Tuple[np.ndarray, dict]:
+    """
+    Remove as sobreposições: cada componente vai para o ponto livre da grade `grid` (mm) mais
+    próximo da posição da simulação, com as caixas (courtyard) separadas por `clearance`.
+    As caixas são arredondadas para fora em meias células da grade e rasterizadas num mapa de
+    ocupação; os maiores são posicionados primeiro e cada vaga é achada numa janela em volta
+    do alvo com uma tabela de somas acumuladas, sem teste par a par. Devolve as novas posições
+    e um dict com moved (quantos saíram do ponto da grade mais próximo) e max_displacement (mm).
+    """
+    pos = np.asarray(pos, dtype=float)
+    if not len(pos):
+        return pos.copy(), {"moved": 0, "max_displacement": 0.0}
+    cell = grid / 2
+    half = clearance / 2
+    boxes = np.asarray(extents, dtype=float) + (-half, -half, half, half)
+    box_lo = np.floor(boxes[:, :2] / cell + 1e-9).astype(np.int64)
+    size = np.ceil(boxes[:, 2:] / cell - 1e-9).astype(np.int64) - box_lo
+    target = pos / grid
+    snapped = np.round(target).astype(np.int64)
+
+    # Mapa com folga em volta dos alvos para caber todo mundo, mesmo se estiverem empilhados
+    margin = int(np.sqrt(size.prod(axis=1).sum())) + int(size.max()) + 2
+    corner = 2 * snapped + box_lo
+    origin = corner.min(axis=0) - margin
+    occ = np.zeros(tuple((corner + size).max(axis=0) + margin - origin), dtype=bool)
+
+    out = np.empty_like(pos)
+    moved = 0
+    for i in np.argsort(-size.prod(axis=1), kind="stable"):
+        cell0 = corner[i] - origin
+        w, h = size[i]
+        step = np.zeros(2, dtype=np.int64)
+        if occ[cell0[0]:cell0[0] + w, cell0[1]:cell0[1] + h].any():
+            goal = target[i] - snapped[i]
+            radius = 4
+            while True:
+                step = _nearest_free(occ, cell0, size[i], goal, radius)
+                if step is not None:
+                    # Uma vaga fora da janela poderia estar mais perto: confere com a janela maior
+                    reach = int(np.ceil(np.hypot(*(step - goal)))) + 1
+                    if reach <= radius:
+                        break
+                    step = _nearest_free(occ, cell0, size[i], goal, reach)
+                    break
+                if 2 * radius > max(occ.shape):
+                    raise RuntimeError("legalize: sem espaço livre no mapa de ocupação")
+                radius *= 2
+            moved += 1
+        x0, y0 = cell0 + 2 * step
+        occ[x0:x0 + w, y0:y0 + h] = True
+        out[i] = (snapped[i] + step) * grid
+
+    return out, {"moved": moved, "max_displacement": float(np.hypot(*(out - pos).T).max())}
+
+
+class BoardLayout:
+    """
+    Resultado do posicionamento que o PCBGenerator entrega à validação e à escrita do board:
+    ref, posição (mm), rotação (graus) e caixa (courtyard, relativa à origem) de cada
+    footprint, na ordem dos componentes, mais o nome do footprint e as estatísticas do placer.
+    """
+    def __init__(self, refs: List[str], positions: np.ndarray, extents: Optional[np.ndarray] = None,
+                 rotations: Optional[np.ndarray] = None, footprints: Optional[List[Optional[str]]] = None,
+                 info: Optional[dict] = None):
+        self.refs = list(refs)
+        self.index = {ref: i for i, ref in enumerate(self.refs)}
+        n = len(self.refs)
+        self.positions = np.asarray(positions, dtype=float).reshape(n, 2)
+        self.extents = (np.tile(DEFAULT_EXTENT, (n, 1)) if extents is None
+                        else np.asarray(extents, dtype=float).reshape(n, 4))
+        self.rotations = np.zeros(n) if rotations is None else np.asarray(rotations, dtype=float)
+        self.footprints = list(footprints) if footprints is not None else [None] * n
+        self.info = info or {}
+
+    def __len__(self):
+        return len(self.refs)
+
+    def boxes(self) -> np.ndarray:
+        """Caixas absolutas (n, 4) min_x, min_y, max_x, max_y, já com a rotação de cada footprint."""
+        rad = np.radians(self.rotations)
+        c, s = np.cos(rad), np.sin(rad)
+        ext = self.extents
+        # Cantos da caixa girados; a caixa absoluta é a envolvente deles
+        xs = np.stack([ext[:, 0], ext[:, 2], ext[:, 2], ext[:, 0]], axis=1)
+        ys = np.stack([ext[:, 1], ext[:, 1], ext[:, 3], ext[:, 3]], axis=1)
+        # Y do KiCad cresce para baixo: rotação positiva é anti-horária na tela
+        rx = xs * c[:, None] + ys * s[:, None]
+        ry = -xs * s[:, None] + ys * c[:, None]
+        boxes = np.stack([rx.min(axis=1), ry.min(axis=1), rx.max(axis=1), ry.max(axis=1)], axis=1)
+        return boxes + np.concatenate([self.positions, self.positions], axis=1)
+
+
+def _place_job(job):
+    """Executado nos processos de trabalho do multi-start."""
+    placer, problem, seed = job
+    t0 = time.perf_counter()
+    pos, info = placer.place(problem, seed=seed)
+    wirelength, overlap = hpwl(problem, pos), overlap_area(problem, pos)
+    return pos, dict(info, seed=seed, hpwl=wirelength, overlap=overlap,
+                     score=wirelength + placer.overlap_weight * overlap, seconds=time.perf_counter() - t0)
+
+
+class ForcePlacer:
+    """
+    Simulação de forças: repulsão ~ 1/d² entre todos os componentes e molas entre os
+    componentes de cada net. Nets com até `clique_threshold` pinos viram um clique (um par
+    para cada par de pinos, peso 2); nets maiores (GND, 3V3...) usam o modelo estrela: cada
+    pino é puxado para o centroide da net com peso `star_weight`, custo linear no número de
+    pinos e sem que a net domine o layout.
+
+    A simulação para antes de `max_iterations` quando convergiu: o maior deslocamento do
+    passo ficou abaixo de `displacement_tol` (mm) ou a energia cinética caiu abaixo de
+    `energy_ratio` vezes o pico da simulação. O critério é relativo porque grupos sem
+    ligação entre si continuam se afastando devagar para sempre (a repulsão nunca zera).
+
+    Nas nets grandes, cada passivo de até 2 pinos (capacitor de desacoplamento, pull-up...)
+    ganha uma mola de âncora (`anchor_weight`) até um CI da net, distribuídos pelos pinos
+    que cada CI tem nela: assim os capacitores ficam junto dos seus CIs.
+
+    Acima de `multilevel_threshold` componentes o posicionamento é multinível: a netlist é
+    agrupada por conectividade (heavy-edge matching) até `coarse_size` grupos, os grupos são
+    posicionados e depois desagrupados nível a nível, com `refine_iterations` de refino local.
+    """
+    def __init__(self, max_iterations: int = 80, repulsion: float = 600.0, attraction: float = 0.08,
+                 damping: float = 0.85, max_step: float = 10.0, barnes_hut_threshold: int = 500,
+                 leaf_size: int = 8, clique_threshold: int = 16, star_weight: float = 2.0,
+                 displacement_tol: float = 0.05, energy_ratio: float = 1e-2, overlap_weight: float = 10.0,
+                 anchor_weight: float = 8.0, multilevel_threshold: int = 300, coarse_size: int = 100,
+                 refine_iterations: int = 20, max_group: int = 4):
+        self.max_iterations = max_iterations
+        self.repulsion = repulsion
+        self.attraction = attraction
+        self.damping = damping
+        self.max_step = max_step
+        self.barnes_hut_threshold = barnes_hut_threshold
+        self.leaf_size = leaf_size
+        self.clique_threshold = clique_threshold
+        self.star_weight = star_weight
+        self.displacement_tol = displacement_tol
+        self.energy_ratio = energy_ratio
+        self.overlap_weight = overlap_weight
+        self.anchor_weight = anchor_weight
+        self.multilevel_threshold = multilevel_threshold
+        self.coarse_size = coarse_size
+        self.refine_iterations = refine_iterations
+        self.max_group = max_group
+
+    def place(self, problem: PlacementProblem, positions: Optional[np.ndarray] = None,
+              seed: Optional[int] = None) -> Tuple[np.ndarray, dict]:
+        """
+        Roda a simulação e devolve as posições finais (n, 2) na ordem de problem.ids e um dict
+        com iterations, energy (energia cinética final) e converged. Sem `positions`, as posições
+        iniciais são sorteadas com `seed`: a mesma seed gera sempre o mesmo layout.
+        """
+        n = len(problem)
+        rng = np.random.default_rng(seed)
+        anchors = self._power_anchors(problem)
+        if positions is None and n > self.multilevel_threshold:
+            return self._place_multilevel(problem, anchors, rng)
+        if positions is None:
+            positions = rng.uniform(50, 150, size=(n, 2))
+        return self._simulate(problem, np.array(positions, dtype=float), anchors, self.max_iterations)
+
+    def _simulate(self, problem: PlacementProblem, pos: np.ndarray, anchors: np.ndarray,
+                  max_iterations: int) -> Tuple[np.ndarray, dict]:
+        n = len(problem)
+        info = {"iterations": 0, "energy": 0.0, "converged": True}
+        if n == 0:
+            return pos, info
+        vel = np.zeros_like(pos)
+        i, j, weight = self._clique_springs(problem)
+        springs = (np.concatenate([i, anchors[:, 0]]), np.concatenate([j, anchors[:, 1]]),
+                   np.concatenate([weight, np.full(len(anchors), self.anchor_weight)]))
+        stars = self._star_pins(problem)
+
+        info["converged"] = False
+        peak = 0.0
+        for iteration in range(1, max_iterations + 1):
+            forces = (self.repulsion_forces(pos, problem.charges) + self._spring_forces(pos, *springs)
+                      + self._star_forces(pos, *stars))
+            vel = (vel + forces) * self.damping
+            # Limite de velocidade para evitar "explosões"
+            speed = np.hypot(vel[:, 0], vel[:, 1])
+            too_fast = speed > self.max_step
+            vel[too_fast] *= (self.max_step / speed[too_fast])[:, None]
+            speed = np.minimum(speed, self.max_step)
+            pos += vel
+
+            energy = 0.5 * float(np.dot(speed, speed))
+            peak = max(peak, energy)
+            info.update(iterations=iteration, energy=energy)
+            if speed.max() < self.displacement_tol or energy < self.energy_ratio * peak:
+                info["converged"] = True
+                break
+        return pos, info
+
+    def _place_multilevel(self, problem: PlacementProblem, anchors: np.ndarray,
+                          rng: np.random.Generator) -> Tuple[np.ndarray, dict]:
+        # Agrupamento: cada nível guarda (problema, âncoras, grupo de cada componente no nível acima)
+        levels = [(problem, anchors)]
+        clusters = []
+        while len(levels[-1][0]) > self.coarse_size:
+            fine, fine_anchors = levels[-1]
+            cluster, count = self._heavy_edge_matching(fine, fine_anchors)
+            if count > 0.9 * len(fine):
+                break  # quase nada para agrupar: não compensa mais um nível
+            coarse_anchors = cluster[fine_anchors]
+            coarse_anchors = coarse_anchors[coarse_anchors[:, 0] != coarse_anchors[:, 1]]
+            levels.append((_coarsen(fine, cluster, count), coarse_anchors))
+            clusters.append(cluster)
+
+        coarse, coarse_anchors = levels[-1]
+        pos, info = self._simulate(coarse, rng.uniform(50, 150, size=(len(coarse), 2)),
+                                   coarse_anchors, self.max_iterations)
+        iterations = info["iterations"]
+        # Desagrupamento: os membros nascem em volta do grupo e só precisam de refino local
+        for (fine, fine_anchors), cluster in zip(reversed(levels[:-1]), reversed(clusters)):
+            pos = pos[cluster] + rng.normal(0.0, 0.5, size=(len(fine), 2))
+            pos, info = self._simulate(fine, pos, fine_anchors, self.refine_iterations)
+            iterations += info["iterations"]
+        return pos, dict(info, iterations=iterations, levels=len(levels))
+
+    def place_best(self, problem: PlacementProblem, seeds: Sequence[int],
+                   workers: Optional[int] = None) -> Tuple[np.ndarray, dict]:
+        """
+        Multi-start: roda uma simulação por seed (em paralelo num pool de processos quando há
+        mais de uma) e fica com a de menor score = HPWL + overlap_weight * área sobreposta.
+        O dict devolvido é o da melhor execução mais `starts` (seed, score, hpwl, overlap,
+        iterations e seconds de cada uma) e `seconds` (tempo de parede total).
+        """
+        t0 = time.perf_counter()
+        jobs = [(self, problem, seed) for seed in seeds]
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_place_job, jobs))
+        else:
+            results = [_place_job(job) for job in jobs]
+
+        pos, best = min(results, key=lambda result: result[1]["score"])
+        starts = [{key: info[key] for key in ("seed", "score", "hpwl", "overlap", "iterations", "seconds")}
+                  for _, info in results]
+        return pos, dict(best, starts=starts, seconds=time.perf_counter() - t0)
+
+    # --- Atração ---------------------------------------------------------------------
+
+    def _power_anchors(self, problem: PlacementProblem) -> np.ndarray:
+        """Pares (passivo, CI) das nets grandes, um por passivo (m, 2)."""
+        n = len(problem)
+        pins = np.bincount(np.concatenate(problem.nets), minlength=n) if problem.nets else np.zeros(n, dtype=np.int64)
+        anchored = np.zeros(n, dtype=bool)
+        pairs = []
+        for members in problem.nets:
+            if len(members) <= self.clique_threshold:
+                continue
+            uniq, count = np.unique(members, return_counts=True)
+            is_hub = pins[uniq] > 2
+            # Uma vaga por pino do CI na net: um CI com 4 pinos de VDD recebe 4 capacitores
+            slots = np.repeat(uniq[is_hub], count[is_hub])
+            if not len(slots):
+                continue
+            passives = uniq[~is_hub & ~anchored[uniq]]
+            anchored[passives] = True
+            pairs.extend(zip(passives, slots[np.arange(len(passives)) % len(slots)]))
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+    def _heavy_edge_matching(self, problem: PlacementProblem, anchors: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Agrupa cada componente com o vizinho de ligação mais forte (peso / (carga_i * carga_j),
+        para os grupos crescerem por igual), em grupos de até `max_group` componentes. Nets
+        pequenas valem 1/(k-1) por par; nets grandes só contam pelas âncoras. Devolve o grupo
+        de cada componente e o número de grupos.
+        """
+        n = len(problem)
+        left, right, weight = [anchors[:, 0]], [anchors[:, 1]], [np.ones(len(anchors))]
+        for members in problem.nets:
+            if len(members) <= self.clique_threshold:
+                a, b = np.triu_indices(len(members), k=1)
+                left.append(members[a])
+                right.append(members[b])
+                weight.append(np.full(len(a), 1.0 / (len(members) - 1)))
+        i, j, weight = np.concatenate(left), np.concatenate(right), np.concatenate(weight)
+        keep = i != j
+        i, j, weight = i[keep], j[keep], weight[keep]
+
+        key = np.minimum(i, j) * n + np.maximum(i, j)
+        key, inverse = np.unique(key, return_inverse=True)
+        weight = np.bincount(inverse, weights=weight)
+        a, b = key // n, key % n
+        rating = weight / (problem.charges[a] * problem.charges[b])
+
+        cluster = np.full(n, -1, dtype=np.int64)
+        size = []
+        count = 0
+        for k in np.argsort(-rating, kind="stable"):
+            u, v = a[k], b[k]
+            if cluster[u] < 0 and cluster[v] < 0:
+                cluster[u] = cluster[v] = count
+                size.append(2)
+                count += 1
+            elif (cluster[u] < 0) != (cluster[v] < 0):
+                # Em estrelas (um CI e seus passivos) o emparelhamento puro quase não agrupa:
+                # o componente solto entra no grupo do vizinho enquanto ele for pequeno
+                free, group = (u, cluster[v]) if cluster[u] < 0 else (v, cluster[u])
+                if size[group] < self.max_group:
+                    cluster[free] = group
+                    size[group] += 1
+        single = cluster < 0
+        cluster[single] = np.arange(count, count + int(single.sum()))
+        return cluster, count + int(single.sum())
+
+    def _clique_springs(self, problem: PlacementProblem):
+        """Arrays (i, j, peso) com um par por par de pinos de cada net pequena."""
+        left, right = [], []
+        for members in problem.nets:
+            if len(members) > self.clique_threshold:
+                continue
+            a, b = np.triu_indices(len(members), k=1)
+            left.append(members[a])
+            right.append(members[b])
+        if not left:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        i, j = np.concatenate(left), np.concatenate(right)
+        keep = i != j
+        return i[keep], j[keep], np.full(int(keep.sum()), 2.0)
+
+    def _spring_forces(self, pos: np.ndarray, i: np.ndarray, j: np.ndarray, weight: np.ndarray) -> np.ndarray:
+        n = len(pos)
+        forces = np.zeros_like(pos)
+        if len(i) == 0:
+            return forces
+        pull = (pos[i] - pos[j]) * (self.attraction * weight)[:, None]
+        for axis in (0, 1):
+            forces[:, axis] = (np.bincount(j, weights=pull[:, axis], minlength=n)
+                               - np.bincount(i, weights=pull[:, axis], minlength=n))
+        return forces
+
+    def _star_pins(self, problem: PlacementProblem):
+        """Arrays (componente, net) com uma entrada por pino das nets grandes."""
+        big = [members for members in problem.nets if len(members) > self.clique_threshold]
+        if not big:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return (np.concatenate(big),
+                np.repeat(np.arange(len(big)), [len(members) for members in big]))
+
+    def _star_forces(self, pos: np.ndarray, node: np.ndarray, net: np.ndarray) -> np.ndarray:
+        n = len(pos)
+        forces = np.zeros_like(pos)
+        if len(node) == 0:
+            return forces
+        pins_per_net = np.bincount(net)
+        for axis in (0, 1):
+            centroid = np.bincount(net, weights=pos[node, axis]) / pins_per_net
+            pull = (centroid[net] - pos[node, axis]) * (self.attraction * self.star_weight)
+            forces[:, axis] = np.bincount(node, weights=pull, minlength=n)
+        return forces
+
+    # --- Repulsão --------------------------------------------------------------------
+
+    def repulsion_forces(self, pos: np.ndarray, charges: np.ndarray) -> np.ndarray:
+        if len(pos) > self.barnes_hut_threshold:
+            return self._barnes_hut_repulsion(pos, charges)
+        return self._exact_repulsion(pos, charges)
+
+    def _exact_repulsion(self, pos: np.ndarray, charges: np.ndarray) -> np.ndarray:
+        """Todos os pares de uma vez: O(n²) em memória e tempo, mas sem laço Python."""
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist_sq = np.einsum("ijk,ijk->ij", delta, delta) + 0.1
+        # repulsion * qi * qj / d², na direção do vetor unitário (a diagonal tem delta = 0)
+        scale = self.repulsion * np.outer(charges, charges) / (dist_sq * np.sqrt(dist_sq))
+        return np.einsum("ij,ijk->ik", scale, delta)
+
+    def _pair_forces(self, pos, charges, body, other_pos, other_charge, minlength):
+        delta = pos[body] - other_pos
+        dist_sq = np.einsum("ij,ij->i", delta, delta) + 0.1
+        scale = self.repulsion * charges[body] * other_charge / (dist_sq * np.sqrt(dist_sq))
+        return np.stack([np.bincount(body, weights=scale * delta[:, axis], minlength=minlength)
+                         for axis in (0, 1)], axis=1)
+
+    def _barnes_hut_repulsion(self, pos: np.ndarray, charges: np.ndarray) -> np.ndarray:
+        """
+        Repulsão aproximada em O(n log n). A área é dividida em grades 2^l x 2^l (os níveis
+        da quadtree). Em cada nível, cada componente interage com o centro de carga das células
+        que não são vizinhas da sua, mas cujas células-mãe são vizinhas da sua célula-mãe (as
+        mais distantes já foram cobertas em níveis mais grossos). No nível mais fino, os
+        componentes das 3x3 células vizinhas interagem diretamente.
+        """
+        n = len(pos)
+        levels = int(np.clip(np.ceil(np.log(max(n / self.leaf_size, 1.0)) / np.log(4)) + 1, 2, 10))
+        origin = pos.min(axis=0)
+        span = max(float((pos.max(axis=0) - origin).max()), 1e-9) * (1 + 1e-9)
+        rel = (pos - origin) / span
+        forces = np.zeros_like(pos)
+        body = np.arange(n)
+
+        # Lista de interação em relação à própria célula: filhos das 3x3 mães vizinhas que não
+        # são vizinhos da célula. Só depende da paridade da célula: 4 tabelas de 27 deslocamentos
+        far_offsets = np.array([[(dx - px, dy - py) for dx in range(-2, 4) for dy in range(-2, 4)
+                                 if max(abs(dx - px), abs(dy - py)) > 1]
+                                for px in (0, 1) for py in (0, 1)])
+        near_offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+        for level in range(2, levels + 1):
+            size = 1 << level
+            cell = np.minimum((rel * size).astype(np.int64), size - 1)
+            flat = cell[:, 0] * size + cell[:, 1]
+            mass = np.bincount(flat, weights=charges, minlength=size * size)
+            com = np.stack([np.bincount(flat, weights=charges * pos[:, axis], minlength=size * size)
+                            for axis in (0, 1)], axis=1)
+            occupied = mass > 0
+            com[occupied] /= mass[occupied, None]
+
+            offsets = far_offsets[(cell[:, 0] & 1) * 2 + (cell[:, 1] & 1)]
+            cand_x = cell[:, 0, None] + offsets[..., 0]
+            cand_y = cell[:, 1, None] + offsets[..., 1]
+            valid = (cand_x >= 0) & (cand_x < size) & (cand_y >= 0) & (cand_y < size)
+            rows, cols = np.nonzero(valid)
+            target = cand_x[rows, cols] * size + cand_y[rows, cols]
+            keep = occupied[target]
+            rows, target = rows[keep], target[keep]
+            forces += self._pair_forces(pos, charges, body[rows], com[target], mass[target], n)
+
+        # Campo próximo: pares diretos com os componentes das células vizinhas do nível mais fino
+        order = np.argsort(flat, kind="stable")
+        counts = np.bincount(flat, minlength=size * size)
+        starts = np.cumsum(counts) - counts
+        neigh = cell[:, None, :] + near_offsets[None, :, :]
+        inside = ((neigh >= 0) & (neigh < size)).all(axis=2)
+        neigh_flat = np.where(inside, neigh[..., 0] * size + neigh[..., 1], 0).ravel()
+        per_cell = np.where(inside.ravel(), counts[neigh_flat], 0)
+        pair_body = np.repeat(np.repeat(body, len(near_offsets)), per_cell)
+        within = np.arange(per_cell.sum()) - np.repeat(np.cumsum(per_cell) - per_cell, per_cell)
+        other = order[np.repeat(starts[neigh_flat], per_cell) + within]
+        # O próprio componente aparece na lista, mas com delta = 0 não gera força
+        forces += self._pair_forces(pos, charges, pair_body, pos[other], charges[other], n)
+        return forces
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m src.generators.placement 2000
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rng = np.random.default_rng(0)
+    nets = [rng.choice(n, size=rng.integers(2, 5), replace=False) for _ in range(n)]
+    nets.append(np.arange(0, n, 3))  # uma net de alimentação com 1/3 dos componentes
+    problem = PlacementProblem([f"U{i}" for i in range(n)], nets)
+    start = rng.uniform(50, 150, size=(n, 2))
+
+    placer = ForcePlacer()
+    exact, approx = placer._exact_repulsion(start, problem.charges), placer._barnes_hut_repulsion(start, problem.charges)
+    error = np.linalg.norm(exact - approx, axis=1).mean() / np.linalg.norm(exact, axis=1).mean()
+    print(f"{n} componentes: erro relativo médio do Barnes–Hut = {error:.2%}")
+    for label, options in (("broadcasting (exato)", dict(barnes_hut_threshold=n + 1)),
+                           ("Barnes–Hut", dict(barnes_hut_threshold=0)),
+                           ("multinível", dict(multilevel_threshold=0))):
+        placer = ForcePlacer(**options)
+        t0 = time.perf_counter()
+        pos, info = placer.place(problem, None if "multilevel_threshold" in options else start, seed=0)
+        print(f"{label:<24} {time.perf_counter() - t0:7.2f} s  ({info['iterations']} iterações, "
+              f"HPWL {hpwl(problem, pos):.0f})")
@@ -1,8 +1,8 @@
 import uuid
-import re
 from jinja2 import Environment, FileSystemLoader
 from src.models.circuit import Circuit
 from src.component_db import ComponentDB
+from src import sexpr
 from pathlib import Path
 
 class SchematicGenerator:
@@ -30,57 +30,55 @@ class SchematicGenerator:
     def __init__(self, template_path: str = "src/generators"):
         self.env = Environment(loader=FileSystemLoader(template_path))
         self.template = self.env.get_template("schematic_template.j2")
-        self.db = ComponentDB()
+        self.db = ComponentDB.shared()
+
+    # Gráficos e textos do símbolo: irrelevantes para a pinagem, não são materializados
+    GRAPHIC_HEADS = ("property", "rectangle", "polyline", "arc", "circle", "bezier", "text", "text_box")
 
     def _parse_pin_positions(self, symbol_content: str):
         """Extrai posições dos pinos para conectar os fios corretamente."""
         pins = {}
-        # Pattern para pegar (pin ... (at X Y R) ... (number "N" ...)
-        # Simplificado para pegar at e number
-        # Nota: pins podem estar em sub-unidades (symbol "Name_1_1" ...
-        
-        # Estratégia: Encontrar todos os blocos (pin ...) e extrair 'at' e 'number'
-        pin_blocks = re.finditer(r'\(pin\s+[^)]+\s+\(at\s+([-\d\.]+)\s+([-\d\.]+)\s+([-\d\.]+)\)', symbol_content)
-        
-        # Mapear posições por número de pino. 
-        # CUIDADO: O regex acima é frágil se houver quebra de linha dentro do (at
-        # Melhor iterar linha a linha ou usar blocos maiores, mas vamos tentar um regex mais guloso
-        
-        full_pins = re.findall(r'\(pin\s+.*?\)', symbol_content, re.DOTALL)
-        
-        for p_str in full_pins:
-            at_match = re.search(r'\(at\s+([-\d\.]+)\s+([-\d\.]+)\s+([-\d\.]+)\)', p_str)
-            num_match = re.search(r'\(number\s+"([^"]+)"', p_str)
-            
-            if at_match and num_match:
-                x, y, angle = map(float, at_match.groups())
-                num = num_match.group(1)
-                pins[num] = (x, y)
-                
+        # Os pinos podem estar em sub-unidades (symbol "Name_1_1" ...); walk desce por elas
+        tree = sexpr.parse(symbol_content, skip=self.GRAPHIC_HEADS)
+        for pin in sexpr.walk(tree, "pin"):
+            at = sexpr.find(pin, "at")
+            number = sexpr.find(pin, "number")
+            if at and number and len(at) >= 3 and len(number) >= 2:
+                pins[str(number[1])] = (float(at[1]), float(at[2]))
         return pins
 
+    def _resolve_symbol(self, library_ref: str):
+        """Conteúdo do símbolo e posições dos pinos (da tabela de pinos do DB, sem reparse)."""
+        # Tenta buscar no DB
+        sym_content = self.db.get_symbol_content(library_ref)
+        pin_offsets = self.db.get_pin_positions(library_ref) if sym_content else {}
+        if not sym_content:
+            sym_content = self.FALLBACK_SYMBOLS.get(library_ref)
+            # Símbolos embutidos não estão no índice: aí sim a pinagem vem do texto
+            pin_offsets = self._parse_pin_positions(sym_content) if sym_content else {}
+        
+        # Fallback de pinagem se falhar o parse ou não tiver conteúdo
+        if not pin_offsets:
+            pin_offsets = {"1": (0, -2.54), "2": (0, 2.54)} # Default vertical
+        return sym_content, pin_offsets
+
     def generate(self, circuit: Circuit, output_file: str):
         components_data = []
         comp_instances = {}
         used_symbols = {} # Map full_name -> content
 
+        resolved = {} # library_ref -> (conteúdo, pinagem): uma consulta por símbolo distinto
+
         # 1. Preparar Componentes
         for i, comp in enumerate(circuit.components):
             x, y = 100 + (i * 30), 100
             
-            # Tenta buscar no DB
-            sym_content = self.db.get_symbol_content(comp.library_ref)
-            if not sym_content:
-                sym_content = self.FALLBACK_SYMBOLS.get(comp.library_ref)
+            if comp.library_ref not in resolved:
+                resolved[comp.library_ref] = self._resolve_symbol(comp.library_ref)
+            sym_content, pin_offsets = resolved[comp.library_ref]
             
             if sym_content:
                 used_symbols[comp.library_ref] = sym_content
-            
-            # Descobrir pinagem para wires
-            pin_offsets = self._parse_pin_positions(sym_content) if sym_content else {}
-            # Fallback de pinagem se falhar o parse ou não tiver conteúdo
-            if not pin_offsets:
-                 pin_offsets = {"1": (0, -2.54), "2": (0, 2.54)} # Default vertical
 
             comp_info = {
                 "id": comp.id,
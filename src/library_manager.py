@@ -26,6 +26,27 @@ def clone_or_pull_repo(name, url):
         # Deep clone might be huge. Using depth=1 for speed and space saving.
         subprocess.run(["git", "clone", "--depth", "1", url, str(repo_path)], check=True)
 
+def get_head_commit(repo_path):
+    """Commit atual (HEAD) do repositório, ou None se a pasta não for um clone git."""
+    repo_path = Path(repo_path)
+    # Sem .git próprio, o git subiria até o repositório do KiFlow: não é o que queremos
+    if not (repo_path / ".git").exists():
+        return None
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_path,
+                            capture_output=True, text=True, check=False)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def changed_files(repo_path, old_commit, new_commit):
+    """
+    Arquivos alterados entre dois commits (caminhos relativos ao repositório).
+    Retorna None se o histórico não permitir o diff (ex.: clone raso sem o commit antigo).
+    """
+    result = subprocess.run(["git", "diff", "--name-only", "--no-renames", old_commit, new_commit],
+                            cwd=repo_path, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        return None
+    return [line for line in result.stdout.splitlines() if line]
+
 def main():
     setup_libs_dir()
     print("Starting library setup...")
@@ -0,0 +1,291 @@
+"""
+Servidor local que imita o /v1/chat/completions da OpenAI (com streaming SSE), para rodar e
+medir o pipeline inteiro sem rede nem GPU: LLM_BASE_URL=http://127.0.0.1:<porta>/v1.
+
+As respostas vêm, em ordem de prioridade:
+  1. de gravações: um diretório do ResponseCache (LLM_CACHE=read-write numa execução real).
+     A requisição é casada por modelo, mensagens, temperatura e response_format, ignorando o
+     base_url, então o que foi gravado contra a OpenAI é servido aqui;
+  2. de um roteiro: lista de textos servidos em ciclo (um por requisição);
+  3. do padrão: um circuito de LED em JSON para pedidos com response_format, um plano curto
+     em texto para os outros.
+
+O texto é mandado token a token (palavras, com o espaço que as segue). `ttft` é a espera até
+o primeiro token e `tokens_per_second` o ritmo dos seguintes. Falhas são injetadas por
+roteiro (`failures`: um código HTTP ou "drop" por requisição, na ordem; None passa) ou ao
+acaso (`failure_rate`, com `seed`). "drop" corta a conexão no meio do stream.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from src.parser.llm_cache import ResponseCache
+
+_TOKEN = re.compile(r"\s*\S+\s*|\s+")
+
+DEFAULT_PLAN = ("Arquitetura: um LED vermelho (D1) em série com um resistor de 220 ohms (R1) entre VCC e GND. "
+                "Nets: VCC, LED, GND. Bibliotecas: Device:R, Device:LED.")
+
+DEFAULT_CIRCUIT = {
+    "project_name": "Led Blink",
+    "description": "LED com resistor limitador de corrente",
+    "mermaid": "graph TD; VCC-->R1; R1-->D1; D1-->GND;",
+    "components": [
+        {"id": "R1", "type": "Resistor", "value": "220", "library_ref": "Device:R",
+         "footprint": "Resistor_SMD:R_0805_2012Metric",
+         "connections": [{"pin_number": "1", "net_name": "VCC"}, {"pin_number": "2", "net_name": "LED"}]},
+        {"id": "D1", "type": "LED", "value": "Red", "library_ref": "Device:LED",
+         "footprint": "LED_SMD:LED_0805_2012Metric",
+         "connections": [{"pin_number": "1", "net_name": "GND"}, {"pin_number": "2", "net_name": "LED"}]},
+    ],
+    "nets": [{"name": "VCC", "nodes": ["R1:1"]}, {"name": "LED", "nodes": ["R1:2", "D1:2"]},
+             {"name": "GND", "nodes": ["D1:1"]}],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Pedaços de texto como o stream os entrega: uma palavra (e o espaço em volta) por token."""
+    return _TOKEN.findall(text)
+
+
+def _recorded_key(request: dict) -> str:
+    return ResponseCache.key(request.get("model", ""), None, request.get("messages", []),
+                             request.get("temperature"), request.get("response_format"))
+
+
+class FakeLLMServer:
+    def __init__(self,
+                 responses: Union[None, List[str], Callable[[dict], str]] = None,
+                 recordings: Optional[str] = None,
+                 ttft: float = 0.0,
+                 tokens_per_second: Optional[float] = None,
+                 failures: Optional[List[Union[int, str, None]]] = None,
+                 failure_rate: float = 0.0,
+                 failure_status: int = 503,
+                 seed: Optional[int] = None,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        self.responses = responses
+        self.recorded = self._load_recordings(recordings) if recordings else {}
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.failures = list(failures or [])
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests: List[dict] = []  # corpo de cada requisição recebida
+        self.stats = {"requests": 0, "failures": 0, "recorded": 0, "scripted": 0, "default": 0}
+        self._random = random.Random(seed)
+        self._script = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @staticmethod
+    def _load_recordings(directory: str) -> Dict[str, str]:
+        recorded = {}
+        for path in Path(directory).glob("*.json"):
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+                recorded[_recorded_key(entry["request"] or {})] = entry["response"]
+            except (OSError, ValueError, KeyError, TypeError):
+                continue  # entrada incompleta ou de outro formato
+        return recorded
+
+    @property
+    def url(self) -> str:
+        """Base URL para LLM_BASE_URL / LLMClient(base_url=...)."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, request: dict) -> str:
+        """Texto da resposta para a requisição (gravação > roteiro > padrão)."""
+        with self._lock:
+            recorded = self.recorded.get(_recorded_key(request))
+            if recorded is not None:
+                self.stats["recorded"] += 1
+                return recorded
+            responder = self.responses if callable(self.responses) else None
+            if responder:
+                self.stats["scripted"] += 1
+            elif self.responses:
+                self.stats["scripted"] += 1
+                text = self.responses[self._script % len(self.responses)]
+                self._script += 1
+                return text
+            else:
+                self.stats["default"] += 1
+        if responder:
+            # Fora do lock: requisições simultâneas não esperam umas pelas outras, e o callable
+            # pode consultar server.stats/requests
+            return responder(request)
+        if request.get("response_format"):
+            return json.dumps(DEFAULT_CIRCUIT, ensure_ascii=False, indent=2)
+        return DEFAULT_PLAN
+
+    def _failure(self) -> Union[int, str, None]:
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.failures:
+                failure = self.failures.pop(0)
+            elif self.failure_rate and self._random.random() < self.failure_rate:
+                failure = self.failure_status
+            else:
+                failure = None
+            if failure is not None:
+                self.stats["failures"] += 1
+            return failure
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como os provedores reais
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+                else:
+                    self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._json(400, {"error": {"message": "JSON inválido", "type": "invalid_request_error"}})
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._json(404, {"error": {"message": "not found"}})
+                with server._lock:
+                    server.requests.append(request)
+
+                failure = server._failure()
+                if isinstance(failure, int):
+                    time.sleep(server.ttft)
+                    kind = "rate_limit_error" if failure == 429 else "server_error"
+                    return self._json(failure, {"error": {"message": f"Falha injetada ({failure})", "type": kind}})
+
+                text = server.respond(request)
+                tokens = tokenize(text)
+                usage = {"prompt_tokens": sum(len(tokenize(str(m.get("content", ""))))
+                                              for m in request.get("messages", [])),
+                         "completion_tokens": len(tokens)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                model = request.get("model", "fake")
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                time.sleep(server.ttft)
+
+                if not request.get("stream"):
+                    return self._json(200, {
+                        "id": completion_id, "object": "chat.completion", "created": int(time.time()),
+                        "model": model, "usage": usage,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": text}}]})
+
+                # Chunked: um stream cortado antes do chunk final é um erro de protocolo no cliente,
+                # como uma conexão que cai de verdade (sem ele o EOF passaria por fim normal)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send(data: bytes):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+
+                def event(choices, **extra):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": choices, **extra}
+                    send(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+                delay = 1.0 / server.tokens_per_second if server.tokens_per_second else 0.0
+                cut = len(tokens) // 2 if failure == "drop" else None
+                try:
+                    event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+                    for i, token in enumerate(tokens):
+                        if i == cut:
+                            self.close_connection = True
+                            return  # conexão cai no meio da resposta
+                        if i and delay:
+                            time.sleep(delay)
+                        event([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+                    event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                    if (request.get("stream_options") or {}).get("include_usage"):
+                        event([], usage=usage)
+                    send(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # cliente desistiu (timeout)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local compatível com /v1/chat/completions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", help="Diretório do cache de respostas (LLM_CACHE_DIR) a servir")
+    parser.add_argument("--script", help="Arquivo JSONL com uma resposta (string JSON) por linha, servidas em ciclo")
+    parser.add_argument("--ttft", type=float, default=0.0, help="Segundos até o primeiro token")
+    parser.add_argument("--tps", type=float, default=None, help="Tokens por segundo (padrão: sem espera)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fração das requisições que falham")
+    parser.add_argument("--failure-status", type=int, default=503, help="Código HTTP das falhas sorteadas")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    responses = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        # Objetos (circuitos) viram o JSON que a LLM mandaria
+        responses = [r if isinstance(r, str) else json.dumps(r, ensure_ascii=False) for r in lines]
+    server = FakeLLMServer(responses=responses, recordings=args.recordings, ttft=args.ttft,
+                           tokens_per_second=args.tps, failure_rate=args.failure_rate,
+                           failure_status=args.failure_status, seed=args.seed, host=args.host, port=args.port)
+    print(f"Servidor LLM falso em {server.url} (use LLM_BASE_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Parser incremental do JSON que a LLM gera em streaming.
+
+Os pedaços do stream entram por feed(); o scanner passa uma vez por cada pedaço,
+acompanhando strings, escapes e o aninhamento de objetos/listas. Cada elemento da lista de
+topo `components` é entregue a on_item assim que o '}' dele fecha, com o resto da resposta
+ainda sendo gerado. Texto antes do primeiro '{' (cercas ```json, comentários do modelo) e
+depois do fechamento do objeto raiz é ignorado.
+"""
+import json
+from typing import Any, Callable, List, Optional
+
+
+class StreamingJSONParser:
+    def __init__(self, on_item: Optional[Callable[[dict], None]] = None, array_key: str = "components"):
+        self.on_item = on_item
+        self.array_key = array_key
+        self.items: List[dict] = []
+        self._parts: List[str] = []   # tudo o que entrou
+        self._root: List[str] = []    # só o objeto raiz
+        self._state = "before"        # before -> inside -> done
+        self._stack: List[str] = []   # '{' ou '[' abertos
+        self._in_string = False
+        self._escape = False
+        self._key_parts: Optional[List[str]] = None  # string de nível 1 sendo lida
+        self._last_string = None      # última string de nível 1: candidata a chave
+        self._key = None              # chave de nível 1 do valor atual
+        self._item_parts: Optional[List[str]] = None  # elemento da lista alvo sendo lido
+
+    def feed(self, chunk: str):
+        """Consome mais um pedaço do stream (pode ter qualquer tamanho, inclusive a resposta inteira)."""
+        if not chunk:
+            return
+        self._parts.append(chunk)
+        if self._state != "done":
+            self._scan(chunk)
+
+    def _scan(self, chunk: str):
+        stack = self._stack
+        start = 0 if self._state == "inside" else None  # início do trecho do objeto raiz no pedaço
+        item_from = 0 if self._item_parts is not None else None
+        key_from = 0 if self._key_parts is not None else None
+        end = len(chunk)
+        for j, c in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_parts is not None:
+                        self._key_parts.append(chunk[key_from:j])
+                        self._last_string = "".join(self._key_parts)
+                        self._key_parts, key_from = None, None
+                continue
+            if self._state == "before":
+                if c == "{":
+                    self._state, start = "inside", j
+                    stack.append("{")
+                continue
+            if c == '"':
+                self._in_string = True
+                if len(stack) == 1:
+                    self._key_parts, key_from = [], j + 1
+            elif c == ":" and len(stack) == 1:
+                self._key = self._last_string
+            elif c == "," and len(stack) == 1:
+                self._key = None
+            elif c in "{[":
+                stack.append(c)
+                # Elemento da lista alvo: {"components": [ {...}, {...} ]}
+                if c == "{" and len(stack) == 3 and stack[1] == "[" and self._key == self.array_key:
+                    self._item_parts, item_from = [], j
+            elif c in "}]":
+                if len(stack) == 3 and c == "}" and self._item_parts is not None:
+                    self._item_parts.append(chunk[item_from:j + 1])
+                    self._emit("".join(self._item_parts))
+                    self._item_parts, item_from = None, None
+                stack.pop()
+                if not stack:
+                    self._state, end = "done", j + 1
+                    break
+
+        if start is not None:
+            self._root.append(chunk[start:end])
+        if item_from is not None:
+            self._item_parts.append(chunk[item_from:end])
+        if key_from is not None:
+            self._key_parts.append(chunk[key_from:end])
+
+    def _emit(self, raw: str):
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return  # elemento malformado: fica para o json.loads final apontar o erro
+        if isinstance(item, dict):
+            self.items.append(item)
+            if self.on_item:
+                self.on_item(item)
+
+    @property
+    def text(self) -> str:
+        """Tudo o que entrou até agora."""
+        return "".join(self._parts)
+
+    def result(self) -> Any:
+        """O objeto raiz completo (json.loads), sem o que veio antes ou depois dele."""
+        if self._state == "before":
+            return json.loads(self.text)  # sem '{': deixa o json apontar o erro
+        return json.loads("".join(self._root))
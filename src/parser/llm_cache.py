@@ -0,0 +1,102 @@
+"""
+Cache em disco das respostas da LLM, endereçado pelo conteúdo da requisição.
+
+A chave é o SHA-256 de (model, base_url, messages, temperature, response_format) em JSON
+canônico; cada resposta fica num arquivo <chave>.json dentro de `directory`. O mtime do
+arquivo marca o último uso: ao passar de `max_bytes`, os menos usados recentemente são
+apagados (LRU). As escritas usam arquivo temporário + os.replace, então vários processos ou
+threads podem dividir o mesmo diretório.
+
+Modos: "off" (sem cache), "read-write" (lê e grava) e "replay-only" (só lê: sem rede, uma
+requisição fora do cache é um erro). Por padrão vêm das variáveis LLM_CACHE, LLM_CACHE_DIR e
+LLM_CACHE_MAX_MB.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MODES = ("off", "read-write", "replay-only")
+
+
+class ResponseCache:
+    def __init__(self, mode: Optional[str] = None, directory: Optional[str] = None,
+                 max_bytes: Optional[int] = None):
+        self.mode = mode or os.getenv("LLM_CACHE", "off")
+        if self.mode not in MODES:
+            raise ValueError(f"Modo de cache inválido: {self.mode!r} (use {', '.join(MODES)})")
+        self.directory = Path(directory or os.getenv("LLM_CACHE_DIR", ".llm_cache"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 2**20)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def key(model: str, base_url: Optional[str], messages: List[Dict[str, str]], temperature: float,
+            response_format: Optional[Dict] = None) -> str:
+        payload = json.dumps({"model": model, "base_url": base_url or "", "messages": messages,
+                              "temperature": temperature, "response_format": response_format},
+                             sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """Resposta guardada para a chave (e marca o uso), ou None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry["response"]
+
+    def put(self, key: str, response: str, request: Optional[dict] = None):
+        """Grava a resposta (só no modo read-write) e aplica o limite de tamanho."""
+        if self.mode != "read-write":
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {"key": key, "created": time.time(), "request": request, "response": response}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Apaga as entradas usadas há mais tempo até o diretório caber em max_bytes."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue  # apagado por outro processo
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+                total -= size
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
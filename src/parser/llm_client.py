@@ -1,20 +1,127 @@
 import os
+import time
+import random
+import asyncio
+import threading
+import weakref
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import openai
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from src.parser.llm_cache import ResponseCache
 
 load_dotenv()
 
-class LLMClient:
+
+class LLMError(Exception):
+    """Falha na chamada da LLM (depois das novas tentativas, quando cabem)."""
+
+
+class LLMTimeoutError(LLMError):
+    """A chamada passou do timeout."""
+
+
+class LLMRateLimitError(LLMError):
+    """O provedor respondeu 429."""
+
+
+class LLMServerError(LLMError):
+    """Erro 5xx ou de conexão com o provedor."""
+
+
+class LLMRequestError(LLMError):
+    """Requisição recusada (4xx: chave inválida, modelo inexistente...): tentar de novo não adianta."""
+
+
+class LLMCacheMiss(LLMError):
+    """Modo replay-only e a requisição não está no cache."""
+
+
+def _translate(error: Exception) -> LLMError:
+    """Converte as exceções do SDK da OpenAI nos erros tipados deste módulo."""
+    if isinstance(error, LLMError):
+        return error
+    if isinstance(error, openai.APITimeoutError):
+        return LLMTimeoutError(str(error))
+    if isinstance(error, openai.RateLimitError):
+        return LLMRateLimitError(str(error))
+    if isinstance(error, openai.APIStatusError):
+        return (LLMServerError if error.status_code >= 500 else LLMRequestError)(str(error))
+    if isinstance(error, openai.APIConnectionError):
+        return LLMServerError(str(error))
+    return LLMError(f"{type(error).__name__}: {error}")
+
+
+def _usage(usage) -> Dict[str, int]:
+    """Contagem de tokens do objeto `usage` do SDK (ausentes viram 0)."""
+    details = getattr(usage, "completion_tokens_details", None)
+    # Reasoning tokens: em completion_tokens_details (OpenAI) ou direto no usage (OpenRouter)
+    reasoning = getattr(details, "reasoning_tokens", None) or getattr(usage, "reasoning_tokens", None)
+    return {"prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+            "reasoning_tokens": reasoning or 0}
+
+
+class RateLimiter:
     """
-    Cliente universal para LLMs usando o SDK da OpenAI.
-    Suporta OpenAI nativo, OpenRouter e Ollama.
+    Limite de requisições por minuto, compartilhado por todos os clientes de um provedor
+    (balde de fichas com rajada de `burst`). reserve() devolve quanto esperar antes de
+    enviar; a espera em si fica com quem chama (time.sleep ou asyncio.sleep).
+    """
+    _providers: Dict[tuple, "RateLimiter"] = {}
+    _providers_lock = threading.Lock()
+
+    def __init__(self, rpm: float, burst: int = 1):
+        self.interval = 60.0 / rpm
+        self.burst = max(1, burst)
+        self._next = 0.0  # instante a partir do qual a próxima ficha está livre
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_provider(cls, base_url: Optional[str], rpm: float, burst: int = 1) -> "RateLimiter":
+        """O limitador do provedor `base_url` (um por processo e por rpm)."""
+        key = (base_url or "", rpm, burst)
+        with cls._providers_lock:
+            if key not in cls._providers:
+                cls._providers[key] = cls(rpm, burst)
+            return cls._providers[key]
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            # Fichas acumuladas enquanto ocioso, no máximo `burst`
+            self._next = max(self._next, now - (self.burst - 1) * self.interval)
+            wait = max(0.0, self._next - now)
+            self._next += self.interval
+            return wait
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    # Retry-After (segundos) do 429/503, quando o provedor manda
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after")) if response is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _LLMConfig:
+    """
+    Configuração comum aos clientes síncrono e assíncrono: provedor (OpenAI, OpenRouter,
+    Ollama ou modo AUTO), cache, timeout por chamada e política de novas tentativas. Os
+    clientes HTTP do SDK são compartilhados por (api_key, base_url): criar um LLMClient por
+    execução não abre conexões novas, o pool com keep-alive é reaproveitado.
     """
-    def __init__(self, 
-                 api_key: Optional[str] = None, 
-                 base_url: Optional[str] = None, 
-                 model: str = "gpt-3.5-turbo"):
-        
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 model: str = "gpt-3.5-turbo",
+                 cache=None,
+                 timeout: float = 120.0,
+                 max_retries: int = 3,
+                 backoff: float = 1.0,
+                 rate_limiter: Optional[RateLimiter] = None):
+
         # Lógica para MODO AUTO
         if model.upper() == "AUTO":
             if os.getenv("OPENAI_API_KEY"):
@@ -33,59 +140,211 @@ class LLMClient:
             self.api_key = api_key or os.getenv("LLM_API_KEY", "no-key-needed")
             self.base_url = base_url or os.getenv("LLM_BASE_URL")
             self.model = model or os.getenv("LLM_MODEL", "gpt-3.5-turbo")
-            
+
             # Detecção de OpenRouter via nome do modelo
             if "/" in self.model and not self.base_url:
                 self.base_url = "https://openrouter.ai/api/v1"
                 self.api_key = api_key or os.getenv("OPENROUTER_API_KEY") or os.getenv("LLM_API_KEY")
 
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
+        self.cache = cache if isinstance(cache, ResponseCache) else ResponseCache(cache)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        # Tokens da última chamada (cached=True quando veio do cache, sem custo)
+        self.last_usage: Optional[Dict[str, Any]] = None
+
+    def _request(self, messages, temperature, response_format, stream, timeout) -> Dict[str, Any]:
+        extra_body = {}
+        if "openrouter.ai" in (self.base_url or ""):
+            extra_body["include_usage"] = True
+        request = dict(model=self.model, messages=messages, temperature=temperature,
+                       response_format=response_format, stream=stream,
+                       extra_body=extra_body if extra_body else None,
+                       timeout=self.timeout if timeout is None else timeout)
+        if stream:
+            # Contagem de tokens no último chunk do stream
+            request["stream_options"] = {"include_usage": True}
+        return request
+
+    def _cached(self, messages, temperature, response_format, stream, callback):
+        """(chave, resposta do cache ou None). Em replay-only, uma falta é LLMCacheMiss."""
+        self.last_usage = None
+        if not self.cache.enabled:
+            return None, None
+        key = self.cache.key(self.model, self.base_url, messages, temperature, response_format)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if stream and callback:
+                callback(cached)
+            self.last_usage = {"prompt_tokens": 0, "completion_tokens": 0, "reasoning_tokens": 0, "cached": True}
+            return key, cached
+        if self.cache.mode == "replay-only":
+            raise LLMCacheMiss(f"Resposta não está no cache (replay-only, chave {key[:12]}).")
+        return key, None
+
+    def _store(self, key, content, messages, temperature, response_format):
+        if key is not None:
+            self.cache.put(key, content, {"model": self.model, "base_url": self.base_url,
+                                          "messages": messages, "temperature": temperature,
+                                          "response_format": response_format})
+
+    def _retry_delay(self, error: LLMError, attempt: int, emitted: bool, raw: Exception) -> Optional[float]:
+        """Espera antes da próxima tentativa, ou None se não cabe tentar de novo."""
+        retryable = isinstance(error, (LLMTimeoutError, LLMRateLimitError, LLMServerError))
+        # Com parte do texto já entregue ao callback, repetir duplicaria a saída
+        if not retryable or emitted or attempt >= self.max_retries:
+            return None
+        delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+        return max(delay, _retry_after(raw) or 0.0)
+
+    def _chunk_text(self, chunk, parts: List[str], callback):
+        """Acumula o texto do chunk em `parts` (sem concatenar string a cada chunk)."""
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        if content:
+            parts.append(content)
+            if callback:
+                callback(content)
+        # Contagem de tokens no final do stream, com os Reasoning Tokens (padrão OpenRouter)
+        if getattr(chunk, "usage", None):
+            self.last_usage = {**_usage(chunk.usage), "cached": False}
+            reasoning = self.last_usage["reasoning_tokens"]
+            if reasoning and callback:
+                callback(f"\n[AI Reasoning Tokens: {reasoning}]")
+
+
+class LLMClient(_LLMConfig):
+    """
+    Cliente universal para LLMs usando o SDK da OpenAI.
+    Suporta OpenAI nativo, OpenRouter e Ollama.
+    `cache` (ResponseCache ou o nome do modo) guarda as respostas em disco; por padrão o modo
+    vem de LLM_CACHE (desligado se não definido). Erros saem como LLMError e subclasses;
+    timeouts, 429 e 5xx são tentados de novo até `max_retries` vezes, com espera exponencial.
+    `rate_limiter` (RateLimiter) espaça as requisições; os tokens da última chamada ficam em
+    last_usage.
+    """
+    _clients: Dict[tuple, OpenAI] = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        key = (self.api_key, self.base_url)
+        with self._clients_lock:
+            if key not in self._clients:
+                # As novas tentativas são nossas (com erros tipados), não do SDK
+                self._clients[key] = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            self.client = self._clients[key]
 
-    def chat_completion(self, 
-                       messages: List[Dict[str, str]], 
+    def chat_completion(self,
+                       messages: List[Dict[str, str]],
                        temperature: float = 0.2,
                        response_format: Optional[Dict] = None,
                        stream: bool = True,
-                       callback: Optional[callable] = None) -> str:
+                       callback: Optional[callable] = None,
+                       timeout: Optional[float] = None) -> str:
         """
-        Gera uma resposta do modelo com suporte a streaming.
+        Gera uma resposta do modelo com suporte a streaming. Com o cache ligado, uma requisição
+        já vista é respondida do disco (o texto inteiro vai para o callback de uma vez).
+        `timeout` (s) vale para esta chamada; sem ele, o do cliente.
         """
-        try:
-            extra_body = {}
-            if "openrouter.ai" in (self.base_url or ""):
-                extra_body["include_usage"] = True
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                response_format=response_format,
-                stream=stream,
-                extra_body=extra_body if extra_body else None
-            )
-
-            full_content = ""
-            if stream:
-                for chunk in response:
-                    content = chunk.choices[0].delta.content if chunk.choices else None
-                    if content:
-                        full_content += content
-                        if callback:
-                            callback(content)
-                    
-                    # Extração de Reasoning Tokens no final (padrão OpenRouter)
-                    if hasattr(chunk, 'usage') and chunk.usage:
-                        reasoning = getattr(chunk.usage, 'reasoning_tokens', 0)
-                        if reasoning and callback:
-                            callback(f"\n[AI Reasoning Tokens: {reasoning}]")
-                return full_content
-            else:
-                return response.choices[0].message.content
-        except Exception as e:
-            return f"Erro na chamada da LLM: {str(e)}"
+        key, cached = self._cached(messages, temperature, response_format, stream, callback)
+        if cached is not None:
+            return cached
+
+        attempt = 0
+        while True:
+            parts: List[str] = []
+            if self.rate_limiter:
+                time.sleep(self.rate_limiter.reserve())
+            try:
+                response = self.client.chat.completions.create(
+                    **self._request(messages, temperature, response_format, stream, timeout))
+                if stream:
+                    for chunk in response:
+                        self._chunk_text(chunk, parts, callback)
+                else:
+                    parts.append(response.choices[0].message.content or "")
+                    if getattr(response, "usage", None):
+                        self.last_usage = {**_usage(response.usage), "cached": False}
+                break
+            except Exception as e:
+                error = _translate(e)
+                delay = self._retry_delay(error, attempt, bool(parts), e)
+                if delay is None:
+                    raise error from e
+                time.sleep(delay)
+                attempt += 1
+
+        content = "".join(parts)
+        self._store(key, content, messages, temperature, response_format)
+        return content
+
+
+class AsyncLLMClient(_LLMConfig):
+    """
+    Versão asyncio do LLMClient, para várias gerações concorrentes num só processo. Todas as
+    instâncias do mesmo provedor no mesmo event loop dividem um AsyncOpenAI (e o pool HTTP
+    com keep-alive dele); mesma política de cache, timeout, novas tentativas e erros.
+    `client` troca o AsyncOpenAI compartilhado por um próprio.
+    """
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncOpenAI]]" = \
+        weakref.WeakKeyDictionary()
+
+    def __init__(self, *args, client: Optional[AsyncOpenAI] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = client
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is not None:
+            return self._client
+        # O pool de conexões é preso ao event loop em que foi aberto
+        pool = self._clients.setdefault(asyncio.get_running_loop(), {})
+        key = (self.api_key, self.base_url)
+        if key not in pool:
+            pool[key] = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        return pool[key]
+
+    async def chat_completion(self,
+                              messages: List[Dict[str, str]],
+                              temperature: float = 0.2,
+                              response_format: Optional[Dict] = None,
+                              stream: bool = True,
+                              callback: Optional[callable] = None,
+                              timeout: Optional[float] = None) -> str:
+        """Mesmo contrato de LLMClient.chat_completion, sem bloquear o event loop."""
+        key, cached = self._cached(messages, temperature, response_format, stream, callback)
+        if cached is not None:
+            return cached
+
+        attempt = 0
+        while True:
+            parts: List[str] = []
+            if self.rate_limiter:
+                await asyncio.sleep(self.rate_limiter.reserve())
+            try:
+                response = await self.client.chat.completions.create(
+                    **self._request(messages, temperature, response_format, stream, timeout))
+                if stream:
+                    async for chunk in response:
+                        self._chunk_text(chunk, parts, callback)
+                else:
+                    parts.append(response.choices[0].message.content or "")
+                    if getattr(response, "usage", None):
+                        self.last_usage = {**_usage(response.usage), "cached": False}
+                break
+            except Exception as e:
+                error = _translate(e)
+                delay = self._retry_delay(error, attempt, bool(parts), e)
+                if delay is None:
+                    raise error from e
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        content = "".join(parts)
+        self._store(key, content, messages, temperature, response_format)
+        return content
+
 
 if __name__ == "__main__":
     # Teste rápido de inicialização
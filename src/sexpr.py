@@ -0,0 +1,258 @@
+"""
+Leitura e escrita das S-expressions usadas pelos arquivos do KiCad
+(.kicad_sym, .kicad_mod, .kicad_sch, .kicad_pcb).
+
+Tudo passa por um tokenizador de uma única passada baseado em regex: os trechos
+que não interessam (átomos, espaços) são pulados dentro do motor de regex, em C,
+em vez de um laço Python caractere a caractere.
+"""
+import re
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+_STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Só o que altera o balanceamento: strings (que podem conter parênteses) e parênteses
+_STRUCT_RE = re.compile(_STRING + r'|[()]')
+# Tokens completos: '(' | ')' | "string" | átomo
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"\\]*(?:\\.[^"\\]*)*)"|([^\s()"]+))')
+
+
+def _balanced_pattern(levels: int) -> str:
+    # Lista balanceada com até `levels` níveis, no formato "desenrolado"
+    # normal* (especial normal*)*: sem ambiguidade, então uma falha não gera backtracking
+    # exponencial. Casa a subárvore inteira dentro do motor de regex.
+    normal = r'[^()"]*'
+    pattern = r'\(' + normal + r'(?:' + _STRING + normal + r')*\)'
+    for _ in range(levels - 1):
+        pattern = r'\(' + normal + r'(?:(?:' + _STRING + r'|' + pattern + r')' + normal + r')*\)'
+    return pattern
+
+
+_BALANCED_RE = re.compile(_balanced_pattern(16))
+_ESCAPE_RE = re.compile(r'\\(.)')
+
+
+class QuotedString(str):
+    """Átomo que estava entre aspas no arquivo (é reescrito entre aspas)."""
+
+
+class Raw(str):
+    """Subárvore que não foi materializada: guarda o texto original e é reescrita como está."""
+
+
+Node = Union[str, List["Node"]]
+
+
+def _unescape(value: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: "\n" if m.group(1) == "n" else m.group(1), value) if "\\" in value else value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def find_close(text: str, start: int) -> int:
+    """Índice logo após o ')' que fecha a lista aberta em text[start]. -1 se não fechar."""
+    m = _BALANCED_RE.match(text, start)
+    if m:
+        return m.end()
+    # Aninhamento além do suportado pelo regex (ou texto quebrado): conta token a token
+    level = 0
+    for m in _STRUCT_RE.finditer(text, start):
+        tok = m.group()
+        if tok == "(":
+            level += 1
+        elif tok == ")":
+            level -= 1
+            if level == 0:
+                return m.end()
+    return -1
+
+
+def leading_atoms(text: str, start: int, count: int = 2) -> List[str]:
+    """
+    Primeiros átomos da lista aberta em text[start], parando na primeira sublista.
+    Ex.: para '(symbol "R" (pin_numbers hide) ...' e count=2 retorna ['symbol', 'R'].
+    """
+    atoms = []
+    pos = start + 1
+    while len(atoms) < count:
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.group(1) or m.group(2):
+            break
+        atoms.append(_unescape(m.group(3)) if m.group(3) is not None else m.group(4))
+        pos = m.end()
+    return atoms
+
+
+def iter_lists(text: str, heads: Optional[Sequence[str]] = None, depth: int = 1,
+               start: int = 0) -> Iterator[Tuple[str, int, int]]:
+    """
+    Percorre o texto uma vez e devolve (head, início, fim) de cada lista no nível `depth`
+    (1 = listas de topo). As listas desse nível são puladas inteiras com find_close, então
+    as subárvores nunca são montadas nem percorridas em Python. Com depth >= 2 a busca
+    termina quando a lista aberta em `start` (ou a primeira depois dele) se fecha.
+    """
+    level = 0
+    pos = start
+    search = _STRUCT_RE.search
+    while True:
+        m = search(text, pos)
+        if not m:
+            return
+        tok = m.group()
+        if tok == "(":
+            if level + 1 == depth:
+                open_at = m.start()
+                end = find_close(text, open_at)
+                if end == -1:
+                    return
+                name = leading_atoms(text, open_at, 1)
+                name = name[0] if name else ""
+                if heads is None or name in heads:
+                    yield name, open_at, end
+                pos = end
+                continue
+            level += 1
+        elif tok == ")":
+            level -= 1
+            if level <= 0:
+                # Fechou a lista que envolve o nível procurado: acabou
+                return
+        pos = m.end()
+
+
+def parse(text: str, skip: Sequence[str] = (), max_depth: Optional[int] = None, start: int = 0) -> Node:
+    """
+    Monta a árvore da primeira lista a partir de `start`: listas viram list, átomos str e
+    strings entre aspas QuotedString. Listas cujo head está em `skip` (exceto a raiz) ou que
+    passam de `max_depth` níveis viram Raw com o texto original, sem serem materializadas.
+    """
+    skip = frozenset(skip)
+    stack: List[list] = []
+    pos = start
+    match = _TOKEN_RE.match
+    length = len(text)
+    while pos < length:
+        m = match(text, pos)
+        if not m:
+            break
+        if m.group(1):
+            open_at = m.start(1)
+            if stack and (max_depth is not None and len(stack) >= max_depth or
+                          (skip and (leading_atoms(text, open_at, 1) or [""])[0] in skip)):
+                end = find_close(text, open_at)
+                if end == -1:
+                    raise ValueError(f"Lista aberta na posição {open_at} não é fechada")
+                stack[-1].append(Raw(text[open_at:end]))
+                pos = end
+                continue
+            stack.append([])
+        elif m.group(2):
+            if not stack:
+                raise ValueError(f"')' sem par na posição {m.start(2)}")
+            node = stack.pop()
+            if not stack:
+                return node
+            stack[-1].append(node)
+        elif m.group(3) is not None:
+            if not stack:
+                raise ValueError("Átomo fora de lista")
+            stack[-1].append(QuotedString(_unescape(m.group(3))))
+        else:
+            if not stack:
+                raise ValueError("Átomo fora de lista")
+            stack[-1].append(m.group(4))
+        pos = m.end()
+    if stack:
+        raise ValueError("Lista não fechada no fim do texto")
+    raise ValueError("Nenhuma lista encontrada")
+
+
+def format_number(value: float) -> str:
+    """Número no formato do KiCad: até 6 casas, sem zeros sobrando."""
+    text = f"{value:.6f}".rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def dumps(node: Node) -> str:
+    """Serializa a árvore de volta para texto (em uma linha; o KiCad aceita)."""
+    if isinstance(node, list):
+        return "(" + " ".join(dumps(child) for child in node) + ")"
+    if isinstance(node, Raw):
+        return str(node)
+    if isinstance(node, QuotedString):
+        return f'"{_escape(node)}"'
+    if isinstance(node, bool):
+        return "yes" if node else "no"
+    if isinstance(node, (int, float)):
+        return format_number(node)
+    return str(node)
+
+
+def head(node: Node) -> Optional[str]:
+    return node[0] if isinstance(node, list) and node else None
+
+
+def find(node: Node, name: str) -> Optional[list]:
+    """Primeira sublista direta com o head `name`."""
+    for child in node:
+        if isinstance(child, list) and child and child[0] == name:
+            return child
+    return None
+
+
+def find_all(node: Node, name: str) -> List[list]:
+    """Todas as sublistas diretas com o head `name`."""
+    return [child for child in node if isinstance(child, list) and child and child[0] == name]
+
+
+def walk(node: Node, name: str) -> Iterator[list]:
+    """Todas as listas com o head `name` em qualquer profundidade (sem entrar nelas)."""
+    for child in node:
+        if isinstance(child, list) and child:
+            if child[0] == name:
+                yield child
+            else:
+                yield from walk(child, name)
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python -m src.sexpr libs/kicad-symbols/MCU_ST_STM32F4.kicad_sym
+    import sys
+    import time
+
+    def _legacy_char_loop(content: str) -> int:
+        """Laço de balanceamento antigo (ComponentDB/PCBGenerator), só para comparação."""
+        idx, count, length = 0, 0, len(content)
+        while idx < length:
+            start = content.find('(symbol "', idx)
+            if start == -1: break
+            balance, end = 0, -1
+            for i in range(start, length):
+                if content[i] == '(': balance += 1
+                elif content[i] == ')':
+                    balance -= 1
+                    if balance == 0: end = i + 1; break
+            if end == -1: break
+            count += 1
+            idx = end
+        return count
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "libs/kicad-symbols/MCU_ST_STM32F4.kicad_sym"
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        data = f.read()
+
+    def bench(label, fn, runs=5):
+        best = float("inf")
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        print(f"{label:<32} {best * 1000:9.1f} ms  ({result})")
+        return best
+
+    print(f"{path}: {len(data) / 1e6:.1f} MB")
+    legacy = bench("laço de caracteres (antigo)", lambda: _legacy_char_loop(data))
+    stream = bench("iter_lists (blocos de topo)", lambda: sum(1 for _ in iter_lists(data, ("symbol",), depth=2)))
+    bench("parse (árvore completa)", lambda: len(parse(data)))
+    print(f"Ganho do streaming: {legacy / stream:.1f}x")
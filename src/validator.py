@@ -1,61 +1,289 @@
 import re
-from typing import List, Dict
+from collections import defaultdict
+from typing import Iterable, List, Dict, Optional, Tuple
+import numpy as np
 from src.models.circuit import Circuit
+from src.component_db import footprint_geometry
+from src.generators.placement import DEFAULT_EXTENT, BoardLayout
+from src import sexpr
+
+# Itens de footprint sem geometria para o DRC (a referência vem de property/fp_text, então fica)
+_DRC_SKIP = ("model", "zone", "group", "embedded_files", "embedded_fonts", "fp_text_box")
+# Prefixo da referência usado pelas clearance_rules: "U" em "U12", "SW" em "SW3"
+_REF_PREFIX = re.compile(r"\D*")
+
+
+def grid_pairs(boxes: np.ndarray, cell: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pares (i, j), i < j, de caixas (n, 4) que dividem alguma célula de um hash de grade
+    uniforme de lado `cell` (mm): um superconjunto dos pares que se tocam. Tudo em NumPy: cada
+    caixa entra nas células que cobre, as entradas são ordenadas por célula e os pares saem
+    de dentro de cada célula. Um par que divide várias células só conta na primeira delas.
+    """
+    n = len(boxes)
+    if n < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    lo = np.floor(boxes[:, :2] / cell).astype(np.int64)
+    span = np.floor(boxes[:, 2:] / cell).astype(np.int64) - lo + 1
+    counts = span.prod(axis=1)
+    owner = np.repeat(np.arange(n), counts)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = lo[owner, 0] + k % span[owner, 0]
+    cy = lo[owner, 1] + k // span[owner, 0]
+    key = (cx - cx.min()) * (cy.max() - cy.min() + 1) + (cy - cy.min())
+
+    order = np.argsort(key, kind="stable")
+    key, owner, cx, cy = key[order], owner[order], cx[order], cy[order]
+    ends = np.append(np.flatnonzero(np.diff(key)) + 1, len(key))
+    group_end = np.repeat(ends, np.diff(np.concatenate([[0], ends])))
+    # Cada entrada forma par com as que vêm depois dela na mesma célula
+    partners = group_end - np.arange(len(key)) - 1
+    left = np.repeat(np.arange(len(key)), partners)
+    right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners, partners)
+    i, j = owner[left], owner[right]
+    # Célula de referência do par: a do canto mínimo da interseção das caixas
+    first = (cx[left] == np.maximum(lo[i, 0], lo[j, 0])) & (cy[left] == np.maximum(lo[i, 1], lo[j, 1]))
+    i, j = i[first], j[first]
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+class NetlistIndex:
+    """
+    Índices da netlist montados numa passada: pino -> nets (pelos nós de Net.nodes e pelas
+    Component.connections, separados, para poder comparar as duas fontes) e net -> pinos.
+    Pinos são tuplas (componente, número).
+    """
+    def __init__(self, circuit: Circuit):
+        self.components = {c.id: c for c in circuit.components}
+        self.net_pins: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self.node_nets: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        self.conn_nets: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        self.component_nodes: Dict[str, List[Tuple[str, str]]] = defaultdict(list)  # id -> [(pino, net)]
+        for net in circuit.nets:
+            for node in net.nodes:
+                comp, _, pin = node.partition(":")
+                self.net_pins[net.name].append((comp, pin))
+                self.node_nets[(comp, pin)].append(net.name)
+                self.component_nodes[comp].append((pin, net.name))
+        for comp in circuit.components:
+            for conn in comp.connections:
+                self.conn_nets[(comp.id, conn.pin_number)].append(conn.net_name)
+
+    def nets_of(self, comp: str, pin: str) -> List[str]:
+        """Nets do pino pelas duas fontes, sem repetição, na ordem em que aparecem."""
+        return list(dict.fromkeys(self.conn_nets.get((comp, pin), []) + self.node_nets.get((comp, pin), [])))
+
 
 class DesignValidator:
     """
     Validador interno para simular ERC (Electrical Rules Check) e DRC (Design Rules Check).
+
+    O DRC usa as caixas (courtyard) reais dos footprints: duas caixas precisam ficar a pelo
+    menos `clearance` mm uma da outra. `clearance_rules` troca essa folga por prefixo da
+    referência (ex.: {"J": 1.0, "U": 0.5}); num par vale a maior das duas.
+
+    Com `db` (ComponentDB) o ERC também confere os pinos contra os símbolos indexados.
     """
-    def __init__(self, circuit: Circuit):
+    def __init__(self, circuit: Circuit, clearance: float = 0.25,
+                 clearance_rules: Optional[Dict[str, float]] = None, db=None):
         self.circuit = circuit
+        self.clearance = clearance
+        self.clearance_rules = clearance_rules or {}
+        self.db = db
         self.errors = []
         self.warnings = []
+        self.drc_violations = []
+        # Problemas de ERC por chave (id do componente ou "net:<nome>"): [(nível, mensagem)]
+        self.erc_issues: Dict[str, List[Tuple[str, str]]] = {}
+        self._symbol_pins = {}
+        self._component_nets: Dict[str, set] = {}
 
-    def validate_erc(self):
-        """Verifica regras elétricas básicas."""
-        # 1. Floating Nets (Nets com menos de 2 nós)
-        for net in self.circuit.nets:
-            if len(net.nodes) < 2:
-                self.warnings.append(f"ERC: Net '{net.name}' está flutuando (apenas {len(net.nodes)} conexão).")
-
-        # 2. Pinos não conectados
-        # Mapear todos os pinos conectados em nets
-        connected_pins = set()
-        for net in self.circuit.nets:
-            for node in net.nodes:
-                connected_pins.add(node) # Formato "CompID:PinNum"
+    def validate_erc(self, components: Optional[Iterable[str]] = None):
+        """
+        Verifica regras elétricas: nets flutuantes, nós de componentes inexistentes, pinos em
+        mais de uma net, divergências entre Component.connections e Net.nodes e, com `db`,
+        pinos que não existem no símbolo e pinos de alimentação (power_in) sem conexão.
+        Os índices são montados uma vez (NetlistIndex) e cada verificação é uma passada.
+
+        Com `components` só os componentes informados (os tocados por um reparo) e as nets
+        ligadas a eles são verificados de novo; os demais resultados continuam valendo.
+        """
+        index = NetlistIndex(self.circuit)
+        if components is None:
+            comps, nets = set(index.components), set(index.net_pins)
+            self.erc_issues = {}
+        else:
+            comps = set(components)
+            # Nets ligadas aos componentes agora e antes do reparo (das que eles saíram também)
+            nets = {net for cid in comps for net in self._component_nets.get(cid, ())}
+            nets |= {net for cid in comps for _, net in index.component_nodes.get(cid, [])}
+            nets |= {conn.net_name for cid in comps if cid in index.components
+                     for conn in index.components[cid].connections}
+            stale = comps | {f"net:{net}" for net in nets}
+            # Nets que não existem mais (removidas pelo reparo) também saem
+            stale |= {key for key in self.erc_issues if key.startswith("net:") and key[4:] not in index.net_pins}
+            for key in stale:
+                self.erc_issues.pop(key, None)
+
+        for cid in comps:
+            conns = index.components[cid].connections if cid in index.components else []
+            self._component_nets[cid] = ({net for _, net in index.component_nodes.get(cid, [])} |
+                                         {conn.net_name for conn in conns})
+        for name in sorted(nets & set(index.net_pins)):
+            self._check_net(index, name)
+        for cid in sorted(comps):
+            if cid in index.components:
+                self._check_component(index, index.components[cid])
+
+        erc_errors = [msg for issues in self.erc_issues.values() for level, msg in issues if level == "error"]
+        erc_warnings = [msg for issues in self.erc_issues.values() for level, msg in issues if level == "warning"]
+        self.errors = [e for e in self.errors if not e.startswith("ERC:")] + erc_errors
+        self.warnings = [w for w in self.warnings if not w.startswith("ERC:")] + erc_warnings
+
+    def _issue(self, key: str, level: str, message: str):
+        self.erc_issues.setdefault(key, []).append((level, message))
+
+    def _check_net(self, index: NetlistIndex, name: str):
+        key = f"net:{name}"
+        pins = index.net_pins[name]
+        # Floating Nets (Nets com menos de 2 nós)
+        if len(set(pins)) < 2:
+            self._issue(key, "warning", f"ERC: Net '{name}' está flutuando (apenas {len(set(pins))} conexão).")
+        seen = set()
+        for comp, pin in pins:
+            if (comp, pin) in seen:
+                self._issue(key, "warning", f"ERC: Nó '{comp}:{pin}' repetido na net '{name}'.")
+            seen.add((comp, pin))
+            if comp not in index.components:
+                self._issue(key, "error", f"ERC: Net '{name}' referencia o componente inexistente '{comp}' "
+                                          f"(nó '{comp}:{pin}').")
+
+    def _check_component(self, index: NetlistIndex, comp):
+        cid = comp.id
+        nodes = index.component_nodes.get(cid, [])
+        if not comp.connections and not nodes:
+            self._issue(cid, "error", f"ERC: Componente '{cid}' não possui nenhuma conexão definida.")
+            return
 
-        for comp in self.circuit.components:
-            # Esta verificação é limitada se não soubermos quantos pinos o componente REALMENTE tem.
-            # Mas podemos verificar se o componente tem alguma conexão definida no modelo.
-            if not comp.connections:
-                 self.errors.append(f"ERC: Componente '{comp.id}' não possui nenhuma conexão definida.")
+        pins = dict.fromkeys([conn.pin_number for conn in comp.connections] + [pin for pin, _ in nodes])
+        for pin in pins:
+            nets = index.nets_of(cid, pin)
+            if len(nets) > 1:
+                listed = ", ".join(f"'{net}'" for net in nets)
+                self._issue(cid, "error", f"ERC: Pino '{cid}:{pin}' está em mais de uma net: {listed}.")
+
+        # connections x nets: as duas descrições da conectividade têm que concordar
+        for conn in comp.connections:
+            if conn.net_name not in index.net_pins:
+                self._issue(cid, "error", f"ERC: Conexão '{cid}:{conn.pin_number}' aponta para a net "
+                                          f"'{conn.net_name}', que não existe em nets.")
+            elif conn.net_name not in index.node_nets.get((cid, conn.pin_number), []):
+                self._issue(cid, "error", f"ERC: Pino '{cid}:{conn.pin_number}' está na net '{conn.net_name}' "
+                                          f"em connections, mas não entre os nós da net.")
+        for pin, net in nodes:
+            if net not in index.conn_nets.get((cid, pin), []):
+                self._issue(cid, "error", f"ERC: Nó '{cid}:{pin}' da net '{net}' não aparece em "
+                                          f"connections de '{cid}'.")
+
+        # Pinos do símbolo, quando indexados
+        symbol_pins = self._pins_of(comp.library_ref)
+        if symbol_pins:
+            for pin in pins:
+                if pin not in symbol_pins:
+                    self._issue(cid, "error", f"ERC: Pino '{pin}' não existe no símbolo '{comp.library_ref}' "
+                                              f"de '{cid}'.")
+            for number, (name, etype) in symbol_pins.items():
+                if etype == "power_in" and number not in pins:
+                    self._issue(cid, "error", f"ERC: Pino de alimentação '{cid}:{number}' ({name}) "
+                                              f"não está conectado.")
+
+    def _pins_of(self, symbol: str) -> Dict[str, Tuple[str, str]]:
+        """{número: (nome, tipo elétrico)} dos pinos do símbolo no ComponentDB (vazio sem db)."""
+        if self.db is None or not symbol:
+            return {}
+        if symbol not in self._symbol_pins:
+            self._symbol_pins[symbol] = {pin["number"]: (pin["name"], pin["etype"]) for pin in self.db.get_pins(symbol)}
+        return self._symbol_pins[symbol]
 
     def validate_drc(self, pcb_content: str):
-        """Verifica regras de design físico (sobreposição básica)."""
-        # Extrair posições (at X Y) de cada footprint
-        # Nota: Como o gerador agora usa posições dinâmicas, podemos extrair do arquivo gerado 
-        # ou passar as coordenadas calculadas. Vamos tentar extrair do conteúdo gerado.
-        
-        comp_positions = re.findall(r'\(footprint\s+"[^"]+"\s+.*\(property\s+"Reference"\s+"([^"]+)"\s+.*\s+\(at\s+([-\d\.]+)\s+([-\d\.]+)', pcb_content)
-        
-        # DRC de sobreposição simplificado (raio de colisão de 5mm por padrão)
-        radius = 5.0
-        pos_list = []
-        for ref, x, y in comp_positions:
-            pos_list.append({"ref": ref, "x": float(x), "y": float(y)})
-
-        for i, c1 in enumerate(pos_list):
-            for c2 in pos_list[i+1:]:
-                dist = ((c1["x"] - c2["x"])**2 + (c1["y"] - c2["y"])**2)**0.5
-                if dist < radius:
-                    self.errors.append(f"DRC: Possível sobreposição entre '{c1['ref']}' e '{c2['ref']}' (distância: {dist:.2f}mm).")
+        """
+        DRC de um .kicad_pcb já existente (boards de fora do pipeline). Para o layout recém
+        posicionado pelo PCBGenerator use validate_layout, sem passar por arquivo.
+        """
+        self.validate_layout(self.layout_from_pcb(pcb_content))
+
+    @staticmethod
+    def layout_from_pcb(pcb_content: str) -> BoardLayout:
+        """
+        Referência, posição, rotação (at X Y R) e caixa de cada footprint do arquivo: courtyard,
+        senão a camada fab, senão a união dos pads (coordenadas locais do footprint).
+        """
+        # Os footprints são filhos diretos de (kicad_pcb ...)
+        refs, positions, rotations, extents = [], [], [], []
+        for _, start, end in sexpr.iter_lists(pcb_content, ("footprint",), depth=2):
+            fp = sexpr.parse(pcb_content, skip=_DRC_SKIP, start=start)
+            at = sexpr.find(fp, "at")
+            ref = None
+            for item in sexpr.find_all(fp, "property") + sexpr.find_all(fp, "fp_text"):
+                if len(item) > 2 and item[1] in ("Reference", "reference"):
+                    ref = str(item[2])
+                    break
+            if ref and at and len(at) >= 3:
+                _, bounds = footprint_geometry(fp)
+                refs.append(ref)
+                positions.append((float(at[1]), float(at[2])))
+                rotations.append(float(at[3]) if len(at) > 3 else 0.0)
+                extents.append(bounds.get("courtyard") or bounds.get("fab") or bounds.get("pads"))
+        return BoardLayout(refs, np.array(positions).reshape(-1, 2), rotations=rotations,
+                           extents=[ext or DEFAULT_EXTENT for ext in extents])
+
+    def _clearances(self, refs: List[str]) -> np.ndarray:
+        """Folga exigida por componente, pelas clearance_rules do prefixo da referência."""
+        if not self.clearance_rules:
+            return np.full(len(refs), self.clearance)
+        return np.array([self.clearance_rules.get(_REF_PREFIX.match(ref).group(), self.clearance) for ref in refs])
+
+    def validate_layout(self, layout: BoardLayout):
+        """
+        Verifica as folgas entre as caixas (courtyard) do layout em memória. Os pares candidatos
+        saem de um hash de grade (grid_pairs), então o custo cresce com o número de vizinhos,
+        não com n². Cada violação vira um erro com a área sobreposta (ou a folga medida) e um
+        dict em drc_violations.
+        """
+        boxes = layout.boxes()
+        if len(boxes) < 2:
+            return
+        required = self._clearances(layout.refs)
+        # Células da ordem de duas caixas típicas; as caixas crescem da maior folga para achar os vizinhos
+        grown = boxes + np.array([-1, -1, 1, 1]) * required.max() / 2
+        size = np.maximum(grown[:, 2] - grown[:, 0], grown[:, 3] - grown[:, 1])
+        i, j = grid_pairs(grown, max(2 * float(np.median(size)), 1e-3))
+
+        w = np.minimum(boxes[i, 2], boxes[j, 2]) - np.maximum(boxes[i, 0], boxes[j, 0])
+        h = np.minimum(boxes[i, 3], boxes[j, 3]) - np.maximum(boxes[i, 1], boxes[j, 1])
+        # Folga retangular: a maior separação entre os eixos (negativa = sobrepostas)
+        gap = np.maximum(-w, -h)
+        need = np.maximum(required[i], required[j])
+        bad = np.flatnonzero(gap < need - 1e-9)
+        bad = bad[np.lexsort((j[bad], i[bad]))]
+        area = np.clip(w[bad], 0, None) * np.clip(h[bad], 0, None)
+
+        for k, overlap in zip(bad, area):
+            a, b = layout.refs[i[k]], layout.refs[j[k]]
+            self.drc_violations.append({"refs": (a, b), "overlap_area": float(overlap),
+                                        "gap": float(max(gap[k], 0.0)), "clearance": float(need[k])})
+            if overlap > 0:
+                self.errors.append(f"DRC: Sobreposição entre '{a}' e '{b}' (área: {overlap:.2f}mm²).")
+            else:
+                self.errors.append(f"DRC: Folga insuficiente entre '{a}' e '{b}' "
+                                   f"({max(gap[k], 0.0):.2f}mm < {need[k]:.2f}mm).")
 
     def get_report(self):
         return {
             "is_valid": len(self.errors) == 0,
             "errors": self.errors,
-            "warnings": self.warnings
+            "warnings": self.warnings,
+            "drc_violations": self.drc_violations
         }
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+from src.autofix import NetlistFixer
+from src.models.circuit import Circuit, Component, Net, PinConnection
+from src.validator import DesignValidator
+
+
+def _component(cid, *conns):
+    return Component(id=cid, type="Res", value="1k", library_ref="Device:R",
+                     connections=[PinConnection(pin_number=pin, net_name=net) for pin, net in conns])
+
+
+def test_fixer_resolves_mechanical_errors_and_revalidation_passes():
+    circuit = Circuit(project_name="t", description="", components=[
+        _component("R1", ("1", "VCC"), ("2", "LED")),
+        _component("D1", ("1", "LED"), ("2", "gnd")),
+        _component("R2", ("1", "VCC"), ("2", "GND")),
+    ], nets=[
+        Net(name="VCC", nodes=["R1:1", "R2:1", "R2:1"]),
+        Net(name="GND", nodes=["R2:2", "D1:2"]),
+        Net(name="GND", nodes=["R2:2"]),
+    ])
+    validator = DesignValidator(circuit)
+    validator.validate_erc()
+    assert validator.errors
+
+    fixer = NetlistFixer()
+    changes = fixer.fix(circuit)
+    validator.validate_erc(components=fixer.touched)
+
+    assert validator.errors == []
+    assert {net.name: net.nodes for net in circuit.nets} == {
+        "VCC": ["R1:1", "R2:1"], "GND": ["R2:2", "D1:2"], "LED": ["R1:2", "D1:1"]}
+    assert [(c.pin_number, c.net_name) for c in circuit.components[1].connections] == [("1", "LED"), ("2", "GND")]
+    assert any("'gnd'" in change for change in changes)
+    assert fixer.touched == {"R1", "D1", "R2"}
+
+
+def test_fixer_leaves_ambiguous_nets_to_the_llm():
+    circuit = Circuit(project_name="t", description="", components=[
+        _component("D1", ("1", "LED1")), _component("D2", ("1", "LED1")), _component("D3", ("1", "LED2")),
+        _component("U1", ("1", "SDA")), _component("U2", ("1", "SDA")), _component("U3", ("1", "SDB")),
+        _component("U4", ("1", "SDC")), _component("U5", ("1", "SDC")),
+    ], nets=[Net(name="LED1", nodes=["D1:1", "D2:1"]), Net(name="LED2", nodes=["D3:1"]),
+             Net(name="SDA", nodes=["U1:1", "U2:1"]), Net(name="SDB", nodes=["U3:1"]),
+             Net(name="SDC", nodes=["U4:1", "U5:1"])])
+
+    assert NetlistFixer().fix(circuit) == []
+    assert len(circuit.nets) == 5
+
+
+def test_fixer_keeps_signals_that_differ_by_sign_or_one_letter():
+    pairs = [("+5V", "-5V"), ("SCL", "SCK"), ("TXD", "RXD"), ("RST", "RTS")]
+    components, nets = [], []
+    for i, (real, single) in enumerate(pairs):
+        a, b, c = f"U{3 * i + 1}", f"U{3 * i + 2}", f"U{3 * i + 3}"
+        components += [_component(a, ("1", real)), _component(b, ("1", real)), _component(c, ("1", single))]
+        nets += [Net(name=real, nodes=[f"{a}:1", f"{b}:1"]), Net(name=single, nodes=[f"{c}:1"])]
+    circuit = Circuit(project_name="t", description="", components=components, nets=nets)
+
+    assert NetlistFixer().fix(circuit) == []
+    assert sorted(net.name for net in circuit.nets) == sorted(name for pair in pairs for name in pair)
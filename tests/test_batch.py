@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.batch import BatchRunner, load_prompts
+from src.bridge import GenerationBridge
+
+CIRCUIT = {
+    "project_name": "Led Blink", "description": "LED", "components": [
+        {"id": "R1", "type": "Resistor", "value": "220", "library_ref": "Device:R",
+         "connections": [{"pin_number": "1", "net_name": "VCC"}, {"pin_number": "2", "net_name": "LED"}]},
+        {"id": "D1", "type": "LED", "value": "Red", "library_ref": "Device:LED",
+         "connections": [{"pin_number": "1", "net_name": "LED"}, {"pin_number": "2", "net_name": "GND"}]}],
+    "nets": [{"name": "VCC", "nodes": ["R1:1"]}, {"name": "LED", "nodes": ["R1:2", "D1:1"]},
+             {"name": "GND", "nodes": ["D1:2"]}],
+}
+
+
+def test_load_prompts(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('{"id": "led/1", "description": "um LED"}\n\n"um buzzer"\n{"prompt": "um relé"}\n'
+                    '{"id": ".oculto", "description": "um motor"}\n', encoding="utf-8")
+    assert load_prompts(str(path)) == [{"id": "led_1", "description": "um LED"},
+                                       {"id": "0001", "description": "um buzzer"},
+                                       {"id": "0002", "description": "um relé"},
+                                       {"id": "oculto", "description": "um motor"}]
+
+    # "." e ".." escreveriam em <out> ou fora dele
+    for bad in (".", "..", "..."):
+        path.write_text(json.dumps({"id": bad, "description": "x"}) + "\n", encoding="utf-8")
+        with pytest.raises(ValueError):
+            load_prompts(str(path))
+
+
+def test_batch_runs_jobs_concurrently_into_separate_directories(tmp_path):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def bridge():
+        b = GenerationBridge(echo=False)
+
+        def chat_completion(messages, response_format=None, callback=None, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            b.client.last_usage = {"prompt_tokens": 10, "completion_tokens": 5, "reasoning_tokens": 0, "cached": False}
+            text = json.dumps(CIRCUIT) if response_format else "plano"
+            if callback:
+                callback(text)
+            return text
+        b.client.chat_completion = chat_completion
+        return b
+
+    jobs = [{"id": f"job{i}", "description": "um LED"} for i in range(4)]
+    summary = BatchRunner(workers=4, bridge_factory=bridge).run(jobs, str(tmp_path), log=lambda msg: None)
+
+    assert summary["succeeded"] == 4 and peak[0] > 1
+    results = [json.loads(line) for line in (tmp_path / "results.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert sorted(r["id"] for r in results) == [job["id"] for job in jobs]
+    for r in results:
+        assert r["ok"], r["message"]
+        assert (tmp_path / r["id"] / "led_blink.kicad_pcb").exists()
+        assert [s["stage"] for s in r["stages"]][:2] == ["reasoning", "json"]
+        assert r["usage"]["prompt_tokens"] == 10 * (2 + r["repair_rounds"])
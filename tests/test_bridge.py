@@ -0,0 +1,50 @@
+from src.bridge import GenerationBridge
+from src.models.circuit import Circuit, Component, Net, PinConnection
+
+
+def _circuit():
+    return Circuit(project_name="Fan Out", description="", nets=[Net(name="N1", nodes=["R1:1", "R2:1"])],
+                   components=[Component(id=ref, type="Res", value="1k", library_ref="Device:R",
+                                         connections=[PinConnection(pin_number="1", net_name="N1")])
+                               for ref in ("R1", "R2")])
+
+
+def test_export_artifacts_isolates_failures(tmp_path):
+    bridge = GenerationBridge()
+    circuit = _circuit()
+    layout = bridge.pcb_gen.place(circuit, seed=0)
+
+    def broken(circuit, path):
+        raise RuntimeError("sem preço")
+    bridge.bom_gen.generate = broken
+
+    summary = bridge.export_artifacts(circuit, str(tmp_path / "fan_out"), layout,
+                                      bridge.pcb_gen.layout_data(circuit, layout), log=lambda msg: None)
+
+    artifacts = summary["artifacts"]
+    assert list(artifacts) == ["kicad_pro", "kicad_sch", "kicad_pcb", "bom", "ipc356", "dsn"]
+    assert artifacts["bom"]["ok"] is False and artifacts["bom"]["error"] == "sem preço"
+    for name, result in artifacts.items():
+        if name != "bom":
+            assert result["ok"], result["error"]
+            assert (tmp_path / result["file"].rsplit("/", 1)[-1]).exists()
+    assert summary["seconds"] >= max(result["seconds"] for result in artifacts.values())
+
+
+def test_bridge_passes_placement_starts(monkeypatch, tmp_path):
+    from src.parser.fake_llm_server import FakeLLMServer
+    from src.parser.llm_client import LLMClient
+
+    monkeypatch.setenv("PLACEMENT_STARTS", "3")
+    bridge = GenerationBridge(echo=False)
+    assert bridge.starts == 3
+    layouts = []
+    place = bridge.pcb_gen.place
+    monkeypatch.setattr(bridge.pcb_gen, "place", lambda *a, **kw: layouts.append(place(*a, **kw)) or layouts[-1])
+
+    with FakeLLMServer() as server:
+        bridge.client = LLMClient(api_key="test", base_url=server.url, model="fake", cache="off")
+        ok, message = bridge.process("um LED", output_dir=str(tmp_path))
+
+    assert ok, message
+    assert len(layouts[-1].info["starts"]) == 3
@@ -0,0 +1,236 @@
+import shutil
+import sqlite3
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import component_db
+from src.component_db import ComponentDB
+
+DEVICE_LIB = """(kicad_symbol_lib (version 20231120) (generator "kicad_symbol_editor")
+  (symbol "R" (pin_numbers hide) (pin_names (offset 0)) (in_bom yes) (on_board yes)
+    (property "Reference" "R" (at 2.032 0 90) (effects (font (size 1.27 1.27))))
+    (property "Value" "R" (at 0 0 90) (effects (font (size 1.27 1.27))))
+    (property "ki_keywords" "R res resistor" (at 0 0 0) (effects (font (size 1.27 1.27)) hide))
+    (property "ki_description" "Resistor" (at 0 0 0) (effects (font (size 1.27 1.27)) hide))
+    (symbol "R_0_1"
+      (rectangle (start -1.016 -2.54) (end 1.016 2.54) (stroke (width 0.254) (type default)) (fill (type none)))
+    )
+    (symbol "R_1_1"
+      (pin passive line (at 0 3.81 270) (length 1.27)
+        (name "~" (effects (font (size 1.27 1.27))))
+        (number "1" (effects (font (size 1.27 1.27))))
+      )
+      (pin passive line (at 0 -3.81 90) (length 1.27)
+        (name "~" (effects (font (size 1.27 1.27))))
+        (number "2" (effects (font (size 1.27 1.27))))
+      )
+    )
+  )
+  (symbol "LED" (pin_numbers hide) (in_bom yes) (on_board yes)
+    (property "Reference" "D" (at 0 2.54 0) (effects (font (size 1.27 1.27))))
+    (property "ki_keywords" "LED diode light" (at 0 0 0) (effects (font (size 1.27 1.27)) hide))
+    (property "ki_description" "Light emitting diode" (at 0 0 0) (effects (font (size 1.27 1.27)) hide))
+    (symbol "LED_1_1"
+      (pin passive line (at -3.81 0 0) (length 2.54)
+        (name "K" (effects (font (size 1.27 1.27))))
+        (number "1" (effects (font (size 1.27 1.27))))
+      )
+      (pin passive line (at 3.81 0 180) (length 2.54)
+        (name "A" (effects (font (size 1.27 1.27))))
+        (number "2" (effects (font (size 1.27 1.27))))
+      )
+    )
+  )
+)
+"""
+
+R_0805 = """(footprint "R_0805_2012Metric" (version 20240108) (generator "pcbnew")
+  (layer "F.Cu")
+  (descr "Resistor SMD 0805 (2012 Metric)")
+  (tags "resistor")
+  (property "Reference" "REF**" (at 0 -1.65 0) (layer "F.SilkS") (effects (font (size 1 1) (thickness 0.15))))
+  (property "Value" "R_0805_2012Metric" (at 0 1.65 0) (layer "F.Fab") (effects (font (size 1 1) (thickness 0.15))))
+  (fp_line (start -1.68 -0.95) (end 1.68 -0.95) (stroke (width 0.05) (type solid)) (layer "F.CrtYd"))
+  (fp_line (start 1.68 -0.95) (end 1.68 0.95) (stroke (width 0.05) (type solid)) (layer "F.CrtYd"))
+  (fp_line (start 1.68 0.95) (end -1.68 0.95) (stroke (width 0.05) (type solid)) (layer "F.CrtYd"))
+  (fp_line (start -1.68 0.95) (end -1.68 -0.95) (stroke (width 0.05) (type solid)) (layer "F.CrtYd"))
+  (pad "1" smd roundrect (at -0.9125 0) (size 1.025 1.4) (layers "F.Cu" "F.Paste" "F.Mask") (roundrect_rratio 0.243902))
+  (pad "2" smd roundrect (at 0.9125 0) (size 1.025 1.4) (layers "F.Cu" "F.Paste" "F.Mask") (roundrect_rratio 0.243902))
+)
+"""
+
+
+def make_libs(root):
+    sym_dir = root / "kicad-symbols"
+    sym_dir.mkdir(parents=True)
+    (sym_dir / "Device.kicad_sym").write_text(DEVICE_LIB, encoding="utf-8")
+    fp_dir = root / "kicad-footprints" / "Resistor_SMD.pretty"
+    fp_dir.mkdir(parents=True)
+    (fp_dir / "R_0805_2012Metric.kicad_mod").write_text(R_0805, encoding="utf-8")
+    return root
+
+
+def test_scan_libs_indexes_symbols_and_footprints(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    db = ComponentDB(str(tmp_path / "components.db"))
+
+    stats = db.scan_libs(str(libs), workers=1)
+
+    assert stats["files"] == 2
+    assert stats["symbols"] == 2
+    assert stats["footprints"] == 1
+    assert stats["errors"] == 0
+    assert db.get_symbol_content("Device:R").startswith('(symbol "R"')
+    assert db.get_footprint_content("Resistor_SMD:R_0805_2012Metric") == R_0805
+
+
+def test_scan_libs_reports_parse_errors(tmp_path, monkeypatch):
+    libs = make_libs(tmp_path / "libs")
+    (libs / "kicad-symbols" / "Broken.kicad_sym").write_text("(kicad_symbol_lib", encoding="utf-8")
+    db = ComponentDB(str(tmp_path / "components.db"))
+
+    parse_sym = component_db._PARSERS["symbol"]
+    def failing_parse(path, content=None):
+        if path.endswith("Broken.kicad_sym"):
+            raise ValueError("bloco não fechado")
+        return parse_sym(path, content)
+    monkeypatch.setitem(component_db._PARSERS, "symbol", failing_parse)
+
+    stats = db.scan_libs(str(libs), workers=1)
+
+    assert stats["errors"] == 1
+    assert stats["symbols"] == 2
+
+
+def test_rescan_only_reparses_changed_files(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    db = ComponentDB(str(tmp_path / "components.db"))
+    db.scan_libs(str(libs), workers=1)
+
+    noop = db.scan_libs(str(libs), workers=1)
+    assert noop["files"] == 0
+    assert noop["unchanged"] == 2
+
+    sym_file = libs / "kicad-symbols" / "Device.kicad_sym"
+    sym_file.write_text(DEVICE_LIB.replace('(symbol "LED"', '(symbol "LED_Small"'), encoding="utf-8")
+    (libs / "kicad-footprints" / "Resistor_SMD.pretty" / "R_0805_2012Metric.kicad_mod").unlink()
+
+    stats = db.scan_libs(str(libs), workers=1)
+    assert stats["files"] == 1
+    assert stats["removed"] == 1
+    assert db.get_symbol_content("Device:LED") is None
+    assert db.get_symbol_content("Device:LED_Small") is not None
+    assert db.get_footprint_content("Resistor_SMD:R_0805_2012Metric") is None
+
+
+def test_search_ranks_by_name_description_and_keywords(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    db = ComponentDB(str(tmp_path / "components.db"))
+    db.scan_libs(str(libs), workers=1)
+
+    light = db.search("light emitting", kind="symbol")
+    assert [r["full_name"] for r in light] == ["Device:LED"]
+    assert light[0]["description"] == "Light emitting diode"
+
+    assert db.search("Device:R")[0]["full_name"] == "Device:R"
+    assert db.search("0805", kind="footprint")[0]["full_name"] == "Resistor_SMD:R_0805_2012Metric"
+    assert db.search_symbol("resistor")[0] == ("Device:R", "Device", "R")
+
+
+def test_pins_are_indexed_with_units_and_cached(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    db = ComponentDB(str(tmp_path / "components.db"))
+    db.scan_libs(str(libs), workers=1)
+
+    pins = db.get_pins("Device:LED")
+    assert [(p["number"], p["name"], p["etype"], p["x"], p["y"], p["angle"], p["unit"]) for p in pins] == [
+        ("1", "K", "passive", -3.81, 0.0, 0.0, 1),
+        ("2", "A", "passive", 3.81, 0.0, 180.0, 1),
+    ]
+    assert db.get_pin_positions("Device:R") == {"1": (0.0, 3.81), "2": (0.0, -3.81)}
+    assert db.get_pin_positions("Device:R") is db.get_pin_positions("Device:R")
+
+
+def test_pads_and_courtyard_extent_are_indexed(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    db = ComponentDB(str(tmp_path / "components.db"))
+    db.scan_libs(str(libs), workers=1)
+
+    pads = db.get_pads("Resistor_SMD:R_0805_2012Metric")
+    assert [(p["number"], p["x"], p["y"], p["width"], p["height"], p["shape"]) for p in pads] == [
+        ("1", -0.9125, 0.0, 1.025, 1.4, "roundrect"),
+        ("2", 0.9125, 0.0, 1.025, 1.4, "roundrect"),
+    ]
+    assert pads[0]["layers"] == "F.Cu F.Paste F.Mask"
+    assert db.get_footprint_extent("Resistor_SMD:R_0805_2012Metric") == (-1.68, -0.95, 1.68, 0.95)
+    assert db.get_footprint_extent("Resistor_SMD:Unknown") is None
+
+
+def test_shared_instance_is_read_only_and_thread_safe(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    path = str(tmp_path / "components.db")
+    ComponentDB(path).scan_libs(str(libs), workers=1)
+
+    db = ComponentDB.shared(path)
+    assert ComponentDB.shared(path) is db
+    with pytest.raises(sqlite3.OperationalError):
+        db.conn.execute("DELETE FROM symbols")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        contents = list(pool.map(lambda _: db.get_symbol_content("Device:R"), range(20)))
+    assert all(c.startswith('(symbol "R"') for c in contents)
+    stats = db.cache_stats()["content"]
+    assert stats["hits"] + stats["misses"] == 20
+    assert stats["size"] == 1
+
+
+def test_deleted_repo_and_loose_files(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    (libs / "Extra.kicad_sym").write_text(DEVICE_LIB.replace('"R"', '"R_Loose"'), encoding="utf-8")
+    db = ComponentDB(str(tmp_path / "components.db"))
+
+    stats = db.scan_libs(str(libs), workers=1)
+    assert stats["files"] == 3
+    assert db.get_symbol_content("Extra:R_Loose") is not None
+
+    shutil.rmtree(libs / "kicad-footprints")
+    (libs / "Extra.kicad_sym").unlink()
+    stats = db.scan_libs(str(libs), workers=1)
+
+    assert stats["removed"] == 2
+    assert db.get_footprint_content("Resistor_SMD:R_0805_2012Metric") is None
+    assert db.get_pads("Resistor_SMD:R_0805_2012Metric") == []
+    assert db.get_symbol_content("Extra:R_Loose") is None
+    assert db.search("0805", kind="footprint") == []
+    assert db.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 1
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git não instalado")
+def test_rescan_uses_git_diff_between_indexed_commits(tmp_path):
+    libs = make_libs(tmp_path / "libs")
+    repo = libs / "kicad-symbols"
+
+    def git(*args):
+        subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=repo,
+                       check=True, capture_output=True)
+    git("init", "-q")
+    (repo / "Other.kicad_sym").write_text(DEVICE_LIB.replace('"LED"', '"LED_Other"'), encoding="utf-8")
+    git("add", "-A")
+    git("commit", "-q", "-m", "inicial")
+
+    db = ComponentDB(str(tmp_path / "components.db"))
+    db.scan_libs(str(libs), workers=1)
+    assert db.scan_libs(str(libs), workers=1)["repos_skipped"] == 1
+
+    (repo / "Device.kicad_sym").write_text(DEVICE_LIB.replace('(symbol "LED"', '(symbol "LED_Small"'),
+                                           encoding="utf-8")
+    git("rm", "-q", "Other.kicad_sym")
+    git("commit", "-q", "-am", "muda Device, remove Other")
+
+    stats = db.scan_libs(str(libs), workers=1)
+    # Só o que o diff aponta: Device relido, Other removido, o repositório de footprints sem git inalterado
+    assert stats["files"] == 1 and stats["removed"] == 1 and stats["unchanged"] == 1
+    assert db.get_symbol_content("Device:LED_Small") is not None
+    assert db.get_symbol_content("Other:LED_Other") is None
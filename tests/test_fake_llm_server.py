@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from src.bridge import GenerationBridge
+from src.parser.fake_llm_server import FakeLLMServer
+from src.parser.llm_cache import ResponseCache
+from src.parser.llm_client import LLMClient, LLMServerError
+
+
+def _client(server, **kwargs):
+    return LLMClient(api_key="test", base_url=server.url, model="fake", cache="off", backoff=0.0, **kwargs)
+
+
+def test_streams_with_ttft_and_reports_usage():
+    with FakeLLMServer(responses=["um dois três quatro"], ttft=0.1, tokens_per_second=50) as server:
+        client = _client(server)
+        t0, chunks = time.perf_counter(), []
+        text = client.chat_completion([{"role": "user", "content": "oi"}],
+                                      callback=lambda c: chunks.append((c, time.perf_counter() - t0)))
+    assert text == "um dois três quatro"
+    assert [c for c, _ in chunks] == ["um ", "dois ", "três ", "quatro"]
+    assert chunks[0][1] >= 0.1 and chunks[-1][1] >= 0.1 + 3 / 50
+    assert client.last_usage["completion_tokens"] == 4
+
+
+def test_injected_failures_are_retried_or_surface_as_typed_errors():
+    with FakeLLMServer(responses=["ok"], failures=[429, 503, None, "drop"]) as server:
+        client = _client(server)
+        assert client.chat_completion([{"role": "user", "content": "x"}]) == "ok"
+        assert server.stats["requests"] == 3
+
+        server.responses = ["uma resposta que cai no meio"]
+        with pytest.raises(LLMServerError):
+            client.chat_completion([{"role": "user", "content": "x"}], callback=lambda c: None)
+
+
+def test_serves_recorded_responses(tmp_path):
+    messages = [{"role": "user", "content": "um LED"}]
+    cache = ResponseCache("read-write", tmp_path)
+    key = cache.key("fake", "https://api.openai.com/v1", messages, 0.2, None)
+    cache.put(key, "gravado", {"model": "fake", "base_url": "https://api.openai.com/v1",
+                               "messages": messages, "temperature": 0.2, "response_format": None})
+
+    with FakeLLMServer(recordings=str(tmp_path)) as server:
+        client = _client(server)
+        assert client.chat_completion(messages) == "gravado"
+        assert client.chat_completion([{"role": "user", "content": "outra"}]) != "gravado"
+    assert server.stats["recorded"] == 1 and server.stats["default"] == 1
+
+
+@pytest.mark.parametrize("mode, stages", [
+    ("two-pass", ["reasoning", "json", "validation", "export"]),
+    ("single-pass", ["json", "validation", "export"]),
+    ("reasoning", ["json", "validation", "export"]),
+])
+def test_full_pipeline_runs_offline(tmp_path, mode, stages):
+    with FakeLLMServer() as server:
+        bridge = GenerationBridge(echo=False, mode=mode)
+        bridge.client = _client(server)
+        ok, message = bridge.process("um LED", output_dir=str(tmp_path))
+
+    assert ok, message
+    assert (tmp_path / "led_blink.kicad_pcb").exists()
+    assert bridge.last_run["mode"] == mode
+    assert [s["stage"] for s in bridge.last_run["stages"]] == stages
+    assert all(s["usage"]["completion_tokens"] > 0 for s in bridge.last_run["stages"] if "usage" in s)
+    assert all(r["stream_options"] == {"include_usage": True} for r in server.requests)
+    json_request = server.requests[-1]
+    assert json_request["response_format"] == {"type": "json_object"}
+    assert ('"plan"' in json_request["messages"][-1]["content"]) == (mode == "single-pass")
+
+
+def test_invalid_pipeline_mode():
+    with pytest.raises(ValueError):
+        GenerationBridge(mode="three-pass")
+
+
+def test_callable_responses_run_concurrently_outside_the_lock():
+    from concurrent.futures import ThreadPoolExecutor
+
+    def slow(request):
+        time.sleep(0.2)
+        return f"resposta {server.stats['scripted']}"  # com o lock preso, isto travaria
+
+    with FakeLLMServer(responses=slow) as server:
+        client = _client(server)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            texts = list(pool.map(lambda i: client.chat_completion([{"role": "user", "content": str(i)}]), range(4)))
+        elapsed = time.perf_counter() - t0
+
+    assert all(text.startswith("resposta ") for text in texts)
+    assert elapsed < 0.6  # em série seriam 0.8 s
@@ -0,0 +1,71 @@
+import json
+
+from src.bridge import GenerationBridge
+from src.parser.json_stream import StreamingJSONParser
+
+DOC = {
+    "project_name": "Chaves {e} [colchetes]",
+    "components": [
+        {"id": "U1", "type": "MCU \"}]", "value": "ESP32", "library_ref": "???",
+         "connections": [{"pin_number": "1", "net_name": "GND"}]},
+        {"id": "R1", "type": "Res", "value": "1k", "library_ref": "Device:R", "connections": []},
+    ],
+    "nets": [{"name": "components", "nodes": ["U1:1"]}],
+    "extra": {"components": [{"id": "não é componente"}]},
+}
+
+
+def test_items_are_emitted_as_they_close():
+    text = "```json\n" + json.dumps(DOC, indent=2) + "\n```"
+    seen = []
+    parser = StreamingJSONParser(lambda item: seen.append((item["id"], consumed)))
+    consumed = 0
+    for i in range(0, len(text), 3):
+        consumed = i + 3
+        parser.feed(text[i:i + 3])
+
+    assert [ref for ref, _ in seen] == ["U1", "R1"]
+    # O primeiro componente sai bem antes do fim do stream
+    assert seen[0][1] < text.index('"nets"')
+    assert parser.result() == DOC
+    assert parser.text == text
+
+
+def test_single_feed_and_plain_json():
+    parser = StreamingJSONParser()
+    parser.feed(json.dumps(DOC))
+    assert [item["id"] for item in parser.items] == ["U1", "R1"]
+    assert parser.result() == DOC
+
+
+def test_bridge_resolves_components_while_streaming(monkeypatch, tmp_path):
+    text = json.dumps(DOC)
+    bridge = GenerationBridge()
+    monkeypatch.chdir(tmp_path)
+    resolved = []
+
+    def chat_completion(messages, response_format=None, callback=None, **kwargs):
+        if response_format is None:
+            return "plano"
+        for i in range(0, len(text), 8):
+            callback(text[i:i + 8])
+        boms_during_stream.append(len(boms))
+        return text
+
+    def resolve(db, type, library_ref, footprint=None):
+        resolved.append(type)
+        return library_ref, footprint or "Resistor_SMD:R_0805_2012Metric"
+
+    boms, boms_during_stream = [], []
+    monkeypatch.setattr(bridge.client, "chat_completion", chat_completion)
+    monkeypatch.setattr(bridge, "_resolve_component", resolve)
+    monkeypatch.setattr(bridge, "export_artifacts",
+                        lambda *args, **kwargs: {"artifacts": {}, "seconds": 0.0})
+
+    bridge.process("teste", callback=lambda msg: None,
+                   canvas_callback=lambda kind, data: boms.append(data) if kind == "bom" else None)
+
+    assert set(resolved) == {c["type"] for c in DOC["components"]}
+    # BOM progressivo: um componente, depois dois, ainda durante o stream
+    assert [len(bom) for bom in boms[:2]] == [1, 2]
+    assert boms_during_stream[0] == 2
@@ -0,0 +1,62 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src.parser.llm_cache import ResponseCache
+from src.parser.llm_client import LLMCacheMiss, LLMClient
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return iter([_chunk('{"project_name": '), _chunk('"x"}')])
+
+
+def _client(cache):
+    client = LLMClient(api_key="test", base_url="http://localhost:1/v1", model="test-model", cache=cache)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions()))
+    return client
+
+
+def test_read_write_then_replay_only_without_network(tmp_path):
+    messages = [{"role": "user", "content": "um LED"}]
+    writer = _client(ResponseCache("read-write", tmp_path))
+    first = writer.chat_completion(messages, response_format={"type": "json_object"})
+    again = writer.chat_completion(messages, response_format={"type": "json_object"})
+    assert first == again == '{"project_name": "x"}'
+    assert writer.client.chat.completions.calls == 1
+
+    replay = _client(ResponseCache("replay-only", tmp_path))
+    streamed = []
+    assert replay.chat_completion(messages, response_format={"type": "json_object"},
+                                  callback=streamed.append) == first
+    assert streamed == [first]
+    # Outra temperatura é outra chave: fora do cache, e sem chamar a rede
+    with pytest.raises(LLMCacheMiss):
+        replay.chat_completion(messages, temperature=0.7)
+    assert replay.client.chat.completions.calls == 0
+    assert replay.cache.stats() == {"mode": "replay-only", "hits": 1, "misses": 1}
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ResponseCache("read-write", tmp_path, max_bytes=10**9)
+    keys = [cache.key("m", None, [{"role": "user", "content": str(i)}], 0.2) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 1000)
+        os.utime(cache._path(key), (i, i))
+    cache.get(keys[0])  # o mais antigo volta a ser o mais recente
+
+    # Cabem exatamente as duas entradas mais recentes (o tamanho varia com o timestamp gravado)
+    cache.max_bytes = sum(cache._path(keys[i]).stat().st_size for i in (0, 2))
+    cache.evict()
+
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.get(keys[1]) is None
@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from src.parser.llm_client import AsyncLLMClient, LLMClient, LLMRateLimitError, LLMRequestError, RateLimiter
+
+
+class _Response:
+    def __init__(self, status):
+        self.status_code = status
+        self.headers = {}
+        self.request = None
+
+
+def _status_error(cls, status):
+    return cls("falhou", response=_Response(status), body=None)
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+class _Flaky:
+    """Falha com os erros dados e depois devolve o stream."""
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return iter([_chunk("a"), _chunk("b"), _chunk("c")])
+
+
+def _client(completions, **kwargs):
+    client = LLMClient(api_key="test", base_url="http://localhost:1/v1", model="m", cache="off", backoff=0.0, **kwargs)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
+
+
+def test_retries_rate_limits_and_server_errors_then_succeeds():
+    completions = _Flaky([_status_error(openai.RateLimitError, 429),
+                          _status_error(openai.InternalServerError, 503)])
+    assert _client(completions).chat_completion([{"role": "user", "content": "x"}], timeout=5) == "abc"
+    assert len(completions.calls) == 3 and completions.calls[0]["timeout"] == 5
+
+
+def test_errors_are_typed_and_client_errors_are_not_retried():
+    completions = _Flaky([_status_error(openai.AuthenticationError, 401)])
+    with pytest.raises(LLMRequestError):
+        _client(completions).chat_completion([{"role": "user", "content": "x"}])
+    assert len(completions.calls) == 1
+
+    completions = _Flaky([_status_error(openai.RateLimitError, 429)] * 3)
+    with pytest.raises(LLMRateLimitError):
+        _client(completions, max_retries=2).chat_completion([{"role": "user", "content": "x"}])
+    assert len(completions.calls) == 3
+
+
+def test_clients_share_the_http_pool():
+    first = LLMClient(api_key="k", base_url="http://localhost:1/v1", model="m")
+    second = LLMClient(api_key="k", base_url="http://localhost:1/v1", model="m")
+    assert first.client is second.client
+
+    async def pools():
+        a = AsyncLLMClient(api_key="k", base_url="http://localhost:1/v1", model="m")
+        b = AsyncLLMClient(api_key="k", base_url="http://localhost:1/v1", model="m")
+        return a.client is b.client
+    assert asyncio.run(pools())
+
+
+def test_async_client_runs_concurrently():
+    class _Slow:
+        def __init__(self):
+            self.active = self.peak = 0
+
+        async def create(self, **kwargs):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.05)
+            self.active -= 1
+
+            async def stream():
+                for text in ("o", "k"):
+                    yield _chunk(text)
+            return stream()
+
+    slow = _Slow()
+    client = AsyncLLMClient(api_key="k", base_url="http://localhost:1/v1", model="m", cache="off",
+                            client=SimpleNamespace(chat=SimpleNamespace(completions=slow)))
+
+    async def run():
+        return await asyncio.gather(*(client.chat_completion([{"role": "user", "content": str(i)}])
+                                      for i in range(5)))
+    assert asyncio.run(run()) == ["ok"] * 5
+    assert slow.peak == 5
+
+
+def test_usage_is_captured_from_the_last_chunk():
+    class _WithUsage:
+        def create(self, **kwargs):
+            assert kwargs["stream_options"] == {"include_usage": True}
+            usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3,
+                                    completion_tokens_details=SimpleNamespace(reasoning_tokens=2))
+            return iter([_chunk("o"), _chunk("k"), SimpleNamespace(choices=[], usage=usage)])
+
+    client = _client(_WithUsage())
+    assert client.chat_completion([{"role": "user", "content": "x"}]) == "ok"
+    assert client.last_usage == {"prompt_tokens": 12, "completion_tokens": 3, "reasoning_tokens": 2, "cached": False}
+
+
+def test_rate_limiter_spaces_requests_per_provider():
+    limiter = RateLimiter(rpm=600, burst=2)  # uma a cada 0.1 s, rajada de 2
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits[0] == waits[1] == 0.0
+    assert waits[2] == pytest.approx(0.1, abs=0.02) and waits[3] == pytest.approx(0.2, abs=0.02)
+
+    assert RateLimiter.for_provider("http://a/v1", 60) is RateLimiter.for_provider("http://a/v1", 60)
+    assert RateLimiter.for_provider("http://a/v1", 60) is not RateLimiter.for_provider("http://b/v1", 60)
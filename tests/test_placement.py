@@ -0,0 +1,130 @@
+import numpy as np
+
+from src.generators.placement import ForcePlacer, PlacementProblem, hpwl, legalize, overlap_area
+from src.models.circuit import Component, Net
+
+
+def test_barnes_hut_matches_exact_repulsion():
+    rng = np.random.default_rng(1)
+    pos = rng.uniform(0, 200, size=(800, 2))
+    charges = np.ones(len(pos))
+    placer = ForcePlacer()
+
+    exact = placer._exact_repulsion(pos, charges)
+    approx = placer._barnes_hut_repulsion(pos, charges)
+
+    error = np.linalg.norm(exact - approx, axis=1).mean() / np.linalg.norm(exact, axis=1).mean()
+    assert error < 0.03
+
+
+def test_connected_parts_end_up_closer_than_unconnected():
+    components = [Component(id=cid, type="Res", value="1k", library_ref="Device:R")
+                  for cid in ("R1", "R2", "R3", "R4")]
+    nets = [Net(name="A", nodes=["R1:1", "R2:1"]), Net(name="B", nodes=["R3:1", "R4:1", "X9:1"])]
+    problem = PlacementProblem.from_circuit(components, nets)
+
+    pos, _ = ForcePlacer().place(problem, seed=0)
+
+    dist = lambda a, b: np.linalg.norm(pos[problem.index[a]] - pos[problem.index[b]])
+    assert pos.shape == (4, 2)
+    assert dist("R1", "R2") < dist("R1", "R3")
+    assert dist("R3", "R4") < dist("R2", "R4")
+
+
+def test_high_fanout_nets_use_star_model():
+    nets = [np.arange(40), np.array([0, 1])]
+    problem = PlacementProblem([f"C{i}" for i in range(40)], nets)
+    placer = ForcePlacer(clique_threshold=16)
+
+    i, j, _ = placer._clique_springs(problem)
+    node, net = placer._star_pins(problem)
+    assert list(zip(i, j)) == [(0, 1)]
+    assert len(node) == 40 and set(net) == {0}
+
+    pos = np.zeros((40, 2))
+    pos[0] = (10.0, 0.0)
+    forces = placer._star_forces(pos, node, net)
+    # Puxa o componente afastado para o centroide e os demais na direção dele
+    assert forces[0, 0] < 0 < forces[1, 0]
+    assert abs(forces[:, 0].sum()) < 1e-9
+
+
+def test_placement_is_seeded_and_stops_when_settled():
+    problem = PlacementProblem(["R1", "R2", "R3"], [np.array([0, 1]), np.array([1, 2])])
+    placer = ForcePlacer(max_iterations=500)
+
+    first, info = placer.place(problem, seed=42)
+    again, _ = placer.place(problem, seed=42)
+    other, _ = placer.place(problem, seed=7)
+
+    assert np.array_equal(first, again)
+    assert not np.array_equal(first, other)
+    assert info["converged"] and info["iterations"] < 500
+    assert info["energy"] >= 0.0
+
+
+def test_multi_start_keeps_lowest_score():
+    problem = PlacementProblem([f"R{i}" for i in range(6)],
+                               [np.array([0, 1]), np.array([1, 2, 3]), np.array([3, 4, 5])])
+    placer = ForcePlacer()
+
+    pos, info = placer.place_best(problem, seeds=[1, 2, 3], workers=2)
+
+    assert [s["seed"] for s in info["starts"]] == [1, 2, 3]
+    assert info["score"] == min(s["score"] for s in info["starts"])
+    assert info["score"] == hpwl(problem, pos) + placer.overlap_weight * overlap_area(problem, pos)
+    single, _ = placer.place(problem, seed=info["seed"])
+    assert np.allclose(single, pos)
+
+
+def test_multilevel_keeps_decoupling_caps_next_to_their_ic():
+    # 20 CIs, cada um com 4 pinos em VDD e GND, 4 capacitores de desacoplamento e 8 resistores
+    ids, nets, vdd, gnd = [], [], [], []
+    for k in range(20):
+        ic = len(ids)
+        ids.append(f"U{k}")
+        vdd += [ic] * 4
+        gnd += [ic] * 4
+        for c in range(4):
+            vdd.append(len(ids))
+            gnd.append(len(ids))
+            ids.append(f"C{k}_{c}")
+        for r in range(8):
+            nets.append(np.array([ic, len(ids)]))
+            ids.append(f"R{k}_{r}")
+    problem = PlacementProblem(ids, nets + [np.array(vdd), np.array(gnd)])
+
+    def decap_distance(placer):
+        pos, info = placer.place(problem, seed=0)
+        dist = [np.linalg.norm(pos[problem.index[f"C{k}_{c}"]] - pos[problem.index[f"U{k}"]])
+                for k in range(20) for c in range(4)]
+        return np.median(dist), info
+
+    anchored, info = decap_distance(ForcePlacer(multilevel_threshold=50))
+    loose, _ = decap_distance(ForcePlacer(multilevel_threshold=50, anchor_weight=0.0))
+
+    assert info["levels"] > 1
+    assert anchored < loose / 2
+
+
+def test_legalize_removes_overlaps_and_keeps_legal_parts_in_place():
+    rng = np.random.default_rng(3)
+    n = 400
+    extents = np.tile((-1.0, -0.5, 1.0, 0.5), (n, 1))
+    extents[:10] = (-4.0, -4.0, 4.0, 4.0)  # alguns CIs grandes no meio dos passivos
+    pos = rng.uniform(0, 30, size=(n, 2))
+    problem = PlacementProblem([f"P{i}" for i in range(n)], [], extents=extents)
+    assert overlap_area(problem, pos) > 0
+
+    legal, info = legalize(pos, extents, clearance=0.25, grid=0.5)
+
+    # Com a folga incluída nas caixas, nenhum par se sobrepõe
+    spaced = PlacementProblem(problem.ids, [], extents=extents + (-0.125, -0.125, 0.125, 0.125))
+    assert overlap_area(spaced, legal) == 0.0
+    assert np.allclose(legal / 0.5, np.round(legal / 0.5))
+    assert 0 < info["moved"] <= n
+
+    # Um layout já legal na grade não muda
+    again, info = legalize(legal, extents, clearance=0.25, grid=0.5)
+    assert np.array_equal(again, legal)
+    assert info["moved"] == 0 and info["max_displacement"] == 0.0
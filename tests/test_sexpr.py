@@ -0,0 +1,35 @@
+from src import sexpr
+
+FOOTPRINT = """(footprint "R_0805" (layer "F.Cu")
+  (descr "Resistor (SMD) \\"0805\\"")
+  (property "Reference" "REF**" (at 0 -1.65 0) (layer "F.SilkS"))
+  (fp_line (start -1.68 -0.95) (end 1.68 -0.95) (layer "F.CrtYd"))
+  (pad "1" smd roundrect (at -0.9125 0) (size 1.025 1.4) (layers "F.Cu" "F.Paste" "F.Mask"))
+  (pad "2" smd roundrect (at 0.9125 0) (size 1.025 1.4) (layers "F.Cu" "F.Paste" "F.Mask"))
+)"""
+
+
+def test_iter_lists_streams_blocks_at_depth():
+    blocks = list(sexpr.iter_lists(FOOTPRINT, ("pad",), depth=2))
+    assert [FOOTPRINT[s:e][:9] for _, s, e in blocks] == ['(pad "1" ', '(pad "2" ']
+    assert all(FOOTPRINT[e - 1] == ")" for _, _, e in blocks)
+    assert sexpr.leading_atoms(FOOTPRINT, blocks[1][1], 3) == ["pad", "2", "smd"]
+
+
+def test_parens_inside_strings_do_not_break_balance():
+    start = FOOTPRINT.index("(descr")
+    end = sexpr.find_close(FOOTPRINT, start)
+    assert FOOTPRINT[start:end] == '(descr "Resistor (SMD) \\"0805\\"")'
+
+
+def test_parse_skip_and_roundtrip():
+    tree = sexpr.parse(FOOTPRINT, skip=("fp_line", "pad"))
+    assert tree[:2] == ["footprint", "R_0805"]
+    assert sexpr.find(tree, "descr")[1] == 'Resistor (SMD) "0805"'
+    assert sum(isinstance(c, sexpr.Raw) for c in tree) == 3
+
+    again = sexpr.parse(sexpr.dumps(tree))
+    assert sexpr.dumps(again) == sexpr.dumps(sexpr.parse(FOOTPRINT))
+    pads = list(sexpr.walk(again, "pad"))
+    assert [p[1] for p in pads] == ["1", "2"]
+    assert sexpr.find(pads[0], "size")[1:] == ["1.025", "1.4"]
@@ -0,0 +1,133 @@
+import numpy as np
+
+from src.generators.placement import BoardLayout
+from src.models.circuit import Circuit, Component, Net, PinConnection
+from src.validator import DesignValidator, grid_pairs
+
+PCB = """(kicad_pcb (version 20240108) (generator "test")
+  (net 0 "")
+  (footprint "Device:R" (layer "F.Cu") (at 10 20 90)
+    (property "Reference" "R1" (at 0 -2 0) (layer "F.SilkS"))
+    (pad "1" smd rect (at -1.5 0) (size 1 1.5) (layers "F.Cu")))
+  (footprint "Device:R" (layer "F.Cu") (at 11.5 20)
+    (fp_text reference "R2" (at 0 -2) (layer "F.SilkS")))
+)"""
+
+
+def _circuit():
+    return Circuit(project_name="t", description="", nets=[Net(name="N1", nodes=["R1:1", "R2:1"])],
+                   components=[Component(id=ref, type="Res", value="1k", library_ref="Device:R",
+                                         connections=[PinConnection(pin_number="1", net_name="N1")])
+                               for ref in ("R1", "R2")])
+
+
+def test_file_and_in_memory_layouts_give_the_same_drc():
+    layout = DesignValidator.layout_from_pcb(PCB)
+    assert layout.refs == ["R1", "R2"]
+    assert np.allclose(layout.positions, [(10, 20), (11.5, 20)])
+    assert list(layout.rotations) == [90.0, 0.0]
+    # R1 só tem um pad: a caixa é a dele; R2 não tem geometria e fica com a caixa padrão
+    assert np.allclose(layout.extents, [(-2, -0.75, -1, 0.75), (-1, -1, 1, 1)])
+
+    from_file = DesignValidator(_circuit())
+    from_file.validate_drc(PCB)
+    in_memory = DesignValidator(_circuit())
+    in_memory.validate_layout(BoardLayout(["R1", "R2"], [(10, 20), (11.5, 20)], rotations=[90, 0],
+                                          extents=[(-2, -0.75, -1, 0.75), (-1, -1, 1, 1)]))
+    assert from_file.errors == in_memory.errors and len(in_memory.errors) == 1
+
+
+def test_layout_boxes_follow_rotation():
+    layout = BoardLayout(["U1", "U2"], [(0, 0), (10, 5)], extents=[(-2, -1, 2, 1)] * 2, rotations=[0, 90])
+    assert np.allclose(layout.boxes(), [(-2, -1, 2, 1), (9, 3, 11, 7)])
+
+
+def test_grid_pairs_finds_every_touching_pair_once():
+    rng = np.random.default_rng(0)
+    lo = rng.uniform(0, 100, size=(600, 2))
+    boxes = np.concatenate([lo, lo + rng.uniform(0.5, 8, size=(600, 2))], axis=1)
+
+    i, j = grid_pairs(boxes, cell=3.0)
+
+    w = np.minimum(boxes[:, None, 2], boxes[None, :, 2]) - np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    h = np.minimum(boxes[:, None, 3], boxes[None, :, 3]) - np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    touching = set(zip(*np.nonzero(np.triu((w >= 0) & (h >= 0), k=1))))
+    found = list(zip(i.tolist(), j.tolist()))
+    assert len(found) == len(set(found))
+    assert touching <= set(found)
+
+
+def test_drc_reports_overlap_area_and_clearance_rules():
+    layout = BoardLayout(["U1", "R1", "J1", "R2"], [(0, 0), (2.5, 0), (20, 0), (23.5, 0)],
+                         extents=[(-2, -2, 2, 2), (-1, -0.5, 1, 0.5), (-3, -3, 3, 3), (-0.2, -0.2, 0.2, 0.2)])
+
+    validator = DesignValidator(_circuit(), clearance=0.25, clearance_rules={"J": 1.0})
+    validator.validate_layout(layout)
+
+    overlap, spacing = validator.drc_violations
+    assert overlap["refs"] == ("U1", "R1") and overlap["overlap_area"] == 0.5
+    # J1 e R2 estão a 0.3 mm: passa na folga geral, mas não na do conector
+    assert spacing["refs"] == ("J1", "R2") and spacing["overlap_area"] == 0.0
+    assert np.isclose(spacing["gap"], 0.3) and spacing["clearance"] == 1.0
+    assert "área: 0.50mm²" in validator.errors[0]
+
+    relaxed = DesignValidator(_circuit(), clearance=0.25)
+    relaxed.validate_layout(layout)
+    assert [v["refs"] for v in relaxed.drc_violations] == [("U1", "R1")]
+
+
+class _PinDB:
+    """Só o get_pins do ComponentDB, com um regulador de 3 pinos."""
+    def get_pins(self, symbol):
+        if symbol != "Regulator_Linear:AMS1117-3.3":
+            return []
+        return [{"number": "1", "name": "GND", "etype": "power_in"},
+                {"number": "2", "name": "VO", "etype": "power_out"},
+                {"number": "3", "name": "VI", "etype": "power_in"}]
+
+
+def _regulator_circuit():
+    return Circuit(project_name="t", description="", components=[
+        Component(id="U1", type="LDO", value="AMS1117", library_ref="Regulator_Linear:AMS1117-3.3",
+                  connections=[PinConnection(pin_number="1", net_name="GND"),
+                               PinConnection(pin_number="2", net_name="3V3"),
+                               PinConnection(pin_number="2", net_name="VOUT")]),
+        Component(id="C1", type="Cap", value="10u", library_ref="Device:C",
+                  connections=[PinConnection(pin_number="1", net_name="3V3"),
+                               PinConnection(pin_number="2", net_name="GND")]),
+    ], nets=[Net(name="GND", nodes=["U1:1", "C1:2"]), Net(name="3V3", nodes=["U1:2", "C1:1", "C1:1"]),
+             Net(name="VOUT", nodes=["U1:2", "R9:1"])])
+
+
+def test_erc_checks_netlist_consistency_and_power_pins():
+    validator = DesignValidator(_regulator_circuit(), db=_PinDB())
+    validator.validate_erc()
+
+    assert sorted(validator.errors) == sorted([
+        "ERC: Net 'VOUT' referencia o componente inexistente 'R9' (nó 'R9:1').",
+        "ERC: Pino 'U1:2' está em mais de uma net: '3V3', 'VOUT'.",
+        "ERC: Pino de alimentação 'U1:3' (VI) não está conectado.",
+    ])
+    assert "ERC: Nó 'C1:1' repetido na net '3V3'." in validator.warnings
+
+
+def test_erc_rechecks_only_the_repaired_components():
+    circuit = _regulator_circuit()
+    validator = DesignValidator(circuit, db=_PinDB())
+    validator.validate_erc()
+
+    # Reparo: U1 sai da VOUT e ganha a entrada; C1 passa a ter um pino sem nó na net
+    u1, c1 = circuit.components
+    u1.connections = [c for c in u1.connections if c.net_name != "VOUT"] + [PinConnection(pin_number="3", net_name="VIN")]
+    circuit.nets[2].nodes = ["R9:1"]
+    circuit.nets.append(Net(name="VIN", nodes=["U1:3"]))
+    c1.connections.append(PinConnection(pin_number="3", net_name="GND"))
+    validator.validate_erc(components=["U1"])
+
+    assert sorted(validator.errors) == ["ERC: Net 'VOUT' referencia o componente inexistente 'R9' (nó 'R9:1')."]
+    # A VOUT perdeu o U1: é reverificada mesmo sem ligação com ele depois do reparo
+    assert "ERC: Net 'VOUT' está flutuando (apenas 1 conexão)." in validator.warnings
+    full = DesignValidator(circuit, db=_PinDB())
+    full.validate_erc()
+    # C1 não foi reverificado: o pino 3 (que não existe no nó da GND) só aparece na verificação completa
+    assert "ERC: Pino 'C1:3' está na net 'GND' em connections, mas não entre os nós da net." in full.errors